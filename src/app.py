@@ -1,10 +1,38 @@
+import asyncio
 from src.file_IO.filepaths import get_filepaths
 from src.file_IO.filepaths import get_abs_path
 from src.file_IO.read_files import read_yaml, read_csv_headerless_UTF8
+from src.file_IO.fingerprints import files_stat_digest
 from src.monitor.log_system import get_loggers
 from src.sandbox.yields.bond_return import test_bond_yield_calcs
-from src.engine.IBKR_statements import process_ibkr_statements_directory
-from src.front_end.output import display_portfolio_pages
+from src.sandbox.benchmarks import benchmark_record_memory, benchmark_accrual_conversion, benchmark_ytm_batch
+from src.engine.IBKR_statements import load_ibkr_statements_directory
+from src.engine.IBKR_statements import collect_statement_trades
+from src.engine.async_ingestion import load_ibkr_statements_directory_async
+from src.engine.nav_series import NAVHistory
+from src.engine.position_diff import diff_statement_series
+from src.engine.quantity_audit import reconcile_quantities
+from src.engine.ticker_index import TickerIndex
+from src.engine.fx_rates import FXRates
+from src.engine.cgt_matching import CGTEngine
+from src.engine.ticker_revisions import TickerResolver
+from src.engine.position_table import PositionTable
+from src.engine.statement_watcher import StatementWatcher, scan_statement_files
+from src.engine.statement_store import StatementStore
+from src.front_end.output import display_portfolio_pages, portfolio_views
+from src.engine.IBKR_statements import PARSER_VERSION
+from src.engine.statement_cache import StatementCache
+from src.config.config_ingestion import INGESTION_WORKERS, INGESTION_CHUNK_SIZE
+from src.config.config_ingestion import STATEMENT_CACHE_DIR, STATEMENT_CACHE_MAX_BYTES
+from src.config.config_ingestion import INGESTION_LATEST_ONLY
+from src.config.config_ingestion import WATCH_STATEMENTS, WATCH_INTERVAL
+from src.config.config_ingestion import STATEMENT_DB_PATH
+from src.config.config_ingestion import INGESTION_ASYNC, ASYNC_CONCURRENCY, ASYNC_QUEUE_DEPTH
+from src.config.config_ingestion import DEDUP_PRECEDENCE
+from src.config.config_ingestion import TICKER_INDEX_PATH
+from src.config.config_ingestion import BASE_CURRENCY, FX_RATES_CSV
+from src.config.config_ingestion import CGT_CURRENCY
+from src.config.config_ingestion import TICKER_REVISIONS_CSV
 
 # Get logger instances at module level
 log_system, log_error, log_output = get_loggers()
@@ -34,18 +62,129 @@ def run_application():
     if COMPONENT_FLAG == 2:
         test_bond_yield_calcs()
         
+    # Component - Benchmarks
+    if COMPONENT_FLAG == 4:
+        benchmark_record_memory()
+        benchmark_accrual_conversion()
+        benchmark_ytm_batch()
+        
+    # Component - UK capital gains
+    if COMPONENT_FLAG == 5:
+        cache = statement_cache()
+        resolver = ticker_resolver()
+        statements = []
+        for directory in (sensitive['statement_dir'], sensitive['transaction_dir']):
+            statements += resolver.resolve_statements(load_ibkr_statements_directory(
+                directory,
+                workers=INGESTION_WORKERS,
+                chunk_size=INGESTION_CHUNK_SIZE,
+                cache=cache,
+                dedup_precedence=DEDUP_PRECEDENCE
+            )).values()
+        
+        cgt = CGTEngine(FXRates.from_statements(statements, CGT_CURRENCY))
+        cgt.add_statements(statements)
+        output_capital_gains(cgt)
+        
     # Component - Read statements
     if COMPONENT_FLAG == 3:
-        statements = process_ibkr_statements_directory(sensitive['statement_dir'])
+        cache = statement_cache()
+        fingerprints = scan_statement_files(sensitive['statement_dir']) if WATCH_STATEMENTS else None
+        
+        if INGESTION_ASYNC:
+            loaded = asyncio.run(load_ibkr_statements_directory_async(
+                sensitive['statement_dir'],
+                concurrency=ASYNC_CONCURRENCY,
+                queue_depth=ASYNC_QUEUE_DEPTH,
+                workers=INGESTION_WORKERS,
+                cache=cache,
+                latest_only=INGESTION_LATEST_ONLY,
+                dedup_precedence=DEDUP_PRECEDENCE
+            ))
+        else:
+            loaded = load_ibkr_statements_directory(
+                sensitive['statement_dir'],
+                workers=INGESTION_WORKERS,
+                chunk_size=INGESTION_CHUNK_SIZE,
+                cache=cache,
+                latest_only=INGESTION_LATEST_ONLY,
+                dedup_precedence=DEDUP_PRECEDENCE
+            )
+        resolver = ticker_resolver()
+        loaded = resolver.resolve_statements(loaded)
+        statements = list(loaded.values())
+        
+        if STATEMENT_DB_PATH is not None:
+            store = StatementStore(get_abs_path(STATEMENT_DB_PATH))
+            store.add_statements(loaded)
+            store.remove_missing_files()
+            store.close()
+        
+        ticker_index = load_ticker_index(loaded) if TICKER_INDEX_PATH is not None else None
         
         output_open_positions(statements)
         output_open_accruals(statements)
         output_net_asset_values(statements)
+        output_nav_history(statements)
+        output_position_changes(statements)
+        output_quantity_audit(statements, collect_statement_trades(statements))
+        
+        if FX_RATES_CSV is not None:
+            fx_rates = FXRates.from_csv(BASE_CURRENCY, get_abs_path(FX_RATES_CSV))
+        else:
+            fx_rates = FXRates.from_statements(statements, BASE_CURRENCY)
+        output_base_currency_values(statements, fx_rates)
+        
+        watcher = None
+        if WATCH_STATEMENTS:
+            watcher = StatementWatcher(
+                sensitive['statement_dir'],
+                loaded,
+                WATCH_INTERVAL,
+                cache,
+                resolver,
+                fingerprints,
+                latest_only=INGESTION_LATEST_ONLY,
+                dedup_precedence=DEDUP_PRECEDENCE
+            )
                                     
-        display_portfolio_pages(
-            {stmt.account: stmt.open_positions for stmt in statements},
-            {stmt.account: stmt.open_accruals for stmt in statements}
-    )
+        display_portfolio_pages(*portfolio_views(statements), watcher=watcher, ticker_index=ticker_index)
+        
+
+def statement_cache():
+    """Get the cache of parsed statements, or None if caching is disabled"""
+    if STATEMENT_CACHE_DIR is None:
+        return None
+    return StatementCache(get_abs_path(STATEMENT_CACHE_DIR), PARSER_VERSION, STATEMENT_CACHE_MAX_BYTES)
+
+
+def ticker_resolver():
+    """Get the resolver of renamed tickers, which changes nothing if no renames are configured"""
+    if TICKER_REVISIONS_CSV is None:
+        return TickerResolver([])
+    return TickerResolver.from_csv(get_abs_path(TICKER_REVISIONS_CSV))
+        
+        
+def load_ticker_index(statements):
+    """
+    Load the saved ticker index if it was built from the same statement files and
+    ticker renames, otherwise build it from the statements and save it
+    """
+    path = get_abs_path(TICKER_INDEX_PATH)
+    sources = list(statements)
+    if TICKER_REVISIONS_CSV is not None:
+        sources.append(get_abs_path(TICKER_REVISIONS_CSV))
+    source = files_stat_digest(sources)
+    
+    ticker_index = TickerIndex.load_fresh(path, source)
+    if ticker_index is not None:
+        log_system.info(f"Ticker index loaded from {path}")
+        return ticker_index
+    
+    ticker_index = TickerIndex.from_statements(statements.values())
+    ticker_index.source = source
+    ticker_index.save(path)
+    return ticker_index
         
         
 # /////////////////////////////////////////////////////////////////////////////   
@@ -74,6 +213,17 @@ def output_net_asset_values(statements):
         log_output.info(f"Dividend Accruals = {statement.net_asset_values.NAV_dividend_accruals}")
         log_output.info(f"TOTAL = {statement.net_asset_values.total}")
 
+def output_nav_history(statements):
+    history = NAVHistory.from_statements(statements)
+    for account, series in [*history.accounts.items(), ('CONSOLIDATED', history.consolidated())]:
+        if len(series) < 2:
+            continue
+        drawdown, peak, trough = series.max_drawdown()
+        log_output.info(f"NAV HISTORY FOR {account} FROM {series.dates[0]} TO {series.dates[-1]} ({len(series)} POINTS):")
+        # No deposits or withdrawals are given, so this is the simple change in NAV, not a time-weighted return
+        log_output.info(f"NAV return (not adjusted for deposits or withdrawals) = {series.time_weighted_return():.2%}")
+        log_output.info(f"Max drawdown = {drawdown:.2%} from {peak:%Y-%m-%d} to {trough:%Y-%m-%d}")
+
         
    
 
@@ -83,3 +233,44 @@ def output_net_asset_values(statements):
 
 
 
+
+def output_position_changes(statements):
+    for change in diff_statement_series(statements):
+        log_output.info(
+            f"POSITION {change.change.upper()} IN ACCOUNT {change.account} AS AT {change.date}: "
+            f"{change.ticker} ({change.currency}) quantity {change.quantity_change:+}"
+        )
+
+def output_quantity_audit(statements, trades_by_account):
+    for (account, date), audited in reconcile_quantities(statements, trades_by_account).items():
+        for item in audited:
+            log_output.info(
+                f"QUANTITY MISMATCH IN ACCOUNT {account} AS AT {date}: {item.ticker} statement "
+                f"{item.statement_quantity:g}, trades {item.trade_quantity:g}, difference {item.difference:+g}"
+            )
+
+def output_base_currency_values(statements, fx_rates):
+    if fx_rates.base_currency is None:
+        return  # No exchange rates were found
+    totals = fx_rates.totals_by_account(PositionTable.from_statements(statements).latest())
+    for account, total in totals.items():
+        log_output.info(f"VALUE OF OPEN POSITIONS IN ACCOUNT {account} = {total:,.2f} {fx_rates.base_currency}")
+    log_output.info(f"CONSOLIDATED VALUE OF OPEN POSITIONS = {sum(totals.values()):,.2f} {fx_rates.base_currency}")
+
+def output_capital_gains(cgt):
+    for match in cgt.matches():
+        log_output.info(
+            f"DISPOSAL OF {match.quantity:g} {match.ticker} ON {match.disposal_date} MATCHED BY {match.rule.upper()}"
+            + (f" WITH {match.acquisition_date}" if match.acquisition_date else "")
+            + f": proceeds {match.proceeds:,.2f}, cost {match.cost:,.2f}, gain {match.gain:,.2f}"
+        )
+    for tax_year, gain in cgt.gains_by_tax_year().items():
+        log_output.info(f"NET GAIN IN TAX YEAR {tax_year} = {gain:,.2f} {CGT_CURRENCY}")
+    for pool in cgt.pools().values():
+        if pool.quantity:
+            log_output.info(f"SECTION 104 POOL OF {pool.ticker} = {pool.quantity:g} at cost {pool.cost:,.2f} {CGT_CURRENCY}")
+    for trade in cgt.unconverted:
+        log_output.info(
+            f"TRADE OF {trade.quantity:g} {trade.ticker} ON {trade.tradedate:%Y-%m-%d} NOT MATCHED: "
+            f"no {trade.currency}/{CGT_CURRENCY} exchange rate"
+        )
@@ -0,0 +1,99 @@
+# /////////////////////////////////////////////////////////////////////////////
+# STATEMENT INGESTION
+#  
+# This module specifies the settings used when reading IBKR statements from the
+# statement directory.
+#
+#   1. INGESTION_WORKERS: Number of worker processes used to parse statements
+#           (1 parses every file sequentially in the main process,
+#           None uses one worker per CPU)
+#   2. INGESTION_CHUNK_SIZE: Number of files dispatched to a worker at a time
+#   3. STATEMENT_CACHE_DIR: Relative path of directory to cache parsed statements
+#           (None disables the cache)
+#   4. STATEMENT_CACHE_MAX_BYTES: Size cap of the statement cache, the least
+#           recently used statements are evicted beyond it
+#   5. INGESTION_LATEST_ONLY: Only parse the latest statement in each account,
+#           selected by reading the top of each statement file
+#   6. WATCH_STATEMENTS: Keep watching the statement directory while the web
+#           pages are displayed, re-parsing new or changed statements (each
+#           refresh applies DEDUP_PRECEDENCE and INGESTION_LATEST_ONLY)
+#   7. WATCH_INTERVAL: Seconds between polls of the statement directory
+#   8. STATEMENT_DB_PATH: Relative path of the SQLite database that parsed
+#           statements are written to (None disables the database)
+#   9. INGESTION_ASYNC: Read and parse statements through the asyncio pipeline,
+#           overlapping file reads with parsing (applies the statement cache,
+#           INGESTION_LATEST_ONLY and DEDUP_PRECEDENCE as the synchronous loader)
+#   10. ASYNC_CONCURRENCY: Number of files read concurrently by the pipeline
+#   11. ASYNC_QUEUE_DEPTH: Maximum number of files waiting between pipeline
+#           stages, bounding the memory held by files read but not yet parsed
+#   12. DEDUP_PRECEDENCE: Drop duplicate files and statements of the same
+#           account and period end before parsing, keeping the statement chosen
+#           by this rule: 'longest' period, 'shortest' period, 'newest' file or
+#           'first' file path (None parses every file)
+#   13. TICKER_INDEX_PATH: Relative path of the file that the inverted index of
+#           positions by ticker is saved to, and reloaded from at startup
+#           while the statement files are unchanged (None disables the index)
+#   14. BASE_CURRENCY: Currency that holdings are valued in (None uses the base
+#           currency of the statements)
+#   15. FX_RATES_CSV: Relative path of a headerless CSV file of date,currency,rate
+#           rows giving the amount of BASE_CURRENCY per unit of each currency
+#           (None reads the exchange rates in the statements)
+#   16. CGT_CURRENCY: Currency that capital gains are computed in, converting
+#           trades at the exchange rates in the statements on the trade date
+#   17. TICKER_REVISIONS_CSV: Relative path of a headerless CSV file of
+#           date,original,revised,reason rows recording renamed tickers, which
+#           are resolved to their current tickers on ingestion (None keeps the
+#           tickers as reported)
+#
+# /////////////////////////////////////////////////////////////////////////////
+
+# Number of worker processes used to parse statements
+INGESTION_WORKERS = 1
+
+# Number of files dispatched to a worker process at a time
+INGESTION_CHUNK_SIZE = 4
+
+# Relative path of directory to cache parsed statements
+STATEMENT_CACHE_DIR = 'cache/statements'
+
+# Size cap of the statement cache
+STATEMENT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
+# Only parse the latest statement in each account
+INGESTION_LATEST_ONLY = False
+
+# Watch the statement directory for new or changed statements
+WATCH_STATEMENTS = False
+
+# Seconds between polls of the statement directory
+WATCH_INTERVAL = 5.0
+
+# Relative path of the SQLite database of parsed statements
+STATEMENT_DB_PATH = 'cache/statements.db'
+
+# Read and parse statements through the asyncio pipeline
+INGESTION_ASYNC = False
+
+# Number of files read concurrently by the asyncio pipeline
+ASYNC_CONCURRENCY = 4
+
+# Maximum number of files waiting between asyncio pipeline stages
+ASYNC_QUEUE_DEPTH = 8
+
+# Rule choosing between statements of the same account and period end
+DEDUP_PRECEDENCE = 'longest'
+
+# Relative path of the saved inverted index of positions by ticker
+TICKER_INDEX_PATH = 'cache/ticker_index.npz'
+
+# Currency that holdings are valued in
+BASE_CURRENCY = None
+
+# Relative path of a CSV file of exchange rates into the base currency
+FX_RATES_CSV = None
+
+# Currency that UK capital gains are computed in
+CGT_CURRENCY = 'GBP'
+
+# Relative path of a CSV file of ticker renames
+TICKER_REVISIONS_CSV = None
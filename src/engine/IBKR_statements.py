@@ -1,138 +1,658 @@
-from typing import List
-from datetime import datetime
-from src.engine.data_structures import OpenPosition, OpenAccrual, Statement, NetAssetValue
-from src.file_IO.read_files import read_csv_headerless_UTF8
+import csv
+import io
+import multiprocessing
+from sys import intern
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from src.engine.conversions import parse_iso_date, parse_long_date, parse_trade_datetime, to_decimal
+from src.engine.data_structures import OpenPosition, OpenAccrual, Statement, NetAssetValue, StatementHeader
+from src.engine.section_dispatch import SectionHandler, SectionDispatcher, HeaderDrivenHandler
+from src.engine.statement_cache import StatementCache
+from src.engine.statement_dedup import dedup_statements
+from src.file_IO.read_files import iter_csv_headerless_UTF8
 from src.file_IO.filepaths import get_filepaths
+from src.file_IO.fingerprints import file_stat_fingerprint
+from src.file_IO.section_offsets import iter_section_rows
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+from src.sandbox.data_structures import Trade
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# Version of the statement parser. Increment whenever a change to the parsing
+# functions or data structures would alter the Statements produced, so that
+# statements cached by an earlier version are discarded.
+PARSER_VERSION = 4
+
+# Extensions of the statement files read from the statement directory
+STATEMENT_EXTENSIONS = ('.csv',)
+
+# Sections of a statement file read to build a Statement
+STATEMENT_SECTIONS = (
+    'Statement', 'Account Information', 'Net Asset Value', 'Open Positions', 'Open Dividend Accruals',
+    'Base Currency Exchange Rate', 'Trades'
+)
+
+# Maximum number of rows read when looking for the Statement and Account
+# Information rows at the top of a statement file
+HEADER_ROW_LIMIT = 100
+
+# Statement files of at least this size are read through a memory-mapped
+# byte-offset index of their sections, decoding only the sections needed
+SECTION_INDEX_MIN_BYTES = 4 * 1024 * 1024  # 4MB
 
   
 # /////////////////////////////////////////////////////////////////////////////    
 # FUNCTIONS TO READ IBKR STATEMENTS ISAVED LOCALLY IN CSV FORM
 
-def process_ibkr_statements_directory(statements_directory: str) -> List[Statement]:
+def process_ibkr_statements_directory(
+    statements_directory: str,
+    workers: Optional[int] = 1,
+    chunk_size: int = 1,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    dedup_precedence: Optional[str] = None
+) -> List[Statement]:
     """Process all IBKR statement files in the given directory and subdirectories
     
+    Statements are returned in the same order as their file paths, whether they
+    are parsed sequentially or in parallel. A file that fails to parse is logged
+    and skipped without stopping the rest of the batch.
+    
     Args:
         statements_directory: Path to parent directory containing IBKR statement files
+        workers: Number of worker processes (1 parses sequentially, None uses one per CPU)
+        chunk_size: Number of files dispatched to a worker process at a time
+        cache: Cache of previously parsed statements, only new or changed files are parsed
+        latest_only: Only parse the statement with the latest period end in each account
+        date_from: Ignore statements with a period ending before this date (latest_only mode)
+        date_to: Ignore statements with a period ending after this date (latest_only mode)
+        dedup_precedence: Drop duplicate and overlapping statements before parsing,
+            keeping overlaps by this rule in statement_dedup.PRECEDENCE_RULES
+            (None parses every file)
     Returns:
         List of parsed Statement objects
     """
-    statements = []
-    filepaths = get_filepaths(statements_directory)    
+    return list(load_ibkr_statements_directory(
+        statements_directory, workers, chunk_size, cache, latest_only, date_from, date_to, dedup_precedence
+    ).values())
+
+
+def load_ibkr_statements_directory(
+    statements_directory: str,
+    workers: Optional[int] = 1,
+    chunk_size: int = 1,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    dedup_precedence: Optional[str] = None
+) -> Dict[str, Statement]:
+    """
+    Process all IBKR statement files in the given directory and subdirectories,
+    returning the parsed Statements keyed by file path in file path order.
+    Takes the same arguments as process_ibkr_statements_directory.
+    """
+    filepaths = select_statement_filepaths(statements_directory, latest_only, date_from, date_to, dedup_precedence)
+    return load_ibkr_statements(filepaths, workers, chunk_size, cache)
+
+
+def select_statement_filepaths(
+    statements_directory: str,
+    latest_only: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    dedup_precedence: Optional[str] = None
+) -> List[str]:
+    """
+    Get the paths of the statement files in a directory and its subdirectories that
+    are to be loaded, after dropping duplicates and selecting the latest statements
+    as requested. Takes the same arguments as process_ibkr_statements_directory.
+    """
+    filepaths = get_filepaths(statements_directory, extensions=STATEMENT_EXTENSIONS, archives=True)
+    headers = None
+    if latest_only or dedup_precedence is not None:
+        headers = read_statement_headers(filepaths)
+    return select_statements(filepaths, headers, latest_only, date_from, date_to, dedup_precedence)
+
+
+def select_statements(
+    filepaths: List[str],
+    headers: Optional[Dict[str, StatementHeader]],
+    latest_only: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    dedup_precedence: Optional[str] = None,
+    content_hashes: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """
+    Select the statement files to load from headers already read, dropping
+    duplicates and selecting the latest statements as requested
+
+    Args:
+        filepaths: Paths of the statement files
+        headers: Statement headers keyed by file path, see read_statement_headers
+            (None reads them if needed)
+        content_hashes: Content hashes of the files, reused and filled in by
+            dedup_statements
+        Other arguments as process_ibkr_statements_directory
+    Returns:
+        The selected file paths, in the order given
+    """
+    if dedup_precedence is not None:
+        if headers is None:
+            headers = read_statement_headers(filepaths)
+        report = dedup_statements(filepaths, headers, dedup_precedence, content_hashes)
+        report.log()
+        filepaths = report.kept
+        
+    if latest_only:
+        filepaths = latest_statement_filepaths(filepaths, date_from, date_to, headers)
+        log_system.info(f"Latest statements selected for {len(filepaths)} accounts")
+        
+    return filepaths
+
+
+def load_ibkr_statements(
+    filepaths: List[str],
+    workers: Optional[int] = 1,
+    chunk_size: int = 1,
+    cache: Optional[StatementCache] = None
+) -> Dict[str, Statement]:
+    """
+    Load the Statements for a list of statement files from the cache where possible,
+    parsing the rest. Files that fail to parse are logged and left out.
+    
+    Returns:
+        Dictionary of Statements keyed by file path, in file path order
+    """
+    statements = cache.get_many(filepaths) if cache is not None else {}
+    pending = [filepath for filepath in filepaths if filepath not in statements]
+    
+    if statements:
+        log_system.info(f"{len(statements)} statements loaded from cache, {len(pending)} to parse")
     
-    for filepath in filepaths:       
-        statements.append(parse_ibkr_statement(filepath))
+    failures = 0
+    index_dir = cache.sections_dir if cache is not None else None
+    for filepath, statement, error in parse_ibkr_statements(pending, workers, chunk_size, index_dir):
+        if error is not None:
+            failures += 1
+            continue
+        statements[filepath] = statement
+        if cache is not None:
+            cache.put(filepath, statement)
+    
+    if cache is not None:
+        cache.save()
+    
+    if failures:
+        log_error.warning(f"{failures} of {len(filepaths)} statements failed to parse and were skipped")
+
+    return {filepath: statements[filepath] for filepath in filepaths if filepath in statements}
+
 
-    return statements
+def latest_statement_filepaths(
+    filepaths: List[str],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    headers: Optional[Dict[str, StatementHeader]] = None
+) -> List[str]:
+    """
+    Get the file paths of the latest statement in each account from the statement
+    headers alone, keeping the order of the file paths. Files whose header cannot
+    be read are logged and skipped. Headers already read can be passed in.
+    """
+    if headers is None:
+        headers = read_statement_headers(filepaths)
+    candidates = [headers[filepath] for filepath in filepaths if filepath in headers]
+    
+    selected = {header.filepath for header in select_latest_statements(candidates, date_from, date_to)}
+    return [filepath for filepath in filepaths if filepath in selected]
+
+
+def read_statement_headers(filepaths: List[str]) -> Dict[str, StatementHeader]:
+    """Read the headers of statement files keyed by file path, logging and leaving out unreadable files"""
+    headers = {}
+    for filepath in filepaths:
+        try:
+            headers[filepath] = read_statement_header(filepath)
+        except exceptions.BaseError:
+            continue
+    return headers
+
+
+def select_latest_statements(
+    headers: List[StatementHeader],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> List[StatementHeader]:
+    """
+    Select the statement with the latest period end in each account, optionally
+    restricted to statements with a period ending within a date range. Where two
+    statements end on the same date, the one covering the longer period is kept.
+    """
+    latest = {}
+    for header in headers:
+        if date_from is not None and header.period_end < date_from:
+            continue
+        if date_to is not None and header.period_end > date_to:
+            continue
+        
+        current = latest.get(header.account)
+        if current is None or statement_recency(header) > statement_recency(current):
+            latest[header.account] = header
+    
+    return list(latest.values())
+
+
+def statement_recency(header: StatementHeader) -> Tuple[datetime, timedelta]:
+    """Sort key ranking statements by period end, then by length of period"""
+    return header.period_end, header.period_end - header.period_start
+
+
+def read_statement_header(filepath: str) -> StatementHeader:
+    """
+    Read the account number and statement period from the Statement and Account
+    Information rows at the top of a statement file, without reading the rest of it
+    """
+    period = StatementDateHandler()
+    account = AccountNumberHandler()
+    handlers = {period.section: period, account.section: account}
+    rows = iter_csv_headerless_UTF8(filepath)
+    
+    try:
+        for count, row in enumerate(rows):
+            handler = handlers.get(row[0]) if len(row) >= 2 else None
+            if handler is not None:
+                handler.handle(row)
+            if period.period is not None and account.account is not None:
+                return StatementHeader(filepath, account.account, *period.period)
+            if count >= HEADER_ROW_LIMIT:
+                break
     
+    except exceptions.BaseError:
+        raise
     
-def parse_ibkr_statement(filepath: str) -> Statement:
-    """Parse an IBKR statement file and extract statement data into a Statement object"""        
-    data = read_csv_headerless_UTF8(filepath)
+    except Exception as err:
+        raise exceptions.StatementParseError(filepath, err)
     
-    date = get_statement_date(data) 
-    account = get_account_number(data)     
-    open_positions = get_open_positions(data)
-    open_accruals = get_dividend_accruals(data) 
-    net_asset_value = get_NAV_data(data)      
+    finally:
+        rows.close()
     
-    return Statement(date, account, open_positions, open_accruals, net_asset_value)
+    raise exceptions.StatementParseError(filepath, ValueError("Statement period or account not found"))
 
 
-def filter_list_of_lists(data, target, index=0):
-    """Removes sublists from a list of lists where the first item in the sub-list is not equal to target"""
-    return [sublist for sublist in data if sublist and sublist[index] == target]
+def parse_ibkr_statements(
+    filepaths: List[str],
+    workers: Optional[int] = 1,
+    chunk_size: int = 1,
+    index_dir: Optional[str] = None
+) -> List[Tuple[str, Optional[Statement], Optional[str]]]:
+    """
+    Parse IBKR statement files sequentially or in a process pool, keeping the order of the file paths
+    
+    Args:
+        index_dir: Directory of the cached section indexes of large files (None keeps no index)
+    Returns:
+        List of (file path, Statement or None, error message or None) tuples
+    """
+    parse = partial(parse_ibkr_statement_safely, index_dir=index_dir)
+    if workers == 1 or len(filepaths) < 2:
+        return list(map(parse, filepaths))
+    
+    with statement_process_pool(workers) as pool:
+        return list(pool.map(parse, filepaths, chunksize=chunk_size))
+
+
+def statement_process_pool(workers: Optional[int]) -> ProcessPoolExecutor:
+    """
+    Create a process pool for parsing statements. Worker processes are forked where
+    possible so that they inherit the initialised logging system rather than
+    re-importing it, which would wipe the log directory.
+    """
+    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def parse_ibkr_statement_safely(filepath: str, index_dir: Optional[str] = None) -> Tuple[str, Optional[Statement], Optional[str]]:
+    """
+    Parse an IBKR statement file, capturing any error instead of raising it.
+    Only the compact Statement is returned so that worker processes never send
+    the raw statement rows back to the parent process.
+    
+    Returns:
+        Tuple of (file path, Statement or None, error message or None)
+    """
+    try:
+        return filepath, parse_ibkr_statement(filepath, index_dir), None
+    except exceptions.BaseError as err:
+        return filepath, None, str(err)
+    
+    
+def parse_ibkr_statement_text_safely(text: str, source: str) -> Tuple[str, Optional[Statement], Optional[str]]:
+    """Parse the decoded text of an IBKR statement file, capturing any error as parse_ibkr_statement_safely does"""
+    try:
+        return source, parse_ibkr_statement_text(text, source), None
+    except exceptions.BaseError as err:
+        return source, None, str(err)
+    
+    
+def parse_ibkr_statement(filepath: str, index_dir: Optional[str] = None) -> Statement:
+    """
+    Parse an IBKR statement file and extract statement data into a Statement object.
+    Rows are streamed from the file straight to the section handlers, so rows from
+    sections that are not needed (e.g. Transfers) are discarded as soon as they are read.
+    The section index of a large file is cached in index_dir if given.
+    """        
+    return parse_ibkr_statement_rows(read_statement_rows(filepath, STATEMENT_SECTIONS, index_dir), filepath)
+
+
+def parse_ibkr_statement_text(text: str, source: str) -> Statement:
+    """Parse the already decoded text of an IBKR statement file into a Statement object"""
+    return parse_ibkr_statement_rows(csv.reader(io.StringIO(text, newline='')), source)
+
+
+def parse_ibkr_statement_rows(rows: Iterable[List[str]], source: str) -> Statement:
+    """
+    Dispatch the rows of an IBKR statement to the section handlers and build a Statement object
+    
+    Args:
+        rows: Rows of the statement, read lazily
+        source: Path of the statement file, used in error messages
+    Raises:
+        StatementParseError: If the rows cannot be parsed, or have no Statement Period or Account
+    """
+    date = StatementDateHandler()
+    account = AccountNumberHandler()
+    open_positions = OpenPositionsHandler()
+    open_accruals = DividendAccrualsHandler()
+    net_asset_value = NAVHandler()
+    base_currency = BaseCurrencyHandler()
+    fx_rates = FXRatesHandler()
+    trades = TradesHandler()
+    dispatcher = SectionDispatcher([
+        date, account, open_positions, open_accruals, net_asset_value, base_currency, fx_rates, trades
+    ])
+    
+    try:
+        dispatcher.dispatch(rows)
+        if date.result() is None or account.result() is None:
+            raise ValueError("Statement period or account not found")
+        
+        return Statement(
+            date.result(),
+            account.result(),
+            open_positions.result(),
+            open_accruals.result(),
+            net_asset_value.result(),
+            base_currency.result(),
+            fx_rates.result(),
+            trades.result()
+        )
+    
+    except exceptions.BaseError:
+        raise
+    
+    except Exception as err:
+        raise exceptions.StatementParseError(source, err)
+
+
+def read_statement_rows(filepath: str, sections: List[str], index_dir: Optional[str] = None) -> Iterator[List[str]]:
+    """
+    Stream the rows of a statement file. Large files are read through their section
+    index so that only the byte ranges of the requested sections are decoded, and
+    large archived files are streamed keeping only the requested sections.
+    """
+    if file_stat_fingerprint(filepath)[0] >= SECTION_INDEX_MIN_BYTES:
+        return iter_section_rows(filepath, sections, index_dir)
+    return iter_csv_headerless_UTF8(filepath)
+
+
+def read_ibkr_section(filepath: str, handler: SectionHandler, index_dir: Optional[str] = None) -> Any:
+    """
+    Read a single section of a statement file, e.g. read_ibkr_section(path, NAVHandler()),
+    decoding only that section's byte range located through the section index, which
+    is cached in index_dir if given
+    """
+    for row in iter_section_rows(filepath, [handler.section], index_dir):
+        handler.handle(row)
+    return handler.result()
+
+
+def collect_statement_trades(
+    statements: Iterable[Statement],
+    covered: Optional[Set[Tuple[str, date]]] = None
+) -> Dict[str, List[Trade]]:
+    """
+    Group the trades parsed with each statement by account. Overlapping statements
+    report the same trades, so each (account, trade day) is taken from the first
+    statement that reports it and ignored in the rest. Separate fills on a day,
+    even with identical details, are all kept.
+    
+    Args:
+        statements: Statements in order of precedence
+        covered: (account, trade day) pairs already collected, updated in place
+            so trades can be collected over several calls
+    Returns:
+        Dictionary of trades keyed by account
+    """
+    covered = set() if covered is None else covered
+    trades_by_account = {}
+    for statement in statements:
+        days = {}
+        for trade in statement.trades or ():
+            days.setdefault(trade.tradedate.date(), []).append(trade)
+        for day, trades in days.items():
+            if (statement.account, day) not in covered:
+                covered.add((statement.account, day))
+                trades_by_account.setdefault(statement.account, []).extend(trades)
+    return trades_by_account
 
 
 # /////////////////////////////////////////////////////////////////////////////   
-# FUNCTIONS TO GET SPECIFIC INFORMATION FROM THE STATEMENT DATA READ FROM CSV FILES
+# SECTION HANDLERS CONVERTING STATEMENT ROWS AS THEY ARE READ
+#
+# Account, ticker and currency strings are interned so that the records of every
+# statement share a single copy of each identifier.
 
-def get_account_number(data: List[List[str]]) -> str:    
+class AccountNumberHandler(SectionHandler):
     """Get the Account number from the Account rows"""
-    filtered = filter_list_of_lists(data, "Account Information")
-    for row in filtered: 
-        if row[2] == 'Account':
-            return row[3]
+    section = "Account Information"
+    
+    def __init__(self):
+        self.account = None
+        
+    def handle(self, row: List[str]) -> None:
+        if row[1] == 'Data' and row[2] == 'Account' and self.account is None:
+            self.account = intern(row[3])
+            
+    def result(self) -> str:
+        return self.account
+
+
+class BaseCurrencyHandler(SectionHandler):
+    """Get the base currency of the account from the Account rows"""
+    section = "Account Information"
+    
+    def __init__(self):
+        self.base_currency = None
+        
+    def handle(self, row: List[str]) -> None:
+        if row[1] == 'Data' and row[2] == 'Base Currency' and self.base_currency is None:
+            self.base_currency = intern(row[3])
+            
+    def result(self) -> str:
+        return self.base_currency
+
+
+class StatementDateHandler(SectionHandler):
+    """
+    Get a datetime date from the Statement rows (string format September 10, 2025).
+    For statements covering several days the date is the end of the period.
+    """
+    section = "Statement"
+    
+    def __init__(self):
+        self.period = None
+        
+    def handle(self, row: List[str]) -> None:
+        if row[1] == 'Data' and row[2] == 'Period' and self.period is None:
+            self.period = parse_statement_period(row[3])
+            
+    def result(self) -> datetime:
+        return self.period[1] if self.period is not None else None
 
 
-def get_statement_date(data: List[List[str]]) -> datetime:    
-    """Get a datetime date from the Statement rows (string format September 10, 2025)"""
-    filtered = filter_list_of_lists(data, "Statement")
-    for row in filtered: 
-        if row[2] == 'Period':
-            return datetime.strptime(row[3], "%B %d, %Y")
+def parse_statement_period(period: str) -> Tuple[datetime, datetime]:
+    """
+    Get the start and end dates of a statement period, which is either a single date
+    (September 10, 2025) or a range (January 1, 2025 - September 10, 2025)
+    """
+    start, _, end = period.partition(' - ')
+    start_date = parse_long_date(start)
+    end_date = parse_long_date(end) if end else start_date
+    return start_date, end_date
 
 
-def get_NAV_data(data: List[List[str]]) -> NetAssetValue:
+class NAVHandler(HeaderDrivenHandler):
     """Construct a NetAssetValue object from the Net Asset Value rows"""
-    filtered = filter_list_of_lists(data, "Net Asset Value")
-    
-    NAV_cash = 0
-    NAV_stock = 0
-    NAV_options = 0
-    NAV_bonds = 0
-    NAV_interest_accruals = 0
-    NAV_dividend_accruals = 0
+    section = "Net Asset Value"
+    columns = ('Asset Class', 'Current Total')
+    optional_headers = ('Time Weighted Rate of Return',)
+    
+    def __init__(self):
+        super().__init__()
+        self.NAV_cash = 0
+        self.NAV_stock = 0
+        self.NAV_options = 0
+        self.NAV_bonds = 0
+        self.NAV_interest_accruals = 0
+        self.NAV_dividend_accruals = 0
         
-    for row in filtered:        
-        match row[2].rstrip():
+    def handle_values(self, asset_class: str, current_total: str) -> None:
+        match asset_class.rstrip():
             case 'Cash':
-                NAV_cash = row[6]
+                self.NAV_cash = current_total
             case 'Stock':
-                NAV_stock = row[6]
+                self.NAV_stock = current_total
             case 'Options':
-                NAV_options = row[6]
+                self.NAV_options = current_total
             case 'Bonds':
-                NAV_bonds = row[6]
+                self.NAV_bonds = current_total
             case 'Interest Accruals':
-                NAV_interest_accruals = row[6]
+                self.NAV_interest_accruals = current_total
             case 'Dividend Accruals':
-                NAV_dividend_accruals = row[6]           
+                self.NAV_dividend_accruals = current_total           
                 
-    return NetAssetValue(
-        NAV_cash,
-        NAV_stock,
-        NAV_options,
-        NAV_bonds,
-        NAV_interest_accruals,
-        NAV_dividend_accruals
-        )
-   
-   
-def get_open_positions(data: List[List[str]]) -> List[OpenPosition]:    
-    """Get the open positions from the Account rows"""
-    filtered = filter_list_of_lists(data, "Open Positions")
-    open_positions = []
-    for row in filtered: 
-        if row[2] == 'Summary':
-            position = OpenPosition(
-                ticker=row[5],
-                quantity=row[6],
-                price=row[10],
-                value=row[11],
-                currency=row[4]
-            )
-            open_positions.append(position)
-    
-    return open_positions
-
-
-def get_dividend_accruals(data: List[List[str]]) -> List[OpenAccrual]:    
-    """Get the open dividend accruals from the Account rows"""
-    filtered = filter_list_of_lists(data, "Open Dividend Accruals")
-    open_accruals = []
-    for row in filtered: 
-        if row[7] != 'Quantity' and row[7] != '':
-            accrual = OpenAccrual(
-                ticker=row[4],
-                quantity=row[7],
-                gross_amount=row[11],
-                net_amount=row[12],
-                withholding_tax=row[8],
-                amount_per_share=row[10],
-                ex_date=datetime.strptime(row[5], '%Y-%m-%d'),
-                pay_date=datetime.strptime(row[6], '%Y-%m-%d'),
-                currency=row[3],         
+    def result(self) -> NetAssetValue:
+        return NetAssetValue(
+            self.NAV_cash,
+            self.NAV_stock,
+            self.NAV_options,
+            self.NAV_bonds,
+            self.NAV_interest_accruals,
+            self.NAV_dividend_accruals
             )
-            open_accruals.append(accrual)
+
+
+class OpenPositionsHandler(HeaderDrivenHandler):
+    """Get the open positions from the Summary rows of the Open Positions section"""
+    section = "Open Positions"
+    columns = ('DataDiscriminator', 'Asset Category', 'Symbol', 'Quantity', 'Close Price', 'Value', 'Currency')
+    
+    def __init__(self):
+        super().__init__()
+        self.open_positions = []
+        
+    def handle_values(self, discriminator, category, ticker, quantity, price, value, currency) -> None:
+        if discriminator == 'Summary':
+            self.open_positions.append(OpenPosition(
+                intern(ticker), quantity, price, value, intern(currency), asset_category=intern(category)
+            ))
+    
+    def result(self) -> List[OpenPosition]:
+        return self.open_positions
+
+
+class DividendAccrualsHandler(HeaderDrivenHandler):
+    """Get the open dividend accruals from the Open Dividend Accruals rows"""
+    section = "Open Dividend Accruals"
+    columns = ('Symbol', 'Quantity', 'Gross Amount', 'Net Amount', 'Tax', 'Gross Rate', 'Ex Date', 'Pay Date', 'Currency')
+    
+    def __init__(self):
+        super().__init__()
+        self.open_accruals = []
+        
+    def handle_values(self, ticker, quantity, gross, net, tax, per_share, ex_date, pay_date, currency) -> None:
+        if quantity != '':  # Total rows have no quantity
+            self.open_accruals.append(OpenAccrual(
+                intern(ticker), quantity, gross, net, tax, per_share,
+                parse_iso_date(ex_date), parse_iso_date(pay_date), intern(currency)
+            ))
+    
+    def result(self) -> List[OpenAccrual]:
+        return self.open_accruals
+
+
+class FXRatesHandler(HeaderDrivenHandler):
+    """Get the amount of base currency per unit of each currency from the Base Currency Exchange Rate rows"""
+    section = "Base Currency Exchange Rate"
+    columns = ('Currency', 'Rate')
+    
+    def __init__(self):
+        super().__init__()
+        self.rates = {}
+        
+    def handle_values(self, currency, rate) -> None:
+        self.rates[intern(currency)] = to_decimal(rate)
+    
+    def result(self) -> Dict[str, Decimal]:
+        return self.rates
+
+
+class TradesHandler(HeaderDrivenHandler):
+    """
+    Get the share trades from the Order rows of the Trades section. Proceeds are
+    negative for purchases, and commissions are negative, as in the statement.
+    """
+    section = "Trades"
+    columns = ('DataDiscriminator', 'Asset Category', 'Symbol', 'Date/Time', 'Quantity', 'T. Price', 'Proceeds', 'Comm/Fee', 'Currency', 'Code')
+    
+    def __init__(self, first_ID: int = 1):
+        super().__init__()
+        self.next_ID = first_ID
+        self.trades = []
+        
+    def handle_values(self, discriminator, category, ticker, date_time, quantity, price, proceeds, commission, currency, code) -> None:
+        if discriminator != 'Order' or category != 'Stocks':
+            return
+        traded_at = parse_trade_datetime(date_time)
+        quantity = float(to_decimal(quantity))
+        proceeds = float(to_decimal(proceeds))
+        commission = float(to_decimal(commission))
+        self.trades.append(Trade(
+            tradeID=self.next_ID,
+            tradedate=traded_at,
+            reportdate=traded_at.replace(hour=0, minute=0, second=0, microsecond=0),
+            ticker=intern(ticker),
+            trantype='BUY' if quantity > 0 else 'SELL',
+            quantity=quantity,
+            currency=intern(currency),
+            amt_before_costs=proceeds,
+            costs=commission,
+            amt_after_costs=proceeds + commission,
+            price=float(to_decimal(price)),
+            broker='IBKR',
+            notes=code
+        ))
+        self.next_ID += 1
     
-    return open_accruals
+    def result(self) -> List[Trade]:
+        return self.trades
@@ -0,0 +1,233 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Optional, Tuple
+from src.engine.data_structures import Statement
+from src.engine.IBKR_statements import parse_ibkr_statement_text_safely, select_statement_filepaths, statement_process_pool
+from src.engine.statement_cache import StatementCache
+from src.file_IO.read_files import read_text_UTF8
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# ASYNCIO INGESTION PIPELINE FOR IBKR STATEMENTS
+#
+# On slow or network-mounted storage, reading statement files is dominated by
+# I/O wait. This pipeline overlaps the reads of upcoming files with the parsing
+# of files already read. Its stages are joined by bounded queues:
+#
+#   discovery -> path queue -> readers (thread executor) -> text queue
+#             -> parsers (thread or process executor) -> result queue -> caller
+#
+# The bounded queues limit how many decoded files are held in memory at once.
+# Duplicate statements are dropped and the latest statements selected during
+# discovery, as in the synchronous loader, so that only the kept files are read.
+# Statements found in the cache are passed straight to the caller, and newly
+# parsed statements are added to the cache, which is saved once all have parsed.
+# Statements are yielded in the order they finish parsing, not in file path
+# order. Files that fail to read or parse are logged and skipped.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Marks the end of the items on a queue
+END = None
+
+
+async def aiter_ibkr_statements(
+    statements_directory: str,
+    concurrency: int = 4,
+    queue_depth: int = 8,
+    workers: Optional[int] = 1,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    dedup_precedence: Optional[str] = None
+) -> AsyncIterator[Statement]:
+    """
+    Asynchronously stream the parsed Statements of all IBKR statement files in a
+    directory and its subdirectories
+
+    Args:
+        statements_directory: Path to parent directory containing IBKR statement files
+        concurrency: Number of files read concurrently
+        queue_depth: Maximum number of items waiting between pipeline stages
+        workers: Number of worker processes parsing statements (1 parses in a thread,
+            None uses one per CPU)
+        cache: Cache of previously parsed statements, only new or changed files are read
+        latest_only: Only read the statement with the latest period end in each account
+        dedup_precedence: Drop duplicate and overlapping statements before reading,
+            keeping overlaps by this rule in statement_dedup.PRECEDENCE_RULES
+            (None reads every file)
+    Yields:
+        Statement objects, in the order they finish parsing
+    """
+    async for _, statement in aiter_ibkr_statement_files(
+        statements_directory, concurrency, queue_depth, workers, cache, latest_only, dedup_precedence
+    ):
+        yield statement
+
+
+async def load_ibkr_statements_directory_async(
+    statements_directory: str,
+    concurrency: int = 4,
+    queue_depth: int = 8,
+    workers: Optional[int] = 1,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    dedup_precedence: Optional[str] = None
+) -> Dict[str, Statement]:
+    """
+    Load the Statements of all IBKR statement files in a directory through the
+    asyncio pipeline, returning them keyed by file path in file path order.
+    Takes the same arguments as aiter_ibkr_statements.
+    """
+    statements = {}
+    async for filepath, statement in aiter_ibkr_statement_files(
+        statements_directory, concurrency, queue_depth, workers, cache, latest_only, dedup_precedence
+    ):
+        statements[filepath] = statement
+    return {filepath: statements[filepath] for filepath in sorted(statements)}
+
+
+async def aiter_ibkr_statement_files(
+    statements_directory: str,
+    concurrency: int = 4,
+    queue_depth: int = 8,
+    workers: Optional[int] = 1,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    dedup_precedence: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Statement]]:
+    """Stream (file path, Statement) pairs through the pipeline, see aiter_ibkr_statements"""
+    loop = asyncio.get_running_loop()
+    workers = workers if workers is not None else os.cpu_count() or 1
+    parsers = max(workers, 1)
+    io_executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='statement-reader')
+    parse_executor = statement_process_pool(workers) if workers > 1 else ThreadPoolExecutor(max_workers=1, thread_name_prefix='statement-parser')
+
+    path_queue = asyncio.Queue(maxsize=queue_depth)
+    text_queue = asyncio.Queue(maxsize=queue_depth)
+    result_queue = asyncio.Queue(maxsize=queue_depth)
+
+    tasks = [
+        asyncio.create_task(discover(
+            loop, io_executor, statements_directory, path_queue, result_queue, concurrency, cache, latest_only, dedup_precedence
+        )),
+        asyncio.create_task(read_all(loop, io_executor, path_queue, text_queue, concurrency, parsers)),
+    ]
+    tasks += [asyncio.create_task(parse(loop, parse_executor, text_queue, result_queue, cache)) for _ in range(parsers)]
+
+    try:
+        finished = 0
+        while finished < parsers:
+            item = await result_queue.get()
+            if item is END:
+                finished += 1
+                continue
+            yield item
+
+        await asyncio.gather(*tasks)
+        if cache is not None:
+            await loop.run_in_executor(io_executor, cache.save)
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        io_executor.shutdown(wait=False, cancel_futures=True)
+        parse_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# PIPELINE STAGES
+
+async def discover(
+    loop: asyncio.AbstractEventLoop,
+    executor: Executor,
+    statements_directory: str,
+    path_queue: asyncio.Queue,
+    result_queue: asyncio.Queue,
+    readers: int,
+    cache: Optional[StatementCache] = None,
+    latest_only: bool = False,
+    dedup_precedence: Optional[str] = None
+) -> None:
+    """
+    Select the statement files and look them up in the cache in a thread, pass cached
+    Statements to the result queue and queue the paths of the others, then one END per reader
+    """
+    try:
+        filepaths = await loop.run_in_executor(
+            executor, partial(select_statement_filepaths, statements_directory, latest_only, dedup_precedence=dedup_precedence)
+        )
+        cached = await loop.run_in_executor(executor, cache.get_many, filepaths) if cache is not None else {}
+        pending = [filepath for filepath in filepaths if filepath not in cached]
+        log_system.info(f"{len(cached)} statements loaded from cache, {len(pending)} queued for asynchronous ingestion")
+        
+        for item in cached.items():
+            await result_queue.put(item)
+        for filepath in pending:
+            await path_queue.put(filepath)
+
+    finally:
+        for _ in range(readers):
+            await path_queue.put(END)
+
+
+async def read_all(
+    loop: asyncio.AbstractEventLoop,
+    executor: Executor,
+    path_queue: asyncio.Queue,
+    text_queue: asyncio.Queue,
+    readers: int,
+    parsers: int
+) -> None:
+    """Run the concurrent readers, then queue one END per parser once they have all finished"""
+    try:
+        await asyncio.gather(*(read(loop, executor, path_queue, text_queue) for _ in range(readers)))
+
+    finally:
+        for _ in range(parsers):
+            await text_queue.put(END)
+
+
+async def read(
+    loop: asyncio.AbstractEventLoop,
+    executor: Executor,
+    path_queue: asyncio.Queue,
+    text_queue: asyncio.Queue
+) -> None:
+    """Read queued files in the thread executor and queue their text until END"""
+    while (filepath := await path_queue.get()) is not END:
+        try:
+            text = await loop.run_in_executor(executor, read_text_UTF8, filepath)
+        except exceptions.BaseError:
+            continue
+        await text_queue.put((filepath, text))
+
+
+async def parse(
+    loop: asyncio.AbstractEventLoop,
+    executor: Executor,
+    text_queue: asyncio.Queue,
+    result_queue: asyncio.Queue,
+    cache: Optional[StatementCache] = None
+) -> None:
+    """
+    Parse queued statement text in the parse executor and queue the Statements, then END.
+    Statements are added to the cache on the event loop thread, so the cache is never
+    updated from two threads at once.
+    """
+    try:
+        while (item := await text_queue.get()) is not END:
+            filepath, text = item
+            _, statement, error = await loop.run_in_executor(executor, parse_ibkr_statement_text_safely, text, filepath)
+            if error is None:
+                if cache is not None:
+                    cache.put(filepath, statement)
+                await result_queue.put((filepath, statement))
+
+    finally:
+        await result_queue.put(END)
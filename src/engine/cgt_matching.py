@@ -0,0 +1,290 @@
+import heapq
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.engine.data_structures import Statement
+from src.engine.fx_rates import FXRates
+from src.engine.IBKR_statements import collect_statement_trades
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+from src.sandbox.data_structures import Trade
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# UK CAPITAL GAINS TAX MATCHING OF SHARE DISPOSALS
+#
+# Disposals of shares are matched with acquisitions of the same ticker under
+# the UK share identification rules, in this order:
+#
+#   1. Same day: acquisitions on the day of the disposal
+#   2. Bed and breakfast: acquisitions in the 30 days after the disposal,
+#      earliest first, with earlier disposals matched first
+#   3. Section 104 pool: the pooled holding at its average cost
+#
+# Any quantity left over (e.g. a short sale) is recorded as unmatched.
+#
+# Each ticker has a TickerLedger holding its trades aggregated by day, since
+# all of a day's trades in one share count as a single transaction. The days
+# are processed in order, and the bed and breakfast window is scanned with a
+# pointer that only moves forward, so matching a ticker takes near-linear time.
+#
+# The ledger keeps the Section 104 pool after each day. When new trades arrive
+# it recomputes from 30 days before the earliest new trade, because that is
+# the earliest disposal they can be matched with. Matches of earlier disposals
+# are kept, and the pool is restored from the day before the restart.
+# /////////////////////////////////////////////////////////////////////////////
+
+SAME_DAY = 'same day'
+BED_AND_BREAKFAST = 'bed and breakfast'
+SECTION_104 = 'section 104'
+UNMATCHED = 'unmatched'
+
+# Days after a disposal in which an acquisition is matched with it
+BED_AND_BREAKFAST_DAYS = 30
+
+# Quantities smaller than this are treated as zero
+QUANTITY_TOLERANCE = 1e-9
+
+
+@dataclass(slots=True, frozen=True)
+class CGTMatch:
+    """Part of a disposal matched with an acquisition, the Section 104 pool, or nothing"""
+    ticker: str
+    disposal_date: date
+    acquisition_date: Optional[date]
+    rule: str
+    quantity: float
+    proceeds: float
+    cost: float
+
+    @property
+    def gain(self) -> float:
+        """Chargeable gain, or a loss if negative"""
+        return self.proceeds - self.cost
+
+    @property
+    def tax_year(self) -> str:
+        """UK tax year of the disposal, running from 6 April (e.g. 2024/25)"""
+        year = self.disposal_date.year
+        if (self.disposal_date.month, self.disposal_date.day) < (4, 6):
+            year -= 1
+        return f"{year}/{(year + 1) % 100:02d}"
+
+
+@dataclass(slots=True, frozen=True)
+class Section104Pool:
+    """Pooled holding of a ticker and its total allowable cost"""
+    ticker: str
+    quantity: float
+    cost: float
+
+
+class TickerLedger:
+    """Trades of one ticker aggregated by day, with the matches and pool computed from them"""
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.days: List[int] = []           # Date ordinals in ascending order
+        self.bought: List[float] = []       # Quantity acquired on each day
+        self.costs: List[float] = []        # Total cost of the acquisitions on each day
+        self.sold: List[float] = []         # Quantity disposed of on each day
+        self.proceeds: List[float] = []     # Total net proceeds of the disposals on each day
+        self.pools: List[Tuple[float, float]] = []  # Pool quantity and cost after each day
+        self.matches: List[CGTMatch] = []
+        self.match_days: List[int] = []     # Disposal date ordinal of each match
+
+    def add(self, trades: List[Tuple[int, float, float]]) -> None:
+        """
+        Add trades and recompute the matches they can affect
+
+        Args:
+            trades: Tuples of (date ordinal, signed quantity, cost of an acquisition
+                or net proceeds of a disposal)
+        """
+        if not trades:
+            return
+        totals = {day: [bought, cost, sold, proceeds] for day, bought, cost, sold, proceeds
+                  in zip(self.days, self.bought, self.costs, self.sold, self.proceeds)}
+        for day, quantity, amount in trades:
+            total = totals.setdefault(day, [0.0, 0.0, 0.0, 0.0])
+            if quantity > 0:
+                total[0] += quantity
+                total[1] += amount
+            else:
+                total[2] -= quantity
+                total[3] += amount
+
+        self.days = sorted(totals)
+        self.bought, self.costs, self.sold, self.proceeds = (
+            [totals[day][column] for day in self.days] for column in range(4)
+        )
+        self.recompute(min(day for day, _, _ in trades) - BED_AND_BREAKFAST_DAYS)
+
+    def recompute(self, from_day: int) -> None:
+        """Recompute the matches of the disposals on or after a day, keeping earlier matches"""
+        start = bisect_left(self.days, from_day)
+        from_day = self.days[start] if start < len(self.days) else from_day
+        cut = bisect_left(self.match_days, from_day)
+        del self.matches[cut:], self.match_days[cut:]
+        del self.pools[start:]
+
+        # Acquisitions still available after same-day matching and the bed and
+        # breakfast claims of the disposals that are kept
+        available = [0.0] * len(self.days)
+        for i in range(start, len(self.days)):
+            available[i] = self.bought[i] - min(self.bought[i], self.sold[i])
+        for match in self.matches[bisect_left(self.match_days, from_day - BED_AND_BREAKFAST_DAYS):]:
+            if match.rule == BED_AND_BREAKFAST and match.acquisition_date.toordinal() >= from_day:
+                available[bisect_left(self.days, match.acquisition_date.toordinal())] -= match.quantity
+
+        pool_quantity, pool_cost = self.pools[start - 1] if start else (0.0, 0.0)
+        window = start
+        for i in range(start, len(self.days)):
+            day = self.days[i]
+            sold = self.sold[i]
+            proceeds_per_unit = self.proceeds[i] / sold if sold else 0.0
+            remaining = sold
+
+            same_day = min(self.bought[i], sold)
+            if same_day > QUANTITY_TOLERANCE:
+                self._match(day, day, SAME_DAY, same_day, proceeds_per_unit, self.costs[i] / self.bought[i])
+                remaining -= same_day
+
+            if remaining > QUANTITY_TOLERANCE:
+                window = max(window, i + 1)
+                while window < len(self.days) and available[window] <= QUANTITY_TOLERANCE:
+                    window += 1
+                j = window
+                while remaining > QUANTITY_TOLERANCE and j < len(self.days) and self.days[j] <= day + BED_AND_BREAKFAST_DAYS:
+                    quantity = min(remaining, available[j])
+                    if quantity > QUANTITY_TOLERANCE:
+                        self._match(day, self.days[j], BED_AND_BREAKFAST, quantity, proceeds_per_unit, self.costs[j] / self.bought[j])
+                        available[j] -= quantity
+                        remaining -= quantity
+                    j += 1
+
+            if available[i] > QUANTITY_TOLERANCE:
+                pool_quantity += available[i]
+                pool_cost += available[i] * self.costs[i] / self.bought[i]
+
+            if remaining > QUANTITY_TOLERANCE:
+                quantity = min(remaining, pool_quantity)
+                if quantity > QUANTITY_TOLERANCE:
+                    cost = pool_cost * quantity / pool_quantity
+                    self._match(day, None, SECTION_104, quantity, proceeds_per_unit, cost / quantity)
+                    pool_quantity -= quantity
+                    pool_cost -= cost
+                    remaining -= quantity
+                if remaining > QUANTITY_TOLERANCE:
+                    self._match(day, None, UNMATCHED, remaining, proceeds_per_unit, 0.0)
+
+            self.pools.append((pool_quantity, pool_cost))
+
+    def _match(
+        self,
+        disposal_day: int,
+        acquisition_day: Optional[int],
+        rule: str,
+        quantity: float,
+        proceeds_per_unit: float,
+        cost_per_unit: float
+    ) -> None:
+        """Record the matching of part of a disposal"""
+        self.matches.append(CGTMatch(
+            self.ticker,
+            date.fromordinal(disposal_day),
+            date.fromordinal(acquisition_day) if acquisition_day is not None else None,
+            rule,
+            quantity,
+            quantity * proceeds_per_unit,
+            quantity * cost_per_unit
+        ))
+        self.match_days.append(disposal_day)
+
+    def pool(self) -> Section104Pool:
+        """Get the Section 104 pool after the latest trade"""
+        quantity, cost = self.pools[-1] if self.pools else (0.0, 0.0)
+        return Section104Pool(self.ticker, quantity, cost)
+
+
+class CGTEngine:
+    """Matches share disposals for UK CGT across tickers, updated incrementally as trades arrive"""
+
+    def __init__(self, fx_rates: Optional[FXRates] = None):
+        """
+        Args:
+            fx_rates: Rates converting trade amounts to sterling on the trade date
+                (None treats trade amounts as sterling)
+        """
+        self.fx_rates = fx_rates
+        self.ledgers: Dict[str, TickerLedger] = {}
+        self.unconverted: List[Trade] = []  # Trades with no exchange rate, left out of the matching
+        self._covered: Set[Tuple[str, date]] = set()  # (account, trade day) pairs added from statements
+
+    def add_statements(self, statements: Iterable[Statement]) -> None:
+        """
+        Add the trades parsed with statements. Overlapping statements report the same
+        trades, so the trades of each (account, trade day) are taken from the first
+        statement that reports them, here or in an earlier call, and ignored in the rest.
+        """
+        self.add_trades(
+            trade for trades in collect_statement_trades(statements, self._covered).values() for trade in trades
+        )
+
+    def add_trades(self, trades: Iterable[Trade]) -> None:
+        """
+        Add trades, recomputing each affected ticker from the first date the new trades
+        can change. Every trade given is added, so separate fills with identical details
+        all count; use add_statements for trades from overlapping statements. A trade
+        with no exchange rate on or before its date is kept in unconverted instead, so
+        it can be added by retry_unconverted once the rate is available.
+        """
+        batches = {}
+        missing = 0
+        for trade in trades:
+            if not trade.quantity:
+                continue
+
+            amount = -trade.amt_after_costs if trade.quantity > 0 else trade.amt_after_costs
+            if self.fx_rates is not None:
+                try:
+                    amount *= self.fx_rates.rate(trade.currency, trade.tradedate.date())
+                except exceptions.FXRateNotFoundError:
+                    self.unconverted.append(trade)
+                    missing += 1
+                    continue
+            batches.setdefault(trade.ticker, []).append((trade.tradedate.toordinal(), trade.quantity, amount))
+
+        for ticker, batch in batches.items():
+            self.ledgers.setdefault(ticker, TickerLedger(ticker)).add(batch)
+
+        if missing:
+            log_error.warning(f"{missing} trades have no exchange rate and were left out of the CGT matching")
+
+    def retry_unconverted(self) -> None:
+        """Add the trades left out for lack of an exchange rate again, e.g. after rates are added to fx_rates"""
+        trades, self.unconverted = self.unconverted, []
+        self.add_trades(trades)
+
+    def matches(self) -> List[CGTMatch]:
+        """Get the matches of every ticker, ordered by disposal date"""
+        return list(heapq.merge(
+            *(ledger.matches for ledger in self.ledgers.values()),
+            key=lambda match: match.disposal_date
+        ))
+
+    def pools(self) -> Dict[str, Section104Pool]:
+        """Get the current Section 104 pool of each ticker"""
+        return {ticker: ledger.pool() for ticker, ledger in sorted(self.ledgers.items())}
+
+    def gains_by_tax_year(self) -> Dict[str, float]:
+        """Get the net gain of the matched disposals in each tax year, excluding unmatched quantities"""
+        gains = {}
+        for match in self.matches():
+            if match.rule != UNMATCHED:
+                gains[match.tax_year] = gains.get(match.tax_year, 0.0) + match.gain
+        return gains
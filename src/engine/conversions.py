@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# FAST CONVERSION OF STATEMENT FIELDS TO DATES AND DECIMALS
+#
+# Statements repeat the same few dates on thousands of rows, so date parsing is
+# memoized. ISO dates (2025-09-10) use datetime.fromisoformat, which is much
+# faster than strptime. Long-month dates (September 10, 2025) still need
+# strptime, but each distinct string is only parsed once. Trade timestamps
+# (2025-09-10, 10:00:00) are rarely repeated, so they are not memoized.
+#
+# Numbers are converted to Decimal in a single step. Thousands separators are
+# removed, and the blanks and '--' placeholders that IBKR uses for missing
+# amounts become zero.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Strings used by IBKR for an amount that is not present
+MISSING_AMOUNTS = frozenset({'', '--', '-'})
+
+ZERO = Decimal(0)
+
+
+@lru_cache(maxsize=4096)
+def parse_iso_date(text: str) -> datetime:
+    """Convert an ISO date string (2025-09-10) to a datetime"""
+    return datetime.fromisoformat(text.strip())
+
+
+@lru_cache(maxsize=4096)
+def parse_long_date(text: str) -> datetime:
+    """Convert a long-month date string (September 10, 2025) to a datetime"""
+    return datetime.strptime(text.strip(), "%B %d, %Y")
+
+
+def parse_trade_datetime(text: str) -> datetime:
+    """Convert a trade timestamp (2025-09-10, 10:00:00, or a bare ISO date) to a datetime"""
+    return datetime.fromisoformat(text.replace(',', '').strip())
+
+
+def to_decimal(value) -> Decimal:
+    """
+    Convert a statement amount to a Decimal in a single step. Decimals are returned
+    unchanged, strings have thousands separators removed and missing amounts
+    ('', '--') become zero, and other numbers are converted via their string form.
+    """
+    if type(value) is Decimal:
+        return value
+    if type(value) is str:
+        if ',' in value:
+            value = value.replace(',', '')
+        value = value.strip()
+        return ZERO if value in MISSING_AMOUNTS else Decimal(value)
+    return Decimal(str(value))
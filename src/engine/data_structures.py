@@ -1,10 +1,16 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
-from typing import List
+from typing import Dict, List
+from src.engine.conversions import to_decimal
 
 
-@dataclass
+# Statement records are slotted rather than holding a per-instance __dict__, and
+# the individual position, accrual and NAV records are also frozen. Years of
+# daily statements can hold millions of these records in memory at once.
+
+
+@dataclass(slots=True)
 class Statement:
     """Represents the data in an IBKR financial statement"""
     date: datetime
@@ -12,9 +18,21 @@ class Statement:
     open_positions: List
     open_accruals: List
     net_asset_values: str
+    base_currency: str = None
+    fx_rates: Dict[str, Decimal] = None  # Amount of base currency per unit of each currency
+    trades: List = None  # Share trades in the statement's Trades section
     
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class StatementHeader:
+    """Represents the identifying details at the top of an IBKR statement file"""
+    filepath: str
+    account: str
+    period_start: datetime
+    period_end: datetime
+    
+
+@dataclass(slots=True, frozen=True)
 class NetAssetValue:
     """Represents the components of Net Asset Value at a given date"""
     NAV_cash: Decimal
@@ -27,16 +45,11 @@ class NetAssetValue:
     
     def __post_init__(self):
         """Convert numeric strings to Decimal objects after initialization"""
-        self.NAV_cash = Decimal(str(self.NAV_cash))
-        self.NAV_stock = Decimal(str(self.NAV_stock))
-        self.NAV_options = Decimal(str(self.NAV_options))
-        self.NAV_bonds = Decimal(str(self.NAV_bonds))
-        self.NAV_interest_accruals = Decimal(str(self.NAV_interest_accruals))
-        self.NAV_dividend_accruals = Decimal(str(self.NAV_dividend_accruals))
-        self.total = self.NAV_cash + self.NAV_stock + self.NAV_options + self.NAV_bonds + self.NAV_interest_accruals + self.NAV_dividend_accruals
+        to_decimals(self, 'NAV_cash', 'NAV_stock', 'NAV_options', 'NAV_bonds', 'NAV_interest_accruals', 'NAV_dividend_accruals')
+        object.__setattr__(self, 'total', self.NAV_cash + self.NAV_stock + self.NAV_options + self.NAV_bonds + self.NAV_interest_accruals + self.NAV_dividend_accruals)
         
         
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OpenPosition:
     """Represents an open position in a financial instrument"""
     ticker: str
@@ -45,15 +58,14 @@ class OpenPosition:
     value: Decimal
     currency: str
     unique_ID: str = None
+    asset_category: str = None  # e.g. Stocks, Equity and Index Options, Bonds, Forex
 
     def __post_init__(self):
         """Convert numeric strings to Decimal objects after initialization"""
-        self.quantity = Decimal(str(self.quantity))
-        self.price = Decimal(str(self.price))
-        self.value = Decimal(str(self.value))
+        to_decimals(self, 'quantity', 'price', 'value')
         
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OpenAccrual:
     """Represents an open dividend accrual in a financial instrument"""
     ticker: str
@@ -69,8 +81,10 @@ class OpenAccrual:
 
     def __post_init__(self):
         """Convert numeric strings to Decimal objects after initialization"""
-        self.quantity = Decimal(str(self.quantity))
-        self.gross_amount = Decimal(str(self.gross_amount))
-        self.net_amount = Decimal(str(self.net_amount))
-        self.withholding_tax = Decimal(str(self.withholding_tax))
-        self.amount_per_share = Decimal(str(self.amount_per_share))
\ No newline at end of file
+        to_decimals(self, 'quantity', 'gross_amount', 'net_amount', 'withholding_tax', 'amount_per_share')
+
+
+def to_decimals(record, *fields: str) -> None:
+    """Convert the named fields of a frozen record to Decimal objects in place"""
+    for name in fields:
+        object.__setattr__(record, name, to_decimal(getattr(record, name)))
\ No newline at end of file
@@ -0,0 +1,215 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from src.engine.conversions import parse_iso_date
+from src.engine.data_structures import Statement
+from src.engine.position_table import PositionTable
+from src.file_IO.read_files import iter_csv_headerless_UTF8
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+from src.sandbox.data_structures import FX
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# EXCHANGE RATE TABLES AND BASE CURRENCY VALUATION
+#
+# FXRates holds, for each currency, a sorted datetime64 array of dates and a
+# float64 array of the amount of base currency per unit of that currency on
+# each date. This is the convention of the Base Currency Exchange Rate section
+# of IBKR statements, and of the fx_rate of the FX record.
+#
+# Rates are looked up as of a date: the latest rate on or before the date is
+# used, found by binary search. A whole table of amounts is converted in one
+# pass, with one vectorised search per currency rather than one per row.
+# Single lookups are memoized by (currency, date), and the memo is cleared
+# whenever rates are added.
+#
+# Rates can be loaded from the statements' own exchange rate sections, which
+# are parsed with the rest of each statement and cached with it, from FX
+# records, or from a local headerless CSV file of date,currency,rate rows.
+# /////////////////////////////////////////////////////////////////////////////
+
+
+class FXRates:
+    """As-of exchange rate tables converting each currency to a base currency"""
+
+    def __init__(self, base_currency: str, tables: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        Args:
+            base_currency: Currency that amounts are converted to
+            tables: Sorted datetime64[D] dates and float64 rates for each currency
+        """
+        self.base_currency = base_currency
+        self.tables = tables
+        self._cache: Dict[Tuple[str, datetime], float] = {}
+
+    @classmethod
+    def from_records(cls, base_currency: str, records: Iterable[FX]) -> 'FXRates':
+        """Build rate tables from FX records, keeping the last rate given for each currency and date"""
+        columns = {}
+        for record in records:
+            dates, rates = columns.setdefault(record.currency, ([], []))
+            dates.append(record.date.date() if isinstance(record.date, datetime) else record.date)
+            rates.append(float(record.fx_rate))
+        return cls(base_currency, {
+            currency: sorted_rate_table(np.array(dates, dtype='datetime64[D]'), np.array(rates, dtype=np.float64))
+            for currency, (dates, rates) in columns.items()
+        })
+
+    @classmethod
+    def from_csv(cls, base_currency: str, abs_path: str) -> 'FXRates':
+        """Build rate tables from a headerless CSV file of date (YYYY-MM-DD), currency and rate rows"""
+        return cls.from_records(base_currency, (
+            FX(fxID, parse_iso_date(row[0]), row[1].strip(), float(row[2]))
+            for fxID, row in enumerate(iter_csv_headerless_UTF8(abs_path))
+            if len(row) >= 3
+        ))
+
+    @classmethod
+    def from_statements(cls, statements: Iterable[Statement], base_currency: Optional[str] = None) -> 'FXRates':
+        """
+        Build rate tables from the exchange rates parsed from the Base Currency
+        Exchange Rate sections of statements. Rates of a statement in a different
+        base currency are converted through its rate for the requested base
+        currency, and statements without that rate are skipped.
+
+        Args:
+            statements: Parsed statements
+            base_currency: Base currency of the tables (None takes that of the first statement with rates)
+        """
+        records = []
+        for statement in statements:
+            if not statement.fx_rates:
+                continue
+            if base_currency is None:
+                base_currency = statement.base_currency
+            rates = statement_rates_in(statement, base_currency)
+            if rates is None:
+                log_error.warning(
+                    f"Exchange rates of account {statement.account} on {statement.date:%Y-%m-%d} skipped, "
+                    f"base currency is {statement.base_currency} with no rate for {base_currency}"
+                )
+                continue
+            records += [FX(len(records) + i, statement.date, currency, rate) for i, (currency, rate) in enumerate(rates.items())]
+
+        return cls.from_records(base_currency, records)
+
+    def add_records(self, records: Iterable[FX]) -> None:
+        """Add further rates, e.g. from a newly arrived statement, replacing any held for the same dates"""
+        added = FXRates.from_records(self.base_currency, records)
+        for currency, (dates, rates) in added.tables.items():
+            if currency in self.tables:
+                held_dates, held_rates = self.tables[currency]
+                dates, rates = sorted_rate_table(np.concatenate([held_dates, dates]), np.concatenate([held_rates, rates]))
+            self.tables[currency] = (dates, rates)
+        self._cache.clear()
+
+    # /////////////////////////////////////////////////////////////////////////
+    # LOOKUPS
+
+    def rate(self, currency: str, date: Union[datetime, date]) -> float:
+        """
+        Get the amount of base currency per unit of a currency as of a date. Rates are
+        daily, so the time of day of a datetime is ignored and every time on a day
+        shares one memoised rate.
+
+        Raises:
+            FXRateNotFoundError: If there is no rate for the currency on or before the date
+        """
+        day = date.date() if isinstance(date, datetime) else date
+        key = (currency, day)
+        rate = self._cache.get(key)
+        if rate is None:
+            rate = float(self.rates_for(currency, np.array([day], dtype='datetime64[D]'))[0])
+            if np.isnan(rate):
+                raise exceptions.FXRateNotFoundError(currency, self.base_currency, date)
+            self._cache[key] = rate
+        return rate
+
+    def rates_for(self, currency: str, dates: np.ndarray) -> np.ndarray:
+        """Get the rates of one currency as of each of an array of dates, NaN where there is none"""
+        if currency == self.base_currency:
+            return np.ones(len(dates))
+        table = self.tables.get(currency)
+        if table is None:
+            return np.full(len(dates), np.nan)
+
+        table_dates, table_rates = table
+        indices = np.searchsorted(table_dates, dates, side='right') - 1
+        return np.where(indices >= 0, table_rates[np.maximum(indices, 0)], np.nan)
+
+    def rates(self, currencies: Sequence[str], dates: np.ndarray) -> np.ndarray:
+        """Get the rate for each pair of currency and date, NaN where there is none"""
+        currencies = np.asarray(currencies, dtype=object)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        result = np.full(len(dates), np.nan)
+        for currency in set(currencies.tolist()):
+            mask = currencies == currency
+            result[mask] = self.rates_for(currency, dates[mask])
+        return result
+
+    # /////////////////////////////////////////////////////////////////////////
+    # CONVERSION TO THE BASE CURRENCY
+
+    def convert(self, amounts: np.ndarray, currencies: Sequence[str], dates: np.ndarray) -> np.ndarray:
+        """Convert amounts in several currencies to the base currency, NaN where there is no rate"""
+        return np.asarray(amounts, dtype=np.float64) * self.rates(currencies, dates)
+
+    def convert_position_table(self, table: PositionTable, column: str = 'value') -> np.ndarray:
+        """Convert an amount column of a PositionTable to the base currency, aligned with its rows"""
+        currency_codes = table.codes['currency']
+        rates = np.full(len(table), np.nan)
+        for code, currency in enumerate(table.labels['currency']):
+            mask = currency_codes == code
+            rates[mask] = self.rates_for(currency, table.dates[mask])
+        return table.amounts[column] * rates
+
+    def totals_by_account(self, table: PositionTable, column: str = 'value') -> Dict[str, float]:
+        """Sum an amount column of a PositionTable in the base currency by account, NaN where a rate is missing"""
+        totals = np.bincount(
+            table.codes['account'],
+            weights=self.convert_position_table(table, column),
+            minlength=len(table.labels['account'])
+        )
+        return dict(zip(table.labels['account'], totals.tolist()))
+
+    def convert_records(self, records: List, dates: np.ndarray, field: str) -> np.ndarray:
+        """
+        Convert an amount field of a list of records with a currency, such as
+        OpenAccrual or OpenPosition objects, to the base currency
+
+        Args:
+            records: Records with a currency attribute
+            dates: Date at which to value each record
+            field: Name of the amount attribute (e.g. 'net_amount')
+        """
+        amounts = np.array([float(getattr(record, field)) for record in records], dtype=np.float64)
+        return self.convert(amounts, [record.currency for record in records], dates)
+
+
+def statement_rates_in(statement: Statement, base_currency: str) -> Optional[Dict[str, float]]:
+    """
+    Get the rates of a statement as amounts of another base currency, dividing by
+    the statement's rate for that currency (None if it has none)
+    """
+    rates = {currency: float(rate) for currency, rate in statement.fx_rates.items()}
+    if statement.base_currency == base_currency:
+        return rates
+    divisor = rates.get(base_currency)
+    if not divisor:
+        return None
+    rates = {currency: rate / divisor for currency, rate in rates.items() if currency != base_currency}
+    if statement.base_currency is not None:
+        rates[statement.base_currency] = 1 / divisor
+    return rates
+
+
+def sorted_rate_table(dates: np.ndarray, rates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort a rate table by date, keeping the last rate given for each date"""
+    order = np.argsort(dates, kind='stable')
+    dates, rates = dates[order], rates[order]
+    last_of_date = np.append(dates[1:] != dates[:-1], True) if len(dates) else np.zeros(0, dtype=bool)
+    return dates[last_of_date], rates[last_of_date]
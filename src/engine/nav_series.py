@@ -0,0 +1,282 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from src.engine.data_structures import NetAssetValue, Statement
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# NET ASSET VALUE TIME SERIES AND ANALYTICS
+#
+# A NAVSeries holds the NAV history of one account as a sorted array of dates
+# and a matrix of float64 values, one column per NAV component. Statements are
+# usually added in date order, so new points are appended into spare capacity
+# and an update costs O(1) rather than rebuilding the arrays. A statement for a
+# date already held replaces that point.
+#
+# The NAVHistory keeps a NAVSeries per account and a consolidated series over
+# the union of their dates, where each account's latest NAV on or before each
+# date is carried forward. The consolidated series assumes every account
+# reports in the same base currency, and is rebuilt lazily after an update.
+#
+# Returns, time-weighted return, rolling volatility and drawdown are computed
+# over whole arrays. Returns are measured between consecutive points, so they
+# are daily returns for daily statements.
+# /////////////////////////////////////////////////////////////////////////////
+
+# NAV components, in the column order of NAVSeries.values
+NAV_COMPONENTS = (
+    'NAV_cash', 'NAV_stock', 'NAV_options', 'NAV_bonds',
+    'NAV_interest_accruals', 'NAV_dividend_accruals', 'total'
+)
+
+# Number of daily returns per year used to annualise volatility
+TRADING_DAYS_PER_YEAR = 252
+
+
+class NAVSeries:
+    """NAV history of one account as a sorted date array and a matrix of component values"""
+
+    def __init__(self, capacity: int = 64):
+        self._dates = np.empty(capacity, dtype='datetime64[D]')
+        self._values = np.empty((capacity, len(NAV_COMPONENTS)), dtype=np.float64)
+        self._size = 0
+
+    @classmethod
+    def from_arrays(cls, dates: np.ndarray, values: np.ndarray) -> 'NAVSeries':
+        """Build a series from unsorted dates and value rows, keeping the last row given for each date"""
+        order = np.argsort(dates, kind='stable')
+        dates, values = dates[order], values[order]
+        last_of_date = np.append(dates[1:] != dates[:-1], True) if len(dates) else np.zeros(0, dtype=bool)
+
+        series = cls(capacity=max(int(last_of_date.sum()), 1))
+        series._size = int(last_of_date.sum())
+        series._dates[:series._size] = dates[last_of_date]
+        series._values[:series._size] = values[last_of_date]
+        return series
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Dates of the points as datetime64[D], in ascending order"""
+        return self._dates[:self._size]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Matrix of values with a row per date and a column per NAV component"""
+        return self._values[:self._size]
+
+    def component(self, name: str = 'total') -> np.ndarray:
+        """Get the values of one NAV component, aligned with the dates"""
+        return self.values[:, NAV_COMPONENTS.index(name)]
+
+    # /////////////////////////////////////////////////////////////////////////
+    # INCREMENTAL UPDATES
+
+    def add(self, date: datetime, nav: NetAssetValue) -> None:
+        """Add the NAV of a statement, replacing any point already held for its date"""
+        day = np.datetime64(date.date() if isinstance(date, datetime) else date, 'D')
+        row = [float(getattr(nav, name)) for name in NAV_COMPONENTS]
+        size = self._size
+
+        if size and day <= self._dates[size - 1]:
+            index = int(np.searchsorted(self.dates, day))
+            if self._dates[index] == day:
+                self._values[index] = row
+                return
+        else:
+            index = size
+
+        if size == len(self._dates):
+            self._grow()
+        self._dates[index + 1:size + 1] = self._dates[index:size]
+        self._values[index + 1:size + 1] = self._values[index:size]
+        self._dates[index] = day
+        self._values[index] = row
+        self._size += 1
+
+    def _grow(self) -> None:
+        """Double the capacity of the arrays"""
+        capacity = max(2 * len(self._dates), 1)
+        dates = np.empty(capacity, dtype='datetime64[D]')
+        values = np.empty((capacity, len(NAV_COMPONENTS)), dtype=np.float64)
+        dates[:self._size] = self.dates
+        values[:self._size] = self.values
+        self._dates, self._values = dates, values
+
+    # /////////////////////////////////////////////////////////////////////////
+    # ANALYTICS
+
+    def returns(self, component: str = 'total') -> np.ndarray:
+        """Simple returns between consecutive points, aligned with dates[1:]"""
+        return simple_returns(self.component(component))
+
+    def period_return(self, start: datetime, end: datetime, component: str = 'total') -> float:
+        """Return between the latest points on or before the start and end dates (NaN if none)"""
+        days = np.array([start, end], dtype='datetime64[D]')
+        indices = np.searchsorted(self.dates, days, side='right') - 1
+        if indices[0] < 0:
+            return float('nan')
+        values = self.component(component)[indices]
+        return float(values[1] / values[0] - 1) if values[0] else float('nan')
+
+    def time_weighted_return(self, flows: Optional[np.ndarray] = None, component: str = 'total') -> float:
+        """Time-weighted return over the whole series, see time_weighted_return"""
+        return time_weighted_return(self.component(component), flows)
+
+    def rolling_volatility(
+        self,
+        window: int = 21,
+        periods_per_year: Optional[int] = TRADING_DAYS_PER_YEAR,
+        component: str = 'total'
+    ) -> np.ndarray:
+        """Rolling volatility of the returns, aligned with dates[window:]"""
+        return rolling_volatility(self.returns(component), window, periods_per_year)
+
+    def max_drawdown(self, component: str = 'total') -> Tuple[float, Optional[datetime], Optional[datetime]]:
+        """Largest fall from a peak as (drawdown, peak date, trough date), see max_drawdown"""
+        drawdown, peak, trough = max_drawdown(self.component(component))
+        if peak is None:
+            return drawdown, None, None
+        peak_date, trough_date = self.dates[[peak, trough]].astype(datetime)
+        return (
+            drawdown,
+            datetime(peak_date.year, peak_date.month, peak_date.day),
+            datetime(trough_date.year, trough_date.month, trough_date.day)
+        )
+
+
+class NAVHistory:
+    """NAV series for each account and a consolidated series across all accounts"""
+
+    def __init__(self, accounts: Optional[Dict[str, NAVSeries]] = None):
+        self.accounts = accounts if accounts is not None else {}
+        self._consolidated = None
+
+    @classmethod
+    def from_statements(cls, statements: Iterable[Statement]) -> 'NAVHistory':
+        """Build the NAV history of each account from a list of statements"""
+        points = {}
+        for statement in statements:
+            dates, rows = points.setdefault(statement.account, ([], []))
+            dates.append(statement.date.date())
+            rows.append([float(getattr(statement.net_asset_values, name)) for name in NAV_COMPONENTS])
+
+        return cls({
+            account: NAVSeries.from_arrays(
+                np.array(dates, dtype='datetime64[D]'),
+                np.array(rows, dtype=np.float64).reshape(-1, len(NAV_COMPONENTS))
+            )
+            for account, (dates, rows) in points.items()
+        })
+
+    def add_statement(self, statement: Statement) -> None:
+        """Add the NAV of a newly arrived statement to its account's series"""
+        self.accounts.setdefault(statement.account, NAVSeries()).add(statement.date, statement.net_asset_values)
+        self._consolidated = None
+
+    def consolidated(self) -> NAVSeries:
+        """Get the sum of all accounts' NAV on every date on which any account has a statement"""
+        if self._consolidated is None:
+            self._consolidated = consolidate(self.accounts.values())
+        return self._consolidated
+
+
+def consolidate(series: Iterable[NAVSeries]) -> NAVSeries:
+    """Sum several series over the union of their dates, carrying each one's latest values forward"""
+    series = [item for item in series if len(item)]
+    if not series:
+        return NAVSeries()
+
+    dates = np.unique(np.concatenate([item.dates for item in series]))
+    totals = np.zeros((len(dates), len(NAV_COMPONENTS)), dtype=np.float64)
+    for item in series:
+        indices = np.searchsorted(item.dates, dates, side='right') - 1
+        started = indices >= 0
+        totals[started] += item.values[indices[started]]
+    return NAVSeries.from_arrays(dates, totals)
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# VECTORISED ANALYTICS ON ARRAYS OF VALUES
+
+def simple_returns(values: np.ndarray) -> np.ndarray:
+    """Get the returns between consecutive values, NaN where the earlier value is zero"""
+    previous = values[:-1]
+    return np.divide(values[1:], previous, out=np.full(len(previous), np.nan), where=previous != 0) - 1
+
+
+def time_weighted_return(values: np.ndarray, flows: Optional[np.ndarray] = None) -> float:
+    """
+    Chain the returns between consecutive values into a time-weighted return,
+    removing external cash flows so that deposits and withdrawals are not counted
+    as performance
+
+    Args:
+        values: NAV at each point
+        flows: External cash flow into the account at each point, counted as
+            arriving at the end of the period ending at that point (optional)
+    Returns:
+        Time-weighted return over the whole series, NaN if it cannot be measured
+    """
+    if len(values) < 2:
+        return float('nan')
+    growth = values[1:] - (flows[1:] if flows is not None else 0)
+    previous = values[:-1]
+    factors = np.divide(growth, previous, out=np.full(len(previous), np.nan), where=previous != 0)
+    return float(np.prod(factors) - 1)
+
+
+def rolling_volatility(
+    returns: np.ndarray,
+    window: int,
+    periods_per_year: Optional[int] = TRADING_DAYS_PER_YEAR
+) -> np.ndarray:
+    """
+    Get the sample standard deviation of each window of returns from running sums
+    of the returns and their squares, so the cost does not depend on the window.
+    NaN returns (after a zero value) are left out of the windows holding them
+    rather than spreading to every later window.
+
+    Args:
+        returns: Returns between consecutive points
+        window: Number of returns in each window (at least 2)
+        periods_per_year: Annualise by the square root of this (None leaves it unscaled)
+    Returns:
+        Volatility of each window ending at returns[window - 1:], NaN where a
+        window holds fewer than two returns
+    """
+    if len(returns) < window:
+        return np.zeros(0)
+    valid = ~np.isnan(returns)
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    sums = np.concatenate(([0.0], np.nancumsum(returns)))
+    squares = np.concatenate(([0.0], np.nancumsum(returns * returns)))
+    window_counts = counts[window:] - counts[:-window]
+    window_sums = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+
+    variance = np.full(len(window_counts), np.nan)
+    enough = window_counts >= 2
+    n = window_counts[enough]
+    variance[enough] = (window_squares[enough] - window_sums[enough] ** 2 / n) / (n - 1)
+    volatility = np.sqrt(np.maximum(variance, 0.0))
+    return volatility * np.sqrt(periods_per_year) if periods_per_year else volatility
+
+
+def max_drawdown(values: np.ndarray) -> Tuple[float, Optional[int], Optional[int]]:
+    """
+    Get the largest fall from a running peak as a fraction of the peak
+
+    Returns:
+        Tuple of (drawdown as a negative fraction or zero, index of the peak, index
+        of the trough), with None indices when there are no values
+    """
+    if len(values) == 0:
+        return 0.0, None, None
+    peaks = np.maximum.accumulate(values)
+    drawdowns = np.divide(values, peaks, out=np.ones(len(values)), where=peaks > 0) - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return float(drawdowns[trough]), peak, trough
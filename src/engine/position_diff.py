@@ -0,0 +1,227 @@
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.engine.conversions import ZERO
+from src.engine.data_structures import OpenPosition, Statement
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# DIFFS BETWEEN THE OPEN POSITIONS OF STATEMENTS
+#
+# Two lists of open positions are compared with a hash join on (ticker,
+# currency, asset category) within an account: the earlier positions are put
+# in a dict, and each later position is looked up in it, so a diff costs time
+# in proportion to the number of positions rather than to their product. The
+# asset category keeps e.g. a stock apart from a bond of the same symbol, and
+# positions sharing a key on one statement are merged into one by summing
+# their quantities and values, so none is lost. Each position that was opened,
+# closed, resized or repriced gives one PositionChange.
+#
+# A PositionHistory stores the positions of one account as the first snapshot
+# and the changes made by each later statement. Positions that are unchanged
+# between statements are not repeated, and a full snapshot is kept every
+# checkpoint_interval statements so that rebuilding the positions at any date
+# replays a bounded number of changes. Positions whose prices move daily are
+# stored again on each date, so the saving comes from unchanged positions.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Kinds of change between two statements
+OPENED = 'opened'
+CLOSED = 'closed'
+RESIZED = 'resized'
+REPRICED = 'repriced'
+
+# Key of a position in the hash join: (ticker, currency, asset category)
+PositionKey = Tuple[str, str, Optional[str]]
+
+
+@dataclass(slots=True, frozen=True)
+class PositionChange:
+    """A change in one position between two statements of an account"""
+    account: str
+    date: datetime
+    ticker: str
+    currency: str
+    asset_category: Optional[str]
+    change: str
+    before: Optional[OpenPosition]
+    after: Optional[OpenPosition]
+
+    @property
+    def quantity_change(self) -> Decimal:
+        """Change in quantity, where a missing position has a quantity of zero"""
+        return (self.after.quantity if self.after else ZERO) - (self.before.quantity if self.before else ZERO)
+
+    @property
+    def price_change(self) -> Optional[Decimal]:
+        """Change in price, or None if the position was opened or closed"""
+        if self.before is None or self.after is None:
+            return None
+        return self.after.price - self.before.price
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def diff_positions(
+    account: str,
+    date: datetime,
+    before: Iterable[OpenPosition],
+    after: Iterable[OpenPosition]
+) -> List[PositionChange]:
+    """
+    Compare the open positions of an account at two dates with a hash join on
+    (ticker, currency, asset category)
+
+    Args:
+        account: Account holding the positions
+        date: Date of the later positions, recorded on each change
+        before: Positions at the earlier date
+        after: Positions at the later date
+    Returns:
+        List of changes, for positions held later in their order, then closed positions
+    """
+    earlier = index_positions(before)
+    changes = []
+
+    for key, position in index_positions(after).items():
+        previous = earlier.pop(key, None)
+        if previous is None:
+            change = OPENED
+        elif position.quantity != previous.quantity:
+            change = RESIZED
+        elif position.price != previous.price or position.value != previous.value:
+            change = REPRICED
+        else:
+            continue
+        changes.append(PositionChange(account, date, *key, change, previous, position))
+
+    for key, previous in earlier.items():
+        changes.append(PositionChange(account, date, *key, CLOSED, previous, None))
+    return changes
+
+
+def position_key(position: OpenPosition) -> PositionKey:
+    """Get the key of a position in the hash join"""
+    return position.ticker, position.currency, position.asset_category
+
+
+def index_positions(positions: Iterable[OpenPosition]) -> Dict[PositionKey, OpenPosition]:
+    """Key positions for the hash join, merging positions of the same key by summing their quantities and values"""
+    indexed = {}
+    for position in positions:
+        key = position_key(position)
+        held = indexed.get(key)
+        if held is None:
+            indexed[key] = position
+        else:
+            indexed[key] = replace(held, quantity=held.quantity + position.quantity, value=held.value + position.value)
+    return indexed
+
+
+def diff_statements(before: Statement, after: Statement) -> List[PositionChange]:
+    """Compare the open positions of two statements of the same account"""
+    return diff_positions(after.account, after.date, before.open_positions, after.open_positions)
+
+
+def diff_statement_series(statements: Iterable[Statement]) -> List[PositionChange]:
+    """
+    Compare each statement with the previous statement of its account, in date order.
+    The first statement of each account is the baseline and gives no changes.
+
+    Returns:
+        List of changes ordered by account, then date
+    """
+    changes = []
+    for series in statements_by_account(statements).values():
+        for before, after in zip(series, series[1:]):
+            changes.extend(diff_statements(before, after))
+    return changes
+
+
+def statements_by_account(statements: Iterable[Statement]) -> Dict[str, List[Statement]]:
+    """Group statements by account, each group sorted by date"""
+    grouped = {}
+    for statement in statements:
+        grouped.setdefault(statement.account, []).append(statement)
+    return {account: sorted(series, key=lambda statement: statement.date) for account, series in sorted(grouped.items())}
+
+
+# /////////////////////////////////////////////////////////////////////////////
+class PositionHistory:
+    """Open positions of one account over time, stored as a base snapshot and deltas"""
+
+    def __init__(self, account: str, checkpoint_interval: int = 64):
+        """
+        Args:
+            account: Account whose positions are held
+            checkpoint_interval: Number of statements between full snapshots
+        """
+        self.account = account
+        self.checkpoint_interval = checkpoint_interval
+        self.dates: List[datetime] = []
+        self.deltas: List[Dict[PositionKey, Optional[OpenPosition]]] = []
+        self.checkpoints: Dict[int, Dict[PositionKey, OpenPosition]] = {}
+        self._latest: Dict[PositionKey, OpenPosition] = {}
+
+    @classmethod
+    def from_statements(cls, statements: Iterable[Statement], checkpoint_interval: int = 64) -> Dict[str, 'PositionHistory']:
+        """Build the position history of each account from a list of statements"""
+        histories = {}
+        for account, series in statements_by_account(statements).items():
+            history = histories[account] = cls(account, checkpoint_interval)
+            for statement in series:
+                history.add_statement(statement)
+        return histories
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def add_statement(self, statement: Statement) -> None:
+        """
+        Add a statement dated after every statement already held, storing only its
+        changes. A statement dated the same as the latest one held replaces it.
+        """
+        if self.dates and statement.date < self.dates[-1]:
+            raise ValueError(f"Statement for {statement.date:%Y-%m-%d} is before {self.dates[-1]:%Y-%m-%d}")
+        if self.dates and statement.date == self.dates[-1]:
+            self._remove_latest()
+
+        changes = diff_positions(self.account, statement.date, self._latest.values(), statement.open_positions)
+        delta = {(change.ticker, change.currency, change.asset_category): change.after for change in changes}
+        for key, position in delta.items():
+            if position is None:
+                del self._latest[key]
+            else:
+                self._latest[key] = position
+
+        index = len(self.dates)
+        self.dates.append(statement.date)
+        self.deltas.append(delta)
+        if index % self.checkpoint_interval == 0:
+            self.checkpoints[index] = dict(self._latest)
+
+    def _remove_latest(self) -> None:
+        """Remove the latest statement held, restoring the positions of the one before it"""
+        index = len(self.dates) - 1
+        del self.dates[index], self.deltas[index]
+        self.checkpoints.pop(index, None)
+        self._latest = self._positions_at_index(index - 1)
+
+    def positions_at(self, date: datetime) -> List[OpenPosition]:
+        """Get the open positions from the latest statement dated on or before a date"""
+        return list(self._positions_at_index(bisect_right(self.dates, date) - 1).values())
+
+    def _positions_at_index(self, index: int) -> Dict[PositionKey, OpenPosition]:
+        """Rebuild the positions after the statement at an index from the checkpoint before it"""
+        if index < 0:
+            return {}
+        checkpoint = index - index % self.checkpoint_interval
+        positions = dict(self.checkpoints[checkpoint])
+        for delta in self.deltas[checkpoint + 1:index + 1]:
+            for key, position in delta.items():
+                if position is None:
+                    del positions[key]
+                else:
+                    positions[key] = position
+        return positions
@@ -0,0 +1,229 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from src.engine.data_structures import OpenPosition, Statement
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# COLUMNAR TABLE OF OPEN POSITIONS
+#
+# The PositionTable stores the open positions of many statements as parallel
+# NumPy arrays, one per field, so that totals, weights and filters are computed
+# in vectorised form rather than by looping over OpenPosition objects.
+#
+# Accounts, tickers and currencies are dictionary encoded: each column holds
+# integer codes indexing into a list of labels. Group-by sums are then a single
+# np.bincount over the codes.
+#
+# The date of the latest statement of each account is kept alongside the rows,
+# so that an account whose latest statement holds no positions has no latest
+# rows, rather than falling back to the positions of an older statement.
+#
+# Amounts are held as float64 for speed. Converting back to OpenPosition
+# objects restores Decimals from the float values, so round trips are exact
+# only to float precision.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Columns holding dictionary-encoded labels
+LABEL_COLUMNS = ('account', 'ticker', 'currency')
+
+# Columns holding numeric amounts
+AMOUNT_COLUMNS = ('quantity', 'price', 'value')
+
+
+class PositionTable:
+    """Columnar table of open positions with dictionary-encoded accounts, tickers and currencies"""
+
+    def __init__(
+        self,
+        codes: Dict[str, np.ndarray],
+        labels: Dict[str, List[str]],
+        dates: np.ndarray,
+        amounts: Dict[str, np.ndarray],
+        account_dates: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            codes: Integer code arrays for each of the LABEL_COLUMNS
+            labels: Labels indexed by the codes for each of the LABEL_COLUMNS
+            dates: Statement date of each position as datetime64[D]
+            amounts: Float arrays for each of the AMOUNT_COLUMNS
+            account_dates: Latest statement date of each account code as datetime64[D]
+                (None takes the latest date of each account's rows)
+        """
+        self.codes = codes
+        self.labels = labels
+        self.dates = dates
+        self.amounts = amounts
+        self.account_dates = account_dates
+
+    @classmethod
+    def from_statements(cls, statements: Iterable[Statement]) -> 'PositionTable':
+        """Build a PositionTable from the open positions of a list of statements"""
+        encoders = {column: {} for column in LABEL_COLUMNS}
+        codes = {column: [] for column in LABEL_COLUMNS}
+        amounts = {column: [] for column in AMOUNT_COLUMNS}
+        dates = []
+        account_dates = []
+
+        for statement in statements:
+            date = np.datetime64(statement.date.date(), 'D')
+            account_code = encoders['account'].setdefault(statement.account, len(encoders['account']))
+            if account_code == len(account_dates):
+                account_dates.append(date)
+            account_dates[account_code] = max(account_dates[account_code], date)
+            for position in statement.open_positions:
+                codes['account'].append(account_code)
+                codes['ticker'].append(encoders['ticker'].setdefault(position.ticker, len(encoders['ticker'])))
+                codes['currency'].append(encoders['currency'].setdefault(position.currency, len(encoders['currency'])))
+                amounts['quantity'].append(float(position.quantity))
+                amounts['price'].append(float(position.price))
+                amounts['value'].append(float(position.value))
+                dates.append(date)
+
+        return cls(
+            codes={column: np.array(values, dtype=np.int32) for column, values in codes.items()},
+            labels={column: list(encoder) for column, encoder in encoders.items()},
+            dates=np.array(dates, dtype='datetime64[D]'),
+            amounts={column: np.array(values, dtype=np.float64) for column, values in amounts.items()},
+            account_dates=np.array(account_dates, dtype='datetime64[D]')
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def column(self, name: str) -> np.ndarray:
+        """Get a column by name, decoding label columns into an array of strings"""
+        if name in LABEL_COLUMNS:
+            return np.array(self.labels[name], dtype=object)[self.codes[name]]
+        if name == 'date':
+            return self.dates
+        return self.amounts[name]
+
+    # /////////////////////////////////////////////////////////////////////////
+    # FILTERS
+
+    def filter(self, mask: np.ndarray) -> 'PositionTable':
+        """Get a new table with only the rows where the boolean mask is True"""
+        return PositionTable(
+            codes={column: codes[mask] for column, codes in self.codes.items()},
+            labels=self.labels,
+            dates=self.dates[mask],
+            amounts={column: amounts[mask] for column, amounts in self.amounts.items()},
+            account_dates=self.account_dates
+        )
+
+    def where(
+        self,
+        account: Optional[str] = None,
+        ticker: Optional[str] = None,
+        currency: Optional[str] = None,
+        date: Optional[datetime] = None
+    ) -> 'PositionTable':
+        """Get a new table with only the rows matching every label or date given"""
+        mask = np.ones(len(self), dtype=bool)
+        for column, label in (('account', account), ('ticker', ticker), ('currency', currency)):
+            if label is not None:
+                mask &= self.codes[column] == self.code(column, label)
+        if date is not None:
+            mask &= self.dates == np.datetime64(date.date() if isinstance(date, datetime) else date, 'D')
+        return self.filter(mask)
+
+    def latest(self) -> 'PositionTable':
+        """
+        Get a new table with only the rows from the latest statement of each account,
+        which has no rows if that statement holds no positions
+        """
+        accounts = self.codes['account']
+        days = self.dates.astype(np.int64)
+        if self.account_dates is not None:
+            latest_days = self.account_dates.astype(np.int64)
+        else:
+            latest_days = np.full(len(self.labels['account']), np.iinfo(np.int64).min)
+            np.maximum.at(latest_days, accounts, days)
+        return self.filter(days == latest_days[accounts])
+
+    def code(self, column: str, label: str) -> int:
+        """Get the integer code of a label, or -1 if the label does not appear in the table"""
+        try:
+            return self.labels[column].index(label)
+        except ValueError:
+            return -1
+
+    # /////////////////////////////////////////////////////////////////////////
+    # AGGREGATION
+
+    def sum_by(self, *keys: str, column: str = 'value') -> Dict[Tuple[str, ...], float]:
+        """
+        Sum an amount column grouped by one or more label columns
+
+        Args:
+            keys: Label columns to group by (e.g. 'account', 'currency')
+            column: Amount column to sum
+        Returns:
+            Dictionary of sums keyed by tuples of labels, omitting empty groups
+        """
+        group_codes, shape = self._group_codes(keys)
+        sums = np.bincount(group_codes, weights=self.amounts[column], minlength=int(np.prod(shape)))
+        counts = np.bincount(group_codes, minlength=int(np.prod(shape)))
+
+        result = {}
+        for flat_code in np.flatnonzero(counts):
+            label_codes = np.unravel_index(flat_code, shape)
+            result[tuple(self.labels[key][code] for key, code in zip(keys, label_codes))] = float(sums[flat_code])
+        return result
+
+    def weights(self, *within: str, column: str = 'value') -> np.ndarray:
+        """
+        Get the weight of each row as a share of the total of its group
+
+        Args:
+            within: Label columns defining the groups (none for the whole table)
+            column: Amount column to weight by
+        Returns:
+            Array of weights aligned with the rows of the table
+        """
+        amounts = self.amounts[column]
+        if not within:
+            total = amounts.sum()
+            return amounts / total if total else np.zeros_like(amounts)
+
+        group_codes, shape = self._group_codes(within)
+        totals = np.bincount(group_codes, weights=amounts, minlength=int(np.prod(shape)))[group_codes]
+        return np.divide(amounts, totals, out=np.zeros_like(amounts), where=totals != 0)
+
+    def _group_codes(self, keys: Sequence[str]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """Combine the codes of several label columns into a single flat group code per row"""
+        shape = tuple(max(len(self.labels[key]), 1) for key in keys)
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.intp), shape
+        return np.ravel_multi_index([self.codes[key] for key in keys], shape), shape
+
+    # /////////////////////////////////////////////////////////////////////////
+    # CONVERSION BACK TO RECORDS
+
+    def to_positions(self) -> List[OpenPosition]:
+        """Convert the rows of the table back into OpenPosition objects"""
+        tickers = self.column('ticker')
+        currencies = self.column('currency')
+        quantities, prices, values = (self.amounts[column].tolist() for column in AMOUNT_COLUMNS)
+        return [
+            OpenPosition(
+                ticker=tickers[i],
+                quantity=Decimal(repr(quantities[i])),
+                price=Decimal(repr(prices[i])),
+                value=Decimal(repr(values[i])),
+                currency=currencies[i]
+            )
+            for i in range(len(self))
+        ]
+
+    def to_account_positions(self) -> Dict[Tuple[str, datetime], List[OpenPosition]]:
+        """Convert the table back into lists of OpenPosition objects keyed by (account, date)"""
+        accounts = self.column('account')
+        dates = self.dates.astype(datetime)
+        grouped = {}
+        for account, date, position in zip(accounts, dates, self.to_positions()):
+            grouped.setdefault((account, datetime(date.year, date.month, date.day)), []).append(position)
+        return grouped
@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from src.engine.data_structures import Statement
+from src.sandbox.data_structures import AuditedQuantity, Trade
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# RECONCILIATION OF STATEMENT QUANTITIES WITH THE TRADE HISTORY
+#
+# The quantity of each share position in a statement should equal the
+# quantity held in the account's earliest statement plus the net quantity
+# traded since then. The earliest statement seeds the running quantities, so
+# holdings opened before the first trade loaded are not reported, and trades
+# on or before its date are already included in it. Only the Trades section's
+# share trades are available, so positions in other asset categories (options,
+# bonds, forex) are left out. Every later statement is checked in one batch:
+#
+#   - each (account, ticker) is given a key code, and the opening quantities and
+#     trades are sorted by (key, date) into one array with a running total
+#   - the positions of each statement are hash joined on (account, ticker) with
+#     the keys traded in the account, so a ticker that was traded but is missing
+#     from the statement is checked against a quantity of zero
+#   - the traded quantity of each (key, statement date) is found with one
+#     vectorised binary search, as the running total at the last trade of the
+#     key on or before the date less the running total before its first trade
+# /////////////////////////////////////////////////////////////////////////////
+
+# Asset category of the positions checked, the category of the trades read
+STOCK_CATEGORY = 'Stocks'
+
+# Differences smaller than this are treated as a match
+QUANTITY_TOLERANCE = 1e-6
+
+# Days are stored in the low 32 bits of the (key, date) sort codes, offset to be non-negative
+DAY_BITS = 32
+DAY_OFFSET = 1 << (DAY_BITS - 1)
+
+
+def reconcile_quantities(
+    statements: Iterable[Statement],
+    trades_by_account: Dict[str, Iterable[Trade]],
+    tolerance: float = QUANTITY_TOLERANCE,
+    mismatches_only: bool = True
+) -> Dict[Tuple[str, datetime], List[AuditedQuantity]]:
+    """
+    Compare the quantity of each share position in each statement with the quantity
+    in the account's earliest statement plus the net quantity traded since then,
+    up to the end of the statement date. The earliest statements are not checked.
+
+    Args:
+        statements: Statements to check
+        trades_by_account: Trades made in each account
+        tolerance: Largest difference treated as a match
+        mismatches_only: Leave out positions whose quantities match
+    Returns:
+        Audited quantities keyed by (account, statement date), in statement order
+    """
+    statements = list(statements)
+    opening = {}
+    for statement in statements:
+        current = opening.get(statement.account)
+        if current is None or statement.date < current.date:
+            opening[statement.account] = statement
+
+    # The opening quantities are entered as trades on the date of the earliest statement
+    key_codes = {}
+    traded_keys = {}
+    trade_keys, trade_days, trade_quantities = [], [], []
+    for account, statement in opening.items():
+        for position in stock_positions(statement):
+            code = key_codes.setdefault((account, position.ticker), len(key_codes))
+            traded_keys.setdefault(account, {})[code] = None
+            trade_keys.append(code)
+            trade_days.append(statement.date.date())
+            trade_quantities.append(float(position.quantity))
+
+    for account, trades in trades_by_account.items():
+        opening_day = opening[account].date.date() if account in opening else None
+        for trade in trades:
+            if opening_day is not None and trade.tradedate.date() <= opening_day:
+                continue
+            code = key_codes.setdefault((account, trade.ticker), len(key_codes))
+            traded_keys.setdefault(account, {})[code] = None
+            trade_keys.append(code)
+            trade_days.append(trade.tradedate.date())
+            trade_quantities.append(trade.quantity)
+
+    statement_labels, statement_counts = [], []
+    query_keys, query_quantities = [], []
+    for statement in statements:
+        if statement is opening[statement.account]:
+            continue
+        held = dict.fromkeys(traded_keys.get(statement.account, ()), 0.0)
+        for position in stock_positions(statement):
+            code = key_codes.setdefault((statement.account, position.ticker), len(key_codes))
+            held[code] = held.get(code, 0.0) + float(position.quantity)
+        statement_labels.append((statement.account, statement.date))
+        statement_counts.append(len(held))
+        query_keys += held.keys()
+        query_quantities += held.values()
+
+    query_keys = np.array(query_keys, dtype=np.int64)
+    statement_quantities = np.array(query_quantities, dtype=np.float64)
+    query_days = np.repeat(
+        np.array([date.date() for _, date in statement_labels], dtype='datetime64[D]'),
+        statement_counts
+    )
+    trade_quantities = traded_quantities(
+        np.array(trade_keys, dtype=np.int64),
+        np.array(trade_days, dtype='datetime64[D]'),
+        np.array(trade_quantities, dtype=np.float64),
+        query_keys,
+        query_days
+    )
+
+    differences = statement_quantities - trade_quantities
+    matched = np.abs(differences) <= tolerance
+    tickers = {code: ticker for (_, ticker), code in key_codes.items()}
+    statement_of_row = np.repeat(np.arange(len(statement_labels)), statement_counts)
+
+    audit = {}
+    rows = np.flatnonzero(~matched) if mismatches_only else np.arange(len(query_keys))
+    for row in rows.tolist():
+        audit.setdefault(statement_labels[statement_of_row[row]], []).append(AuditedQuantity(
+            tickers[int(query_keys[row])],
+            float(statement_quantities[row]),
+            float(trade_quantities[row]),
+            float(differences[row]),
+            bool(matched[row])
+        ))
+    return audit
+
+
+def stock_positions(statement: Statement) -> List:
+    """Get the share positions of a statement, treating positions without an asset category as shares"""
+    return [
+        position for position in statement.open_positions
+        if position.asset_category is None or position.asset_category == STOCK_CATEGORY
+    ]
+
+
+def traded_quantities(
+    trade_keys: np.ndarray,
+    trade_days: np.ndarray,
+    quantities: np.ndarray,
+    query_keys: np.ndarray,
+    query_days: np.ndarray
+) -> np.ndarray:
+    """
+    Get the net quantity traded for each key up to the end of each query date
+
+    Args:
+        trade_keys: Integer key of each trade
+        trade_days: Date of each trade as datetime64[D]
+        quantities: Signed quantity of each trade
+        query_keys: Integer key of each query
+        query_days: Date of each query as datetime64[D]
+    Returns:
+        Net quantity for each query, zero where the key has no trades by the date
+    """
+    codes = sort_codes(trade_keys, trade_days)
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    totals = np.concatenate(([0.0], np.cumsum(quantities[order])))
+
+    last = np.searchsorted(codes, sort_codes(query_keys, query_days), side='right')
+    first = np.searchsorted(codes, query_keys << DAY_BITS, side='left')
+    return totals[last] - totals[first]
+
+
+def sort_codes(keys: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Combine integer keys and dates into int64 codes that sort by key, then date"""
+    return (keys << DAY_BITS) | (days.astype(np.int64) + DAY_OFFSET)
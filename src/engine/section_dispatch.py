@@ -0,0 +1,113 @@
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from src.monitor.log_system import get_loggers
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# SECTION DISPATCH FOR IBKR STATEMENT ROWS
+#
+# IBKR activity statements are a single CSV file made up of many sections. The
+# first column of every row holds the section name (e.g. 'Open Positions') and
+# the second column holds the row type (e.g. 'Header', 'Data', 'Total').
+#
+# The SectionDispatcher avoids holding the statement in memory at all. Rows are
+# streamed to the SectionHandler registered for their section as they are read,
+# and rows for sections without a handler are discarded immediately.
+#
+# A HeaderDrivenHandler locates its columns by name from each Header row rather
+# than by fixed position, so it keeps working when IBKR adds or moves columns.
+# The Header row is compiled once into an itemgetter over the resolved column
+# positions, and compiled extractors are shared across files with the same header.
+# A Header row lacking a named column is logged, and the Data rows under it are
+# skipped, unless the handler declares that header optional (e.g. the second,
+# time-weighted return header of the Net Asset Value section).
+# /////////////////////////////////////////////////////////////////////////////
+
+class SectionHandler:
+    """Base class for handlers consuming the rows of a single statement section"""
+    section: str = ''
+
+    def handle(self, row: List[str]) -> None:
+        """Consume a single row of the section"""
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        """Get the data extracted from the rows consumed so far"""
+        raise NotImplementedError
+
+
+@lru_cache(maxsize=None)
+def compile_row_extractor(header: Tuple[str, ...], columns: Tuple[str, ...]) -> Optional[Callable]:
+    """
+    Compile a function returning the named columns of a data row as a tuple
+
+    Args:
+        header: Header row of a section
+        columns: Names of the columns to extract, in the order they are returned
+    Returns:
+        itemgetter over the column positions, or None if the header lacks any column
+    """
+    try:
+        return itemgetter(*(header.index(column) for column in columns))
+    except ValueError:
+        return None
+
+
+class HeaderDrivenHandler(SectionHandler):
+    """
+    Base class for handlers that extract named columns from the Data rows of a section.
+    Subclasses set the columns to extract and implement handle_values. Headers whose
+    first column is in optional_headers may lack the columns without a warning.
+    """
+    columns: Tuple[str, ...] = ()
+    optional_headers: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self.extract = None
+
+    def handle(self, row: List[str]) -> None:
+        row_type = row[1]
+        if row_type == 'Data':
+            if self.extract is not None:
+                self.handle_values(*self.extract(row))
+        elif row_type == 'Header':
+            self.extract = compile_row_extractor(tuple(row), self.columns)
+            if self.extract is None and (len(row) < 3 or row[2] not in self.optional_headers):
+                missing = [column for column in self.columns if column not in row]
+                log_error.warning(f"{self.section} header lacks columns {', '.join(missing)}, its Data rows are skipped")
+
+    def handle_values(self, *values: str) -> None:
+        """Consume the values of the named columns from a single Data row"""
+        raise NotImplementedError
+
+
+class SectionDispatcher:
+    """Routes statement rows to the handlers registered for their section"""
+
+    def __init__(self, handlers: Iterable[SectionHandler] = ()):
+        self._handlers: Dict[str, List[SectionHandler]] = {}
+        for handler in handlers:
+            self.register(handler)
+
+    def register(self, handler: SectionHandler) -> None:
+        """Subscribe a handler to the rows of its section"""
+        self._handlers.setdefault(handler.section, []).append(handler)
+
+    def sections(self) -> List[str]:
+        """Get the names of the sections that have a handler registered"""
+        return list(self._handlers)
+
+    def dispatch(self, rows: Iterable[List[str]]) -> None:
+        """Send each row to the handlers of its section, discarding rows nobody subscribed to"""
+        handlers = self._handlers
+        for row in rows:
+            if len(row) < 2:
+                continue
+            subscribed = handlers.get(row[0])
+            if subscribed is not None:
+                for handler in subscribed:
+                    handler.handle(row)
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from src.engine.data_structures import Statement
+from src.file_IO.fingerprints import file_stat_fingerprint, file_content_hash
+from src.file_IO.write_files import write_file_atomically
+from src.monitor.log_system import get_loggers
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# PERSISTENT CACHE OF PARSED IBKR STATEMENTS
+#
+# IBKR statements never change once downloaded, so each parsed Statement is
+# pickled to the cache directory and re-used on later runs. Entries are keyed
+# by the statement file path and validated against the file's size and
+# modification time. If those differ but the size is unchanged, the content hash
+# decides whether the file really changed (e.g. it was copied or touched).
+#
+# The whole cache is discarded when the parser version changes, and the least
+# recently used entries are evicted when the cache grows beyond its size cap.
+# /////////////////////////////////////////////////////////////////////////////
+
+@dataclass
+class CacheEntry:
+    """Fingerprint of a statement file and the location of its cached Statement"""
+    size: int
+    mtime_ns: int
+    content_hash: str
+    cache_file: str
+    cache_bytes: int
+    last_used: float
+
+
+class StatementCache:
+    """On-disk cache of parsed Statement objects keyed by statement file fingerprint"""
+    INDEX_FILE = 'index.pickle'
+    SECTIONS_DIR = 'sections'
+
+    def __init__(self, cache_dir: str, parser_version: int, max_bytes: int):
+        """
+        Args:
+            cache_dir: Directory holding the cache index and pickled statements
+            parser_version: Version of the statement parser that produced the entries
+            max_bytes: Maximum total size of the pickled statements before eviction
+        """
+        self.cache_dir = cache_dir
+        self.sections_dir = os.path.join(cache_dir, self.SECTIONS_DIR)
+        self.parser_version = parser_version
+        self.max_bytes = max_bytes
+        self.entries: Dict[str, CacheEntry] = {}
+        self._load_index()
+
+    # /////////////////////////////////////////////////////////////////////////
+    def get(self, filepath: str) -> Optional[Statement]:
+        """Get the cached Statement for a file, or None if it is missing or stale"""
+        entry = self.entries.get(filepath)
+        if entry is None:
+            return None
+
+        size, mtime_ns = file_stat_fingerprint(filepath)
+        if (size, mtime_ns) != (entry.size, entry.mtime_ns):
+            if size != entry.size or file_content_hash(filepath) != entry.content_hash:
+                self._remove(filepath)
+                return None
+            entry.mtime_ns = mtime_ns
+
+        statement = self._read_entry(entry)
+        if statement is None:
+            self._remove(filepath)
+            return None
+
+        entry.last_used = time.time()
+        return statement
+
+    def get_many(self, filepaths: Iterable[str]) -> Dict[str, Statement]:
+        """Get the cached Statements for all files that have a valid cache entry"""
+        hits = {}
+        for filepath in filepaths:
+            statement = self.get(filepath)
+            if statement is not None:
+                hits[filepath] = statement
+        return hits
+
+    def put(self, filepath: str, statement: Statement) -> None:
+        """Store the parsed Statement for a file, evicting old entries if over the size cap"""
+        size, mtime_ns = file_stat_fingerprint(filepath)
+        cache_file = hashlib.sha256(filepath.encode('utf-8')).hexdigest() + '.pickle'
+
+        try:
+            data = pickle.dumps(statement, protocol=pickle.HIGHEST_PROTOCOL)
+            write_file_atomically(os.path.join(self.cache_dir, cache_file), data)
+
+        except Exception as err:
+            log_error.warning(f"Could not cache statement {filepath}: {err}")
+            return
+
+        self.entries[filepath] = CacheEntry(
+            size=size,
+            mtime_ns=mtime_ns,
+            content_hash=file_content_hash(filepath),
+            cache_file=cache_file,
+            cache_bytes=len(data),
+            last_used=time.time()
+        )
+        self._evict()
+
+    def save(self) -> None:
+        """Write the cache index to disk"""
+        index = {'parser_version': self.parser_version, 'entries': self.entries}
+        try:
+            data = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+            write_file_atomically(os.path.join(self.cache_dir, self.INDEX_FILE), data)
+
+        except Exception as err:
+            log_error.warning(f"Could not save statement cache index: {err}")
+
+    def clear(self) -> None:
+        """Remove every entry from the cache"""
+        for filepath in list(self.entries):
+            self._remove(filepath)
+
+    # /////////////////////////////////////////////////////////////////////////
+    def _load_index(self) -> None:
+        """Load the cache index, discarding the cache if it was built by another parser version"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        if not os.path.isfile(index_path):
+            return
+
+        try:
+            with open(index_path, 'rb') as file:
+                index = pickle.load(file)
+
+        except Exception as err:
+            log_error.warning(f"Statement cache index unreadable, rebuilding cache: {err}")
+            index = {'parser_version': None, 'entries': {}}
+
+        self.entries = index['entries']
+        if index['parser_version'] != self.parser_version:
+            log_system.info("Statement parser version changed, clearing statement cache")
+            self.clear()
+            self._remove_orphans()
+
+    def _read_entry(self, entry: CacheEntry) -> Optional[Statement]:
+        """Unpickle the Statement for a cache entry, or None if the cache file is unusable"""
+        try:
+            with open(os.path.join(self.cache_dir, entry.cache_file), 'rb') as file:
+                return pickle.load(file)
+
+        except Exception as err:
+            log_error.warning(f"Could not read cached statement {entry.cache_file}: {err}")
+            return None
+
+    def _remove(self, filepath: str) -> None:
+        """Remove the entry for a file and delete its cache file"""
+        entry = self.entries.pop(filepath)
+        try:
+            os.remove(os.path.join(self.cache_dir, entry.cache_file))
+        except FileNotFoundError:
+            pass
+
+    def _remove_orphans(self) -> None:
+        """Delete cache files that are not referenced by any entry"""
+        referenced = {entry.cache_file for entry in self.entries.values()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pickle') and name != self.INDEX_FILE and name not in referenced:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _evict(self) -> None:
+        """Evict the least recently used entries until the cache is within its size cap"""
+        total = sum(entry.cache_bytes for entry in self.entries.values())
+        if total <= self.max_bytes:
+            return
+
+        by_age = sorted(self.entries.items(), key=lambda item: item[1].last_used)
+        for filepath, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= entry.cache_bytes
+            self._remove(filepath)
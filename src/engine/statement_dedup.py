@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from src.engine.data_structures import StatementHeader
+from src.file_IO.fingerprints import file_content_hash, file_modified_time, file_stat_fingerprint
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# DETECTION OF DUPLICATE AND OVERLAPPING STATEMENT FILES
+#
+# The same account and period is often downloaded more than once, and daily and
+# monthly statements overlap. Duplicates are dropped before the full parse in
+# two passes:
+#
+#   1. Exact duplicates: files with identical contents. Only files sharing a
+#      size with another file are hashed, and the first file path is kept.
+#   2. Overlaps: statements of the same account with the same period end,
+#      which are snapshots of the same positions. One is kept according to
+#      a precedence rule, e.g. the monthly statement over the daily one.
+#
+# Statements of one account with different period ends are all kept, since
+# each is a snapshot at a different date. Files whose header cannot be read
+# are kept, so that their parse error is reported as usual.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Rules ranking statements covering the same account and period end. The
+# highest ranked statement is kept, and ties go to the first file path.
+PRECEDENCE_RULES: Dict[str, Callable[[StatementHeader], Tuple]] = {
+    'longest': lambda header: (header.period_end - header.period_start,),
+    'shortest': lambda header: (header.period_start - header.period_end,),
+    'newest': lambda header: (statement_modified_time(header.filepath),),
+    'first': lambda header: (),
+}
+
+
+@dataclass(slots=True, frozen=True)
+class DroppedStatement:
+    """A statement file left out of ingestion, with the file kept in its place"""
+    filepath: str
+    kept_filepath: str
+    reason: str
+
+
+@dataclass(slots=True)
+class DedupReport:
+    """The statement files kept and dropped by dedup_statements"""
+    kept: List[str] = field(default_factory=list)
+    dropped: List[DroppedStatement] = field(default_factory=list)
+
+    def log(self) -> None:
+        """Log a summary of the dropped statements, and each one in the output log"""
+        if not self.dropped:
+            return
+        log_system.info(f"{len(self.dropped)} duplicate statements dropped, {len(self.kept)} kept")
+        for item in self.dropped:
+            log_output.info(f"DROPPED {item.filepath} ({item.reason}), KEPT {item.kept_filepath}")
+
+
+def statement_modified_time(filepath: str) -> int:
+    """Get the modification time of a statement file, or -1 to rank it oldest if it cannot be read"""
+    try:
+        return file_modified_time(filepath)
+    except exceptions.ReadFileError:
+        return -1
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def dedup_statements(
+    filepaths: List[str],
+    headers: Dict[str, StatementHeader],
+    precedence: str = 'longest',
+    content_hashes: Optional[Dict[str, str]] = None
+) -> DedupReport:
+    """
+    Drop exact duplicate statement files, then statements that overlap another of
+    the same account and period end, keeping the order of the file paths
+
+    Args:
+        filepaths: Paths of the statement files
+        headers: Statement headers keyed by file path, see read_statement_headers
+        precedence: Name of the rule in PRECEDENCE_RULES choosing between overlaps
+        content_hashes: Content hashes keyed by file path, reused and filled in
+            across calls (None hashes files afresh)
+    Returns:
+        DedupReport of the kept file paths and the dropped statements
+    """
+    if precedence not in PRECEDENCE_RULES:
+        raise ValueError(f"Invalid statement precedence: {precedence}")
+
+    report = DedupReport()
+    unique = drop_exact_duplicates(filepaths, report, content_hashes)
+    winners = select_overlap_winners(unique, headers, PRECEDENCE_RULES[precedence])
+
+    for filepath in unique:
+        header = headers.get(filepath)
+        if header is None:
+            report.kept.append(filepath)
+            continue
+
+        winner = winners[(header.account, header.period_end)]
+        if winner.filepath == filepath:
+            report.kept.append(filepath)
+        else:
+            report.dropped.append(DroppedStatement(
+                filepath, winner.filepath, f"overlaps {header.account} to {header.period_end:%Y-%m-%d}, {precedence} kept"
+            ))
+
+    return report
+
+
+def drop_exact_duplicates(
+    filepaths: List[str],
+    report: DedupReport,
+    content_hashes: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """Get the file paths without exact duplicates, recording the dropped files in the report"""
+    by_size = {}
+    for filepath in filepaths:
+        try:
+            by_size.setdefault(file_stat_fingerprint(filepath)[0], []).append(filepath)
+        except exceptions.ReadFileError:
+            continue
+
+    duplicate_of = {}
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        first_by_hash = {}
+        for filepath in same_size:
+            try:
+                first = first_by_hash.setdefault(cached_content_hash(filepath, content_hashes), filepath)
+            except exceptions.ReadFileError:
+                continue
+            if first != filepath:
+                duplicate_of[filepath] = first
+
+    for filepath, first in duplicate_of.items():
+        report.dropped.append(DroppedStatement(filepath, first, 'identical contents'))
+    return [filepath for filepath in filepaths if filepath not in duplicate_of]
+
+
+def cached_content_hash(filepath: str, content_hashes: Optional[Dict[str, str]]) -> str:
+    """Get the content hash of a file, from and into content_hashes if given"""
+    if content_hashes is None:
+        return file_content_hash(filepath)
+    if filepath not in content_hashes:
+        content_hashes[filepath] = file_content_hash(filepath)
+    return content_hashes[filepath]
+
+
+def select_overlap_winners(
+    filepaths: List[str],
+    headers: Dict[str, StatementHeader],
+    rank: Callable[[StatementHeader], Tuple]
+) -> Dict[Tuple[str, datetime], StatementHeader]:
+    """Get the highest ranked statement for each account and period end"""
+    winners = {}
+    for filepath in filepaths:
+        header = headers.get(filepath)
+        if header is None:
+            continue
+        key = (header.account, header.period_end)
+        current = winners.get(key)
+        if current is None or rank(header) > rank(current):
+            winners[key] = header
+    return winners
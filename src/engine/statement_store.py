@@ -0,0 +1,444 @@
+import os
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from src.engine.data_structures import OpenPosition, OpenAccrual, Statement, NetAssetValue
+from src.file_IO.archives import archived_path_exists
+from src.monitor.log_system import get_loggers
+from src.sandbox.data_structures import Trade
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# SQLITE STORE OF PARSED IBKR STATEMENTS
+#
+# Parsed statements are written to a local SQLite database so that historical
+# questions can be answered without re-reading the statement files. The
+# account and date of each statement are repeated on its position, accrual and
+# NAV rows so that every query is answered from a single indexed table.
+#
+# Decimal amounts are stored as text so that no precision is lost, and dates
+# are stored as ISO strings (YYYY-MM-DD) so that they sort and compare in SQL.
+#
+# Several files can hold the statement of the same account and date (e.g. a
+# statement downloaded twice), so queries read only the statement stored last
+# for each account and date. Trades are reported by every statement covering
+# their day, so each (account, trade day) is read from a single statement, as
+# collect_statement_trades does. Statements whose file no longer exists are
+# removed by remove_missing_files.
+#
+# The store only holds data parsed from the statement files, so a database
+# written with an older SCHEMA_VERSION is dropped and rebuilt from the next
+# statements added.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Version of the schema, increased whenever a table changes
+SCHEMA_VERSION = 2
+
+TABLES = ('trades', 'fx_rates', 'net_asset_values', 'open_accruals', 'open_positions', 'statements')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS statements (
+        id INTEGER PRIMARY KEY,
+        filepath TEXT NOT NULL UNIQUE,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        base_currency TEXT
+    );
+    CREATE TABLE IF NOT EXISTS open_positions (
+        statement_id INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        quantity TEXT NOT NULL,
+        price TEXT NOT NULL,
+        value TEXT NOT NULL,
+        asset_category TEXT
+    );
+    CREATE TABLE IF NOT EXISTS open_accruals (
+        statement_id INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        quantity TEXT NOT NULL,
+        gross_amount TEXT NOT NULL,
+        net_amount TEXT NOT NULL,
+        withholding_tax TEXT NOT NULL,
+        amount_per_share TEXT NOT NULL,
+        ex_date TEXT NOT NULL,
+        pay_date TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS net_asset_values (
+        statement_id INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        cash TEXT NOT NULL,
+        stock TEXT NOT NULL,
+        options TEXT NOT NULL,
+        bonds TEXT NOT NULL,
+        interest_accruals TEXT NOT NULL,
+        dividend_accruals TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS fx_rates (
+        statement_id INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        rate TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS trades (
+        statement_id INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+        account TEXT NOT NULL,
+        trade_day TEXT NOT NULL,
+        trade_ID INTEGER NOT NULL,
+        traded_at TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        trantype TEXT NOT NULL,
+        quantity REAL NOT NULL,
+        currency TEXT NOT NULL,
+        amt_before_costs REAL NOT NULL,
+        costs REAL NOT NULL,
+        amt_after_costs REAL NOT NULL,
+        price REAL NOT NULL,
+        broker TEXT NOT NULL,
+        notes TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_statements_account_date ON statements(account, date);
+    CREATE INDEX IF NOT EXISTS idx_positions_statement ON open_positions(statement_id);
+    CREATE INDEX IF NOT EXISTS idx_positions_account_date ON open_positions(account, date);
+    CREATE INDEX IF NOT EXISTS idx_positions_ticker_date ON open_positions(ticker, date);
+    CREATE INDEX IF NOT EXISTS idx_accruals_statement ON open_accruals(statement_id);
+    CREATE INDEX IF NOT EXISTS idx_accruals_account_date ON open_accruals(account, date);
+    CREATE INDEX IF NOT EXISTS idx_accruals_ticker_date ON open_accruals(ticker, date);
+    CREATE INDEX IF NOT EXISTS idx_nav_statement ON net_asset_values(statement_id);
+    CREATE INDEX IF NOT EXISTS idx_nav_account_date ON net_asset_values(account, date);
+    CREATE INDEX IF NOT EXISTS idx_fx_statement ON fx_rates(statement_id);
+    CREATE INDEX IF NOT EXISTS idx_fx_currency_date ON fx_rates(currency, date);
+    CREATE INDEX IF NOT EXISTS idx_trades_statement ON trades(statement_id);
+    CREATE INDEX IF NOT EXISTS idx_trades_account_day ON trades(account, trade_day, statement_id);
+"""
+
+# Statement stored last for each account and date
+CURRENT_STATEMENTS_QUERY = """
+    SELECT MAX(id) FROM statements GROUP BY account, date
+"""
+
+# Latest statement in each account dated on or before a given date
+LATEST_STATEMENTS_QUERY = """
+    SELECT MAX(s.id) FROM statements s
+    JOIN (
+        SELECT account, MAX(date) AS date FROM statements
+        WHERE date <= ? GROUP BY account
+    ) latest ON s.account = latest.account AND s.date = latest.date
+    GROUP BY s.account
+"""
+
+
+class StatementStore:
+    """SQLite database of parsed statements with indexed account, date and ticker queries"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Path of the SQLite database file, created if it does not exist
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self._create_schema()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self.connection.close()
+
+    def _create_schema(self) -> None:
+        """Create the tables, dropping those of an older schema version"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with self.connection:
+                for table in TABLES:
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            if version:
+                log_system.info(f"Statement store schema {version} replaced by schema {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    # /////////////////////////////////////////////////////////////////////////
+    # INGESTION
+
+    def add_statements(self, statements: Dict[str, Statement]) -> None:
+        """
+        Write statements to the database in a single transaction using bulk inserts.
+        A statement already stored for the same file path is replaced.
+
+        Args:
+            statements: Statements keyed by the path of the file they were parsed from
+        """
+        with self.connection:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                "DELETE FROM statements WHERE filepath = ?",
+                [(filepath,) for filepath in statements]
+            )
+
+            positions, accruals, navs, rates, trades = [], [], [], [], []
+            for filepath, statement in statements.items():
+                date = iso_date(statement.date)
+                cursor.execute(
+                    "INSERT INTO statements (filepath, account, date, base_currency) VALUES (?, ?, ?, ?)",
+                    (filepath, statement.account, date, statement.base_currency)
+                )
+                statement_id = cursor.lastrowid
+                key = (statement_id, statement.account, date)
+
+                positions.extend(key + position_row(position) for position in statement.open_positions)
+                accruals.extend(key + accrual_row(accrual) for accrual in statement.open_accruals)
+                navs.append(key + nav_row(statement.net_asset_values))
+                rates.extend(key + (currency, str(rate)) for currency, rate in (statement.fx_rates or {}).items())
+                trades.extend((statement_id, statement.account) + trade_row(trade) for trade in statement.trades or ())
+
+            cursor.executemany("INSERT INTO open_positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", positions)
+            cursor.executemany("INSERT INTO open_accruals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", accruals)
+            cursor.executemany("INSERT INTO net_asset_values VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", navs)
+            cursor.executemany("INSERT INTO fx_rates VALUES (?, ?, ?, ?, ?)", rates)
+            cursor.executemany("INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", trades)
+
+        log_system.info(f"{len(statements)} statements written to the statement store")
+
+    def remove_missing_files(self) -> int:
+        """
+        Delete the statements whose file no longer exists, with all their rows
+
+        Returns:
+            Number of statements deleted
+        """
+        missing = [
+            (filepath,) for (filepath,) in self.connection.execute("SELECT filepath FROM statements")
+            if not archived_path_exists(filepath)
+        ]
+        with self.connection:
+            self.connection.executemany("DELETE FROM statements WHERE filepath = ?", missing)
+
+        if missing:
+            log_system.info(f"{len(missing)} statements of deleted files removed from the statement store")
+        return len(missing)
+
+    # /////////////////////////////////////////////////////////////////////////
+    # QUERIES
+
+    def positions_as_of(self, date: datetime, account: Optional[str] = None) -> Dict[str, List[OpenPosition]]:
+        """Get the open positions by account from the latest statement dated on or before a date"""
+        query = f"""
+            SELECT account, ticker, quantity, price, value, currency, asset_category FROM open_positions
+            WHERE statement_id IN ({LATEST_STATEMENTS_QUERY})
+        """
+        params = [iso_date(date)]
+        if account is not None:
+            query += " AND account = ?"
+            params.append(account)
+
+        positions = {}
+        for account, ticker, quantity, price, value, currency, category in self.connection.execute(query, params):
+            positions.setdefault(account, []).append(
+                OpenPosition(ticker, quantity, price, value, currency, asset_category=category)
+            )
+        return positions
+
+    def accruals_as_of(self, date: datetime, account: Optional[str] = None) -> Dict[str, List[OpenAccrual]]:
+        """Get the open dividend accruals by account from the latest statement dated on or before a date"""
+        query = f"""
+            SELECT account, ticker, quantity, gross_amount, net_amount, withholding_tax,
+                amount_per_share, ex_date, pay_date, currency FROM open_accruals
+            WHERE statement_id IN ({LATEST_STATEMENTS_QUERY})
+        """
+        params = [iso_date(date)]
+        if account is not None:
+            query += " AND account = ?"
+            params.append(account)
+
+        accruals = {}
+        for row in self.connection.execute(query, params):
+            account, ticker, quantity, gross, net, tax, per_share, ex_date, pay_date, currency = row
+            accruals.setdefault(account, []).append(OpenAccrual(
+                ticker, quantity, gross, net, tax, per_share,
+                datetime.fromisoformat(ex_date), datetime.fromisoformat(pay_date), currency
+            ))
+        return accruals
+
+    def nav_history(
+        self,
+        account: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Tuple[datetime, NetAssetValue]]:
+        """Get the Net Asset Value of an account at each statement date, in date order"""
+        query = f"""
+            SELECT date, cash, stock, options, bonds, interest_accruals, dividend_accruals
+            FROM net_asset_values WHERE account = ? AND statement_id IN ({CURRENT_STATEMENTS_QUERY})
+        """
+        params = [account]
+        query, params = restrict_dates(query, params, date_from, date_to)
+
+        return [
+            (datetime.fromisoformat(date), NetAssetValue(*components))
+            for date, *components in self.connection.execute(query + " ORDER BY date", params)
+        ]
+
+    def ticker_holdings(
+        self,
+        ticker: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Tuple[str, datetime, OpenPosition]]:
+        """Get every (account, statement date, position) holding a ticker, in date order"""
+        query = f"""
+            SELECT account, date, ticker, quantity, price, value, currency, asset_category
+            FROM open_positions WHERE ticker = ? AND statement_id IN ({CURRENT_STATEMENTS_QUERY})
+        """
+        params = [ticker]
+        query, params = restrict_dates(query, params, date_from, date_to)
+
+        return [
+            (account, datetime.fromisoformat(date), OpenPosition(*position[:5], asset_category=position[5]))
+            for account, date, *position in self.connection.execute(query + " ORDER BY date, account", params)
+        ]
+
+    def fx_rate_history(
+        self,
+        currency: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Tuple[datetime, str, Decimal]]:
+        """Get every (statement date, base currency, rate) reported for a currency, in date order"""
+        query = f"""
+            SELECT DISTINCT r.date, s.base_currency, r.rate FROM fx_rates r
+            JOIN statements s ON s.id = r.statement_id
+            WHERE r.currency = ? AND r.statement_id IN ({CURRENT_STATEMENTS_QUERY})
+        """
+        params = [currency]
+        query, params = restrict_dates(query, params, date_from, date_to, 'r.date')
+
+        return [
+            (datetime.fromisoformat(date), base_currency, Decimal(rate))
+            for date, base_currency, rate in self.connection.execute(query + " ORDER BY r.date", params)
+        ]
+
+    def trades(
+        self,
+        account: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Trade]:
+        """
+        Get the trades of an account in trade time order, taking each trade day from
+        the statement stored last among those reporting it
+        """
+        query = """
+            SELECT trade_ID, traded_at, ticker, trantype, quantity, currency, amt_before_costs,
+                costs, amt_after_costs, price, broker, notes FROM trades t
+            WHERE account = ? AND statement_id = (
+                SELECT MAX(statement_id) FROM trades WHERE account = t.account AND trade_day = t.trade_day
+            )
+        """
+        params = [account]
+        query, params = restrict_dates(query, params, date_from, date_to, 'trade_day')
+
+        trades = []
+        for trade_ID, traded_at, *columns in self.connection.execute(query + " ORDER BY traded_at, trade_ID", params):
+            traded_at = datetime.fromisoformat(traded_at)
+            ticker, trantype, quantity, currency, before_costs, costs, after_costs, price, broker, notes = columns
+            trades.append(Trade(
+                trade_ID, traded_at, traded_at.replace(hour=0, minute=0, second=0, microsecond=0),
+                ticker, trantype, quantity, currency, before_costs, costs, after_costs, price, broker, notes
+            ))
+        return trades
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# FUNCTIONS TO CONVERT BETWEEN RECORDS AND DATABASE ROWS
+
+def iso_date(date: datetime) -> str:
+    """Convert a datetime to the ISO date string stored in the database"""
+    return date.date().isoformat() if isinstance(date, datetime) else date.isoformat()
+
+
+def restrict_dates(
+    query: str,
+    params: List,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    column: str = 'date'
+):
+    """Add optional date range conditions on a date column to a query"""
+    if date_from is not None:
+        query += f" AND {column} >= ?"
+        params.append(iso_date(date_from))
+    if date_to is not None:
+        query += f" AND {column} <= ?"
+        params.append(iso_date(date_to))
+    return query, params
+
+
+def position_row(position: OpenPosition) -> Tuple:
+    """Convert an OpenPosition into the columns stored after the statement key"""
+    return (
+        position.ticker,
+        position.currency,
+        str(position.quantity),
+        str(position.price),
+        str(position.value),
+        position.asset_category
+    )
+
+
+def accrual_row(accrual: OpenAccrual) -> Tuple:
+    """Convert an OpenAccrual into the columns stored after the statement key"""
+    return (
+        accrual.ticker,
+        accrual.currency,
+        str(accrual.quantity),
+        str(accrual.gross_amount),
+        str(accrual.net_amount),
+        str(accrual.withholding_tax),
+        str(accrual.amount_per_share),
+        iso_date(accrual.ex_date),
+        iso_date(accrual.pay_date)
+    )
+
+
+def trade_row(trade: Trade) -> Tuple:
+    """Convert a Trade into the columns stored after the statement ID and account"""
+    return (
+        iso_date(trade.tradedate),
+        trade.tradeID,
+        trade.tradedate.isoformat(),
+        trade.ticker,
+        trade.trantype,
+        trade.quantity,
+        trade.currency,
+        trade.amt_before_costs,
+        trade.costs,
+        trade.amt_after_costs,
+        trade.price,
+        trade.broker,
+        trade.notes
+    )
+
+
+def nav_row(nav: NetAssetValue) -> Tuple:
+    """Convert a NetAssetValue into the columns stored after the statement key"""
+    return (
+        str(nav.NAV_cash),
+        str(nav.NAV_stock),
+        str(nav.NAV_options),
+        str(nav.NAV_bonds),
+        str(nav.NAV_interest_accruals),
+        str(nav.NAV_dividend_accruals)
+    )
@@ -0,0 +1,166 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from src.engine.data_structures import Statement
+from src.engine.data_structures import StatementHeader
+from src.engine.IBKR_statements import load_ibkr_statements, read_statement_headers, select_statements, STATEMENT_EXTENSIONS
+from src.engine.statement_cache import StatementCache
+from src.engine.ticker_revisions import TickerResolver
+from src.file_IO.filepaths import iter_filepaths
+from src.file_IO.fingerprints import file_stat_fingerprint
+from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# WATCH THE STATEMENT DIRECTORY FOR NEW OR CHANGED STATEMENTS
+#
+# The StatementWatcher polls the statement directory on a background thread and
+# compares the size and modification time of every statement file with the
+# previous poll. The first fingerprints should be taken before the initial load,
+# so that a file changed while it is loading is picked up by the first poll.
+#
+# When anything changed, the files to load are selected again as the initial
+# load selects them, dropping duplicates and keeping only the latest statements
+# if requested. The statement headers and content hashes behind that selection
+# are kept between polls, so only the headers of changed files are read again
+# and only changed files are hashed, while the selection itself is redone in
+# memory over the kept headers. Only newly selected or
+# changed files are parsed, and statements no longer selected are dropped, so
+# parsing costs in proportion to the number of changed files rather than to the
+# size of the directory. Re-parsed statements have their renamed tickers
+# resolved, as the statements of the initial load do.
+#
+# After a refresh that changed anything, the full list of statements is passed
+# to the on_update callback, which is expected to swap it into the consumer
+# (e.g. the web pages) with a single assignment.
+# /////////////////////////////////////////////////////////////////////////////
+
+class StatementWatcher:
+    """Polls the statement directory and incrementally re-parses new or changed statements"""
+
+    def __init__(
+        self,
+        statements_directory: str,
+        statements: Dict[str, Statement],
+        interval: float = 5.0,
+        cache: Optional[StatementCache] = None,
+        resolver: Optional[TickerResolver] = None,
+        fingerprints: Optional[Dict[str, Tuple[int, int]]] = None,
+        latest_only: bool = False,
+        dedup_precedence: Optional[str] = None
+    ):
+        """
+        Args:
+            statements_directory: Path to parent directory containing IBKR statement files
+            statements: Statements already loaded, keyed by file path
+            interval: Seconds between polls of the statement directory
+            cache: Cache of parsed statements, updated with each re-parsed file
+            resolver: Resolver of renamed tickers applied to re-parsed statements
+            fingerprints: Fingerprints taken by scan_statement_files before the
+                statements were loaded (None scans the directory now)
+            latest_only: Only keep the statement with the latest period end in each account
+            dedup_precedence: Drop duplicate and overlapping statements, see
+                process_ibkr_statements_directory
+        """
+        self.statements_directory = statements_directory
+        self.statements = dict(statements)
+        self.interval = interval
+        self.cache = cache
+        self.resolver = resolver
+        self.latest_only = latest_only
+        self.dedup_precedence = dedup_precedence
+        self.fingerprints = fingerprints if fingerprints is not None else self._scan()
+        self.headers: Optional[Dict[str, StatementHeader]] = None
+        self.content_hashes: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, on_update: Callable[[List[Statement]], None]) -> None:
+        """Start polling on a daemon thread, calling on_update after each change"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_update,), daemon=True, name='statement-watcher')
+        self._thread.start()
+        log_system.info(f"Watching {self.statements_directory} for statement changes every {self.interval}s")
+
+    def stop(self) -> None:
+        """Stop polling and wait for the polling thread to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> bool:
+        """
+        Select the statement files again after any change, re-parsing new or changed
+        files and dropping statements that are deleted or no longer selected
+
+        Returns:
+            True if any statement file was added, changed or removed
+        """
+        fingerprints = self._scan()
+        changed = [path for path, fingerprint in fingerprints.items() if self.fingerprints.get(path) != fingerprint]
+        removed = [path for path in self.fingerprints if path not in fingerprints]
+        self.fingerprints = fingerprints
+
+        if not changed and not removed:
+            return False
+
+        log_system.info(f"Statement changes detected: {len(changed)} new or changed, {len(removed)} removed")
+        self._update_headers(list(fingerprints), changed, removed)
+        selected = select_statements(
+            list(fingerprints), self.headers, self.latest_only,
+            dedup_precedence=self.dedup_precedence, content_hashes=self.content_hashes
+        )
+        changed = set(changed)
+        statements = {
+            path: statement for path, statement in self.statements.items()
+            if path in fingerprints and path not in changed
+        }
+        loaded = load_ibkr_statements([path for path in selected if path not in statements], cache=self.cache)
+        if self.resolver is not None:
+            loaded = self.resolver.resolve_statements(loaded)
+        statements.update(loaded)
+        self.statements = {path: statements[path] for path in selected if path in statements}
+        return True
+
+    def _update_headers(self, filepaths: List[str], changed: List[str], removed: List[str]) -> None:
+        """Read the headers of changed files into the kept headers, reading all on first use"""
+        for filepath in changed + removed:
+            self.content_hashes.pop(filepath, None)
+        if not self.latest_only and self.dedup_precedence is None:
+            return
+
+        if self.headers is None:
+            self.headers = read_statement_headers(filepaths)
+            return
+        for filepath in changed + removed:
+            self.headers.pop(filepath, None)
+        self.headers.update(read_statement_headers(changed))
+
+    def _run(self, on_update: Callable[[List[Statement]], None]) -> None:
+        """Poll until stopped, never letting an error end the polling thread"""
+        while not self._stop.wait(self.interval):
+            try:
+                if self.poll():
+                    on_update(list(self.statements.values()))
+
+            except Exception as err:
+                log_error.error(f"Statement watcher refresh failed: {err}")
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Get the size and modification time of every statement file in the directory"""
+        return scan_statement_files(self.statements_directory)
+
+
+def scan_statement_files(statements_directory: str) -> Dict[str, Tuple[int, int]]:
+    """Get the size and modification time of every statement file in a directory and its subdirectories"""
+    fingerprints = {}
+    for path in iter_filepaths(statements_directory, extensions=STATEMENT_EXTENSIONS, archives=True):
+        try:
+            fingerprints[path] = file_stat_fingerprint(path)
+        except exceptions.ReadFileError:
+            continue
+    return fingerprints
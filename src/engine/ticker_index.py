@@ -0,0 +1,308 @@
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from src.engine.data_structures import Statement
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# INVERTED INDEX OF OPEN POSITIONS BY TICKER
+#
+# The TickerIndex answers "where and when was ticker X held" without scanning
+# every statement. Each open position of each statement becomes a posting of
+# (account, date, quantity, value), and the postings are stored as flat NumPy
+# arrays sorted by (ticker, currency, date). The postings of each ticker and
+# currency are a contiguous slice located through an offsets array, so:
+#
+#   - an exact lookup is a binary search for the key, then a slice
+#   - a prefix lookup is a binary search for the first and last matching keys,
+#     which are adjacent because the keys are sorted
+#   - a date range is a binary search on the dates within each slice
+#
+# Postings of further statements are sorted on their own and merged into the
+# sorted arrays at positions found by binary search, so the postings already
+# held are never sorted again.
+#
+# Accounts are dictionary encoded and amounts are held as float64. The arrays
+# are saved to a single .npz file without pickling, so the index can be kept
+# next to the other parsed statement data and reloaded without re-parsing. The
+# saved index records a digest of what it was built from (e.g. the fingerprints
+# of the statement files), so that a caller can tell whether it is still fresh.
+# /////////////////////////////////////////////////////////////////////////////
+
+
+# Sorts after any character that can appear in a ticker, bounding prefix searches
+LAST_CHARACTER = '\U0010ffff'
+
+# Offset making the day numbers of dates non-negative in the merge sort keys
+DAY_OFFSET = 2 ** 31
+
+
+@dataclass(slots=True, frozen=True)
+class Posting:
+    """A holding of a ticker in an account at the date of a statement"""
+    ticker: str
+    currency: str
+    account: str
+    date: datetime
+    quantity: float
+    value: float
+
+
+class TickerIndex:
+    """Postings of open positions keyed by ticker and currency, in flat arrays sorted by key then date"""
+
+    def __init__(
+        self,
+        keys: List[Tuple[str, str]],
+        offsets: np.ndarray,
+        accounts: List[str],
+        account_codes: np.ndarray,
+        dates: np.ndarray,
+        quantities: np.ndarray,
+        values: np.ndarray,
+        source: str = ''
+    ):
+        """
+        Args:
+            keys: Sorted (ticker, currency) keys
+            offsets: Start of each key's postings, with the total number of postings appended
+            accounts: Account labels indexed by the account codes
+            account_codes: Account code of each posting
+            dates: Statement date of each posting as datetime64[D]
+            quantities: Quantity held in each posting
+            values: Value held in each posting
+            source: Digest of what the index was built from, saved with it
+        """
+        self.keys = keys
+        self.offsets = offsets
+        self.accounts = accounts
+        self.account_codes = account_codes
+        self.dates = dates
+        self.quantities = quantities
+        self.values = values
+        self.source = source
+
+    @classmethod
+    def from_statements(cls, statements: Iterable[Statement]) -> 'TickerIndex':
+        """Build the index from the open positions of a list of statements"""
+        tickers, currencies, accounts, quantities, values = [], [], [], [], []
+        statement_dates, counts = [], []
+        for statement in statements:
+            positions = statement.open_positions
+            statement_dates.append(statement.date.date())
+            counts.append(len(positions))
+            accounts += [statement.account] * len(positions)
+            for position in positions:
+                tickers.append(position.ticker)
+                currencies.append(position.currency)
+                quantities.append(float(position.quantity))
+                values.append(float(position.value))
+
+        return cls.from_columns(
+            tickers, currencies, accounts,
+            np.repeat(np.array(statement_dates, dtype='datetime64[D]'), counts),
+            np.array(quantities, dtype=np.float64),
+            np.array(values, dtype=np.float64)
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        tickers: List[str],
+        currencies: List[str],
+        accounts: List[str],
+        dates: np.ndarray,
+        quantities: np.ndarray,
+        values: np.ndarray
+    ) -> 'TickerIndex':
+        """Build the index from unsorted columns of postings"""
+        keys = sorted(set(zip(tickers, currencies)))
+        key_codes = {key: code for code, key in enumerate(keys)}
+        posting_keys = np.array([key_codes[key] for key in zip(tickers, currencies)], dtype=np.int64)
+
+        account_labels = sorted(set(accounts))
+        account_codes = {account: code for code, account in enumerate(account_labels)}
+        posting_accounts = np.array([account_codes[account] for account in accounts], dtype=np.int32)
+
+        order = np.lexsort((dates, posting_keys))
+        offsets = np.searchsorted(posting_keys[order], np.arange(len(keys) + 1))
+        return cls(
+            keys, offsets, account_labels,
+            posting_accounts[order], dates[order], quantities[order], values[order]
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def add_statements(self, statements: Iterable[Statement]) -> 'TickerIndex':
+        """
+        Get a new index holding the postings of this index and of further statements.
+        The new postings are sorted on their own, then inserted into the sorted arrays
+        at the positions found by binary search, after any held posting of the same
+        key and date.
+        """
+        added = TickerIndex.from_statements(statements)
+        if len(added) == 0:
+            return self
+
+        keys = sorted(set(self.keys).union(added.keys))
+        accounts = sorted(set(self.accounts).union(added.accounts))
+        held_keys, held_accounts = self._posting_codes(keys, accounts)
+        added_keys, added_accounts = added._posting_codes(keys, accounts)
+
+        positions = np.searchsorted(
+            merge_sort_keys(held_keys, self.dates), merge_sort_keys(added_keys, added.dates), side='right'
+        )
+        posting_keys = np.insert(held_keys, positions, added_keys)
+        return TickerIndex(
+            keys,
+            np.searchsorted(posting_keys, np.arange(len(keys) + 1)),
+            accounts,
+            np.insert(held_accounts, positions, added_accounts),
+            np.insert(self.dates, positions, added.dates),
+            np.insert(self.quantities, positions, added.quantities),
+            np.insert(self.values, positions, added.values)
+        )
+
+    def _posting_codes(self, keys: List[Tuple[str, str]], accounts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the code of each posting's key and account in sorted lists holding every key and account of this index"""
+        key_codes = {key: code for code, key in enumerate(keys)}
+        account_codes = {account: code for code, account in enumerate(accounts)}
+        posting_keys = np.repeat(
+            np.array([key_codes[key] for key in self.keys], dtype=np.int64), np.diff(self.offsets)
+        )
+        recoded = np.array([account_codes[account] for account in self.accounts], dtype=np.int32)
+        return posting_keys, recoded[self.account_codes]
+
+    # /////////////////////////////////////////////////////////////////////////
+    # QUERIES
+
+    def tickers(self, prefix: str = '') -> List[str]:
+        """Get the distinct tickers starting with a prefix, in sorted order"""
+        start, end = self._prefix_range(prefix)
+        return list(dict.fromkeys(ticker for ticker, _ in self.keys[start:end]))
+
+    def lookup(
+        self,
+        ticker: str,
+        currency: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Posting]:
+        """
+        Get the postings of a ticker, optionally in one currency and within a date range
+
+        Args:
+            ticker: Exact ticker
+            currency: Currency of the position (None for every currency)
+            date_from: Earliest statement date to include
+            date_to: Latest statement date to include
+        Returns:
+            Postings ordered by currency, then date
+        """
+        if currency is not None:
+            start = bisect_left(self.keys, (ticker, currency))
+            end = start + 1 if start < len(self.keys) and self.keys[start] == (ticker, currency) else start
+        else:
+            start = bisect_left(self.keys, (ticker, ''))
+            end = bisect_left(self.keys, (ticker + '\0', ''))
+        return self._postings(start, end, date_from, date_to)
+
+    def prefix(
+        self,
+        prefix: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Posting]:
+        """Get the postings of every ticker starting with a prefix, ordered by ticker, currency and date"""
+        start, end = self._prefix_range(prefix)
+        return self._postings(start, end, date_from, date_to)
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Get the range of keys whose ticker starts with a prefix"""
+        return bisect_left(self.keys, (prefix, '')), bisect_left(self.keys, (prefix + LAST_CHARACTER, ''))
+
+    def _postings(
+        self,
+        start: int,
+        end: int,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime]
+    ) -> List[Posting]:
+        """Get the postings of a range of keys within a date range"""
+        postings = []
+        for code in range(start, end):
+            first, last = int(self.offsets[code]), int(self.offsets[code + 1])
+            dates = self.dates[first:last]
+            if date_to is not None:
+                last = first + int(np.searchsorted(dates, to_day(date_to), side='right'))
+            if date_from is not None:
+                first += int(np.searchsorted(dates, to_day(date_from), side='left'))
+
+            ticker, currency = self.keys[code]
+            for i, day in zip(range(first, last), self.dates[first:last].astype(datetime)):
+                postings.append(Posting(
+                    ticker, currency, self.accounts[self.account_codes[i]],
+                    datetime(day.year, day.month, day.day),
+                    float(self.quantities[i]), float(self.values[i])
+                ))
+        return postings
+
+    # /////////////////////////////////////////////////////////////////////////
+    # PERSISTENCE
+
+    def save(self, path: str) -> None:
+        """Save the index to a compressed .npz file, replacing any previous file atomically"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            tickers=np.array([ticker for ticker, _ in self.keys], dtype=str),
+            currencies=np.array([currency for _, currency in self.keys], dtype=str),
+            offsets=self.offsets,
+            accounts=np.array(self.accounts, dtype=str),
+            account_codes=self.account_codes,
+            dates=self.dates,
+            quantities=self.quantities,
+            values=self.values,
+            source=np.array(self.source, dtype=str)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'TickerIndex':
+        """Load an index saved by save"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                keys=list(zip(data['tickers'].tolist(), data['currencies'].tolist())),
+                offsets=data['offsets'],
+                accounts=data['accounts'].tolist(),
+                account_codes=data['account_codes'],
+                dates=data['dates'],
+                quantities=data['quantities'],
+                values=data['values'],
+                source=str(data['source']) if 'source' in data else ''
+            )
+
+    @classmethod
+    def load_fresh(cls, path: str, source: str) -> Optional['TickerIndex']:
+        """Load an index saved by save if it was built from the given source, otherwise get None"""
+        try:
+            index = cls.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return index if index.source == source else None
+
+
+def merge_sort_keys(key_codes: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """Combine key codes and dates into int64 values sorting as (key, date), for merging postings"""
+    return (key_codes << 32) | (dates.astype(np.int64) + DAY_OFFSET)
+
+
+def to_day(date: datetime) -> np.datetime64:
+    """Convert a date or datetime to a datetime64[D]"""
+    return np.datetime64(date.date() if isinstance(date, datetime) else date, 'D')
@@ -0,0 +1,164 @@
+from bisect import bisect_right
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from src.engine.conversions import parse_iso_date
+from src.engine.data_structures import Statement
+from src.engine.position_table import PositionTable
+from src.file_IO.read_files import iter_csv_headerless_UTF8
+from src.sandbox.data_structures import Ticker, Trade
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# RESOLUTION OF RENAMED TICKERS TO THEIR CURRENT TICKER
+#
+# A Ticker revision records that original_ticker became revised_ticker on
+# date_changed. From that date the original ticker no longer refers to the
+# renamed security, and it may later be given to a different one, so what a
+# ticker means depends on the date it was reported.
+#
+# The revisions are compiled into an interval index for each renamed ticker:
+# a sorted list of the dates it was renamed on, and the canonical ticker for
+# each interval between them. The canonical ticker is found by following the
+# chain of renames from the end of the interval to the ticker in use today.
+# The final interval, after the last rename, is the ticker itself.
+#
+# Resolving a (ticker, date) is then a dict lookup for tickers that were never
+# renamed, or a binary search over that ticker's rename dates. Results are
+# memoized, since statements repeat the same tickers on the same dates.
+# /////////////////////////////////////////////////////////////////////////////
+
+
+class TickerResolver:
+    """Maps a ticker reported on a date to the ticker that security has today"""
+
+    def __init__(self, revisions: Iterable[Ticker]):
+        """
+        Args:
+            revisions: Renames of tickers, in any order
+        """
+        renames = {}
+        for revision in revisions:
+            renames.setdefault(revision.original_ticker, []).append((revision.date_changed, revision.revised_ticker))
+
+        self.dates: Dict[str, List[datetime]] = {}
+        self.revised: Dict[str, List[str]] = {}
+        for ticker, changes in renames.items():
+            changes.sort()
+            self.dates[ticker] = [date for date, _ in changes]
+            self.revised[ticker] = [revised for _, revised in changes]
+
+        # Canonical ticker of each interval, the last interval being the ticker itself
+        self.canonical: Dict[str, List[str]] = {
+            ticker: [None] * len(dates) + [ticker] for ticker, dates in self.dates.items()
+        }
+        for ticker, canonical in self.canonical.items():
+            for index in range(len(canonical) - 1):
+                self._interval_canonical(ticker, index)
+        self._cache: Dict[Tuple[str, datetime], str] = {}
+
+    @classmethod
+    def from_csv(cls, abs_path: str) -> 'TickerResolver':
+        """Build a resolver from a headerless CSV file of date (YYYY-MM-DD), original ticker, revised ticker and reason rows"""
+        return cls(
+            Ticker(tickerID, row[1].strip(), row[2].strip(), parse_iso_date(row[0]), row[3].strip() if len(row) > 3 else '')
+            for tickerID, row in enumerate(iter_csv_headerless_UTF8(abs_path))
+            if len(row) >= 3
+        )
+
+    def _interval_canonical(self, ticker: str, index: int) -> str:
+        """
+        Get the canonical ticker of an interval of a renamed ticker, following the
+        rename that ends the interval. Each step of a chain moves to a later date,
+        so the chain always ends.
+        """
+        canonical = self.canonical[ticker]
+        if canonical[index] is None:
+            revised, date = self.revised[ticker][index], self.dates[ticker][index]
+            dates = self.dates.get(revised)
+            canonical[index] = revised if dates is None else self._interval_canonical(revised, bisect_right(dates, date))
+        return canonical[index]
+
+    def __len__(self) -> int:
+        return sum(len(dates) for dates in self.dates.values())
+
+    def resolve(self, ticker: str, date: datetime) -> str:
+        """Get the current ticker of the security reported as a ticker on a date"""
+        if ticker not in self.dates:
+            return ticker
+        key = (ticker, date)
+        canonical = self._cache.get(key)
+        if canonical is None:
+            canonical = self._cache[key] = self.canonical[ticker][bisect_right(self.dates[ticker], date)]
+        return canonical
+
+    # /////////////////////////////////////////////////////////////////////////
+    # BULK RESOLUTION OF INGESTED RECORDS
+
+    def resolve_statement(self, statement: Statement) -> Statement:
+        """
+        Get a statement with the tickers of its open positions and accruals resolved
+        at its date, and those of its trades resolved at their trade dates
+        """
+        if not self.dates:
+            return statement
+        return replace(
+            statement,
+            open_positions=self._resolve_records(statement.open_positions, statement.date),
+            open_accruals=self._resolve_records(statement.open_accruals, statement.date),
+            trades=self.resolve_trades(statement.trades) if statement.trades else statement.trades
+        )
+
+    def resolve_statements(self, statements: Dict[str, Statement]) -> Dict[str, Statement]:
+        """Resolve the statements of a dict keyed by file path, keeping the keys"""
+        return {filepath: self.resolve_statement(statement) for filepath, statement in statements.items()}
+
+    def _resolve_records(self, records: List, date: datetime) -> List:
+        """Replace the ticker of records reported on a date, keeping the list if none change"""
+        resolved = [self.resolve(record.ticker, date) for record in records]
+        if all(ticker == record.ticker for ticker, record in zip(resolved, records)):
+            return records
+        return [
+            record if ticker == record.ticker else replace(record, ticker=ticker)
+            for ticker, record in zip(resolved, records)
+        ]
+
+    def resolve_trades(self, trades: Iterable[Trade]) -> List[Trade]:
+        """Get trades with their tickers resolved at their trade dates"""
+        if not self.dates:
+            return list(trades)
+        resolved = []
+        for trade in trades:
+            ticker = self.resolve(trade.ticker, trade.tradedate.replace(hour=0, minute=0, second=0, microsecond=0))
+            resolved.append(trade if ticker == trade.ticker else replace(trade, ticker=ticker))
+        return resolved
+
+    def resolve_position_table(self, table: PositionTable) -> PositionTable:
+        """
+        Get a PositionTable with its tickers resolved, resolving each distinct
+        (ticker, date) pair once and re-encoding the ticker codes
+        """
+        renamed = [code for code, ticker in enumerate(table.labels['ticker']) if ticker in self.dates]
+        if not renamed:
+            return table
+
+        ticker_codes = table.codes['ticker']
+        rows = np.flatnonzero(np.isin(ticker_codes, renamed))
+        pairs, inverse = np.unique(
+            np.stack([ticker_codes[rows].astype(np.int64), table.dates[rows].astype(np.int64)], axis=1),
+            axis=0, return_inverse=True
+        )
+
+        labels = list(table.labels['ticker'])
+        encoder = {label: code for code, label in enumerate(labels)}
+        pair_codes = np.empty(len(pairs), dtype=np.int32)
+        for i, (code, day) in enumerate(pairs.tolist()):
+            date = np.datetime64(day, 'D').astype(datetime)
+            canonical = self.resolve(labels[code], datetime(date.year, date.month, date.day))
+            pair_codes[i] = encoder.setdefault(canonical, len(encoder))
+
+        codes = dict(table.codes)
+        codes['ticker'] = ticker_codes.copy()
+        codes['ticker'][rows] = pair_codes[inverse.reshape(-1)]
+        return PositionTable(codes, {**table.labels, 'ticker': list(encoder)}, table.dates, table.amounts, table.account_dates)
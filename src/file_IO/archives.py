@@ -0,0 +1,167 @@
+# /////////////////////////////////////////////////////////////////////////////
+# VIRTUAL FILE PATHS FOR MEMBERS OF ZIP AND GZIP ARCHIVES
+#
+# Archived files are addressed by virtual file paths so that they can be listed,
+# read and fingerprinted like loose files, without being extracted to disk:
+#
+#   - a member of a zip archive is addressed as <archive>.zip!/<member name>,
+#     e.g. statements/2024.zip!/U1234567_20241231.csv
+#   - a gzip file holds a single file, so it is addressed by its own path, and
+#     its name without the .gz suffix is used to match extensions and patterns
+#     (gzip files inside zip archives are not decompressed, so are not matched)
+#
+# Members are decompressed as they are read, so they can be streamed straight
+# into a CSV reader. Open zip archives are cached per process, so the central
+# directory of an archive holding thousands of statements is only read once.
+# Archives evicted from the cache, or replaced by a changed archive, are closed
+# (a member still being read keeps its archive's file open until it is closed).
+#
+# Like the built-in open, these functions raise the underlying exceptions, which
+# are wrapped by the callers in the other file_IO modules.
+#
+# /////////////////////////////////////////////////////////////////////////////
+
+
+import gzip
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import BinaryIO, List, Optional, TextIO, Tuple
+
+
+# Separates the path of a zip archive from the name of a member inside it
+ARCHIVE_SEPARATOR = '!/'
+
+ZIP_SUFFIX = '.zip'
+GZIP_SUFFIX = '.gz'
+
+# Maximum number of zip archives kept open per process
+OPEN_ARCHIVES_MAX = 16
+
+# Open zip archives keyed by (path, size, modification time, process ID), least recently used first
+_open_archives: 'OrderedDict[Tuple[str, int, int, int], zipfile.ZipFile]' = OrderedDict()
+_open_archives_lock = threading.Lock()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def member_path(archive_path: str, member: str) -> str:
+    """Build the virtual file path of a member of a zip archive"""
+    return archive_path + ARCHIVE_SEPARATOR + member
+
+
+def split_archive_path(path: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a virtual file path into the path of the zip archive and the member name
+
+    Returns:
+        Tuple of (archive path, member name), or (path, None) if the path is not
+        a member of a zip archive
+    """
+    index = path.lower().find(ZIP_SUFFIX + ARCHIVE_SEPARATOR)
+    if index == -1:
+        return path, None
+    split = index + len(ZIP_SUFFIX)
+    return path[:split], path[split + len(ARCHIVE_SEPARATOR):]
+
+
+def is_zip_archive(name: str) -> bool:
+    """Check if a file name is that of a zip archive"""
+    return name.lower().endswith(ZIP_SUFFIX)
+
+
+def is_archive_path(path: str) -> bool:
+    """Check if a path is a member of a zip archive or a gzip file, which cannot be memory-mapped"""
+    return split_archive_path(path)[1] is not None or path.lower().endswith(GZIP_SUFFIX)
+
+
+def logical_name(name: str) -> str:
+    """Get the name of the file held in a gzip file (e.g. U123.csv for U123.csv.gz)"""
+    return name[:-len(GZIP_SUFFIX)] if name.lower().endswith(GZIP_SUFFIX) else name
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def list_zip_members(archive_path: str) -> List[str]:
+    """Get the names of the files (not directories) in a zip archive, in archive order"""
+    return [info.filename for info in zip_archive(archive_path).infolist() if not info.is_dir()]
+
+
+def zip_archive(archive_path: str) -> zipfile.ZipFile:
+    """Get the open zip archive at a path, reopened if the archive has changed"""
+    stat = os.stat(archive_path)
+    return open_zip_archive(archive_path, stat.st_size, stat.st_mtime_ns, os.getpid())
+
+
+def open_zip_archive(archive_path: str, size: int, mtime_ns: int, pid: int) -> zipfile.ZipFile:
+    """
+    Open a zip archive, cached by its size and modification time. The process ID is
+    part of the key because forked worker processes must not share a file offset.
+    Earlier versions of the archive and the least recently used archives beyond
+    OPEN_ARCHIVES_MAX are closed.
+    """
+    key = (archive_path, size, mtime_ns, pid)
+    with _open_archives_lock:
+        archive = _open_archives.get(key)
+        if archive is not None:
+            _open_archives.move_to_end(key)
+            return archive
+
+        stale = [cached for cached in _open_archives if cached[0] == archive_path and cached[3] == pid]
+        for cached in stale:
+            _open_archives.pop(cached).close()
+
+        archive = zipfile.ZipFile(archive_path)
+        _open_archives[key] = archive
+        while len(_open_archives) > OPEN_ARCHIVES_MAX:
+            _open_archives.popitem(last=False)[1].close()
+        return archive
+
+
+def archived_path_exists(path: str) -> bool:
+    """Check if a loose file, a gzip file or a member of a zip archive exists"""
+    archive_path, member = split_archive_path(path)
+    if member is None:
+        return os.path.isfile(path)
+    try:
+        zip_archive(archive_path).getinfo(member)
+        return True
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return False
+
+
+def zip_member_fingerprint(path: str) -> Tuple[int, int]:
+    """
+    Get the fingerprint of a member of a zip archive: its uncompressed size and the
+    modification time of the archive in nanoseconds
+    """
+    archive_path, member = split_archive_path(path)
+    info = zip_archive(archive_path).getinfo(member)
+    return info.file_size, os.stat(archive_path).st_mtime_ns
+
+
+def zip_member_modified_time(path: str) -> int:
+    """Get the modification time of a member of a zip archive in nanoseconds, as recorded in the archive"""
+    archive_path, member = split_archive_path(path)
+    info = zip_archive(archive_path).getinfo(member)
+    return int(datetime(*info.date_time).timestamp()) * 1_000_000_000
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def open_binary(path: str) -> BinaryIO:
+    """Open a loose file, a gzip file or a member of a zip archive for reading as bytes"""
+    archive_path, member = split_archive_path(path)
+    if member is not None:
+        return zip_archive(archive_path).open(member)
+    if path.lower().endswith(GZIP_SUFFIX):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def open_text_UTF8(path: str) -> TextIO:
+    """
+    Open a loose file, a gzip file or a member of a zip archive for reading as UTF-8
+    text, stripping any Byte Order Mark and leaving line endings to the CSV reader
+    """
+    return io.TextIOWrapper(open_binary(path), encoding='utf-8-sig', newline='')
@@ -1,63 +1,116 @@
 import os
-from contextlib import contextmanager
+from fnmatch import fnmatch
+from typing import Iterable, Iterator, Optional
+from src.file_IO.archives import is_zip_archive, list_zip_members, logical_name, member_path
 from src.monitor import exceptions
+from src.monitor.log_system import get_loggers
 
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
 
-# /////////////////////////////////////////////////////////////////////////////
-@contextmanager
-def directory(path):
-    """Context manager to temporarily change the current working directory"""
-    try:
-        cwd = os.getcwd()
-        os.chdir(path)
-        yield
-    finally:
-        os.chdir(cwd)
+
+# ///////////////////////////////////////////////////////////////////////////// 
+def get_filepaths(dir, extensions=None, pattern=None, max_depth=None, archives=False):
+    """Get a sorted list of all file paths to files in a directory and its subdirectories"""
+    return list(iter_filepaths(dir, extensions, pattern, max_depth, archives=archives))
 
 
 # ///////////////////////////////////////////////////////////////////////////// 
-def get_filepaths(dir):
-    """Get a list of all file paths to files in a directory and its subdirectories"""
+def iter_filepaths(
+    dir: str,
+    extensions: Optional[Iterable[str]] = None,
+    pattern: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    sort: bool = True,
+    archives: bool = False
+) -> Iterator[str]:
+    """
+    Lazily yield the paths of files in a directory and its subdirectories.
+    The working directory is never changed, so this is safe to use from threads.
+    Symbolic links to directories are followed, and a directory already scanned
+    through another path (e.g. a link back to a parent) is skipped.
+    
+    Args:
+        dir: Path to the parent directory
+        extensions: File extensions to include, case insensitive (e.g. ['.csv'])
+        pattern: Glob pattern that file names must match (e.g. 'U1234567_*')
+        max_depth: Deepest level of subdirectory to descend into (0 for dir only)
+        sort: Yield the entries of each directory in name order
+        archives: Look inside zip and gzip archives, yielding virtual file paths
+            for the archived files (see the archives module)
+    Returns:
+        Iterator of file paths built by joining dir with the relative path of each file
+    """
     if not directory_exists(dir):
         raise exceptions.DirectoryNotFoundError(dir)
-    return flatten_list(files_in_dir_and_subdirs(dir))
+    
+    suffixes = tuple(ext.lower() for ext in extensions) if extensions is not None else None
+    stat = os.stat(dir)
+    return scan_directory(dir, suffixes, pattern, max_depth, sort, archives, 0, {(stat.st_dev, stat.st_ino)})
 
 
-# /////////////////////////////////////////////////////////////////////////////  
-def directory_exists(dir):
-    """Check if a directory exists""" 
-    return True if os.path.isdir(dir) else False
+# ///////////////////////////////////////////////////////////////////////////// 
+def scan_directory(dir, suffixes, pattern, max_depth, sort, archives, depth, visited):
+    """
+    Recursively scan a directory with os.scandir, yielding matching file paths.
+    visited holds the (device, inode) of each directory scanned, so that symbolic
+    links cannot lead into a loop or scan a directory twice.
+    """
+    try:
+        with os.scandir(dir) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name) if sort else list(scan)
+    
+    except Exception as err:
+        raise exceptions.ListFilesError(err) 
+    
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+            descend = is_dir and (max_depth is None or depth < max_depth)
+            stat = entry.stat() if descend else None
+        except OSError as err:
+            log_system.warning(f"{entry.path} skipped, it cannot be read: {err}")
+            continue
         
+        if is_dir:
+            if descend:
+                if (stat.st_dev, stat.st_ino) in visited:
+                    log_system.warning(f"Directory {entry.path} skipped, already scanned through another path")
+                    continue
+                visited.add((stat.st_dev, stat.st_ino))
+                yield from scan_directory(entry.path, suffixes, pattern, max_depth, sort, archives, depth + 1, visited)
         
-# ///////////////////////////////////////////////////////////////////////////// 
-def flatten_list(mixed_list):
-    """Recursively flatten any sublists into a single list"""
-    flat_list = []
-    for item in mixed_list:
-        if isinstance(item, list):
-            flat_list.extend(flatten_list(item))
-        else:
-            flat_list.append(item)
-    return flat_list
+        elif entry.is_file():
+            if archives and is_zip_archive(entry.name):
+                yield from scan_zip_archive(entry.path, suffixes, pattern, sort)
+            elif file_name_matches(logical_name(entry.name) if archives else entry.name, suffixes, pattern):
+                yield entry.path
+
+
+def scan_zip_archive(archive_path, suffixes, pattern, sort):
+    """Yield the virtual file paths of the matching files in a zip archive"""
+    try:
+        members = list_zip_members(archive_path)
+    
+    except Exception as err:
+        raise exceptions.ReadFileError(archive_path, err)
+    
+    for member in sorted(members) if sort else members:
+        if file_name_matches(os.path.basename(member), suffixes, pattern):
+            yield member_path(archive_path, member)
+
+
+def file_name_matches(name, suffixes, pattern):
+    """Check if a file name has one of the suffixes and matches the glob pattern, where given"""
+    if suffixes is not None and not name.lower().endswith(suffixes):
+        return False
+    return pattern is None or fnmatch(name, pattern)
 
 
 # /////////////////////////////////////////////////////////////////////////////  
-def files_in_dir_and_subdirs(dir):
-    """
-    Recursively list the files in a directory and its subdirectories.
-    Object returned is a nested list mirroring the directory structure.
-    """ 
-    with directory(dir):
-        try:
-            return list(map(
-                lambda i: get_filepath(dir,i) 
-                if os.path.isfile(get_filepath(dir,i)) 
-                else files_in_dir_and_subdirs(get_filepath(dir,i)), 
-                os.listdir(dir))
-                )
-        
-        except Exception as err:
-            raise exceptions.ListFilesError(err) 
+def directory_exists(dir):
+    """Check if a directory exists""" 
+    return True if os.path.isdir(dir) else False
     
 
 # /////////////////////////////////////////////////////////////////////////////      
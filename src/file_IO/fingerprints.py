@@ -0,0 +1,101 @@
+# /////////////////////////////////////////////////////////////////////////////
+# UTILITY FUNCTIONS FOR FINGERPRINTING FILES
+#
+# This module provides cheap (size and modification time) and strong (content
+# hash) fingerprints of files, used to detect when a file has changed since it
+# was last read. Archived files are fingerprinted through their virtual paths.
+#
+# /////////////////////////////////////////////////////////////////////////////
+
+
+import hashlib
+import os
+from typing import Iterable, Tuple
+from src.file_IO.archives import open_binary, split_archive_path, zip_member_fingerprint, zip_member_modified_time
+from src.monitor import exceptions
+
+
+# Size of the blocks read from disk when hashing a file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def file_stat_fingerprint(abs_path: str) -> Tuple[int, int]:
+    """
+    Get a cheap fingerprint of a file from its metadata
+
+    Args:
+        abs_path: Absolute path to the file, or virtual path of an archived file
+    Returns:
+        Tuple of (size in bytes, modification time in nanoseconds), where a member
+        of a zip archive has its uncompressed size and the archive's modification time
+    """
+    try:
+        if split_archive_path(abs_path)[1] is not None:
+            return zip_member_fingerprint(abs_path)
+        stat = os.stat(abs_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def file_modified_time(abs_path: str) -> int:
+    """
+    Get the modification time of a file in nanoseconds. Unlike the fingerprint, a
+    member of a zip archive has its own modification time recorded in the archive,
+    so that members of one archive can be told apart by age.
+
+    Args:
+        abs_path: Absolute path to the file, or virtual path of an archived file
+    """
+    try:
+        if split_archive_path(abs_path)[1] is not None:
+            return zip_member_modified_time(abs_path)
+        return os.stat(abs_path).st_mtime_ns
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def file_content_hash(abs_path: str) -> str:
+    """
+    Get the SHA-256 hash of the contents of a file, read in fixed-size blocks.
+    Archived files are hashed on their decompressed contents.
+
+    Args:
+        abs_path: Absolute path to the file, or virtual path of an archived file
+    Returns:
+        Hexadecimal digest of the file contents
+    """
+    try:
+        digest = hashlib.sha256()
+        with open_binary(abs_path) as file:
+            while block := file.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+
+def files_stat_digest(abs_paths: Iterable[str]) -> str:
+    """
+    Get a digest of the paths and cheap fingerprints of a set of files, which changes
+    when a file is added, removed or changed. Files that cannot be read count as empty.
+
+    Args:
+        abs_paths: Absolute paths to the files, or virtual paths of archived files
+    Returns:
+        Hexadecimal digest of the sorted paths and their fingerprints
+    """
+    digest = hashlib.sha256()
+    for abs_path in sorted(abs_paths):
+        try:
+            size, mtime_ns = file_stat_fingerprint(abs_path)
+        except exceptions.ReadFileError:
+            size, mtime_ns = -1, -1
+        digest.update(f"{abs_path}\0{size}\0{mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
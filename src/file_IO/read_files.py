@@ -14,7 +14,8 @@
 
 import csv
 import yaml
-from typing import List, Dict
+from typing import Dict, Iterator, List
+from src.file_IO.archives import open_text_UTF8
 from src.monitor import exceptions
 
   
@@ -39,6 +40,24 @@ def read_yaml(abs_path: str) -> Dict:
         raise exceptions.ReadFileError(abs_path, err) 
     
 
+# ///////////////////////////////////////////////////////////////////////////// 
+def read_text_UTF8(abs_path: str) -> str:
+    """
+    Read the whole of a text file encoded in UTF-8, stripping any Byte Order Mark
+    
+    Args:
+        abs_path: Absolute path to the text file, or virtual path of an archived file
+    Returns:
+        Decoded contents of the file
+    """
+    try:
+        with open_text_UTF8(abs_path) as file:
+            return file.read()
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+
 # ///////////////////////////////////////////////////////////////////////////// 
 def read_csv_headerless_UTF8(abs_path: str) -> List[List[str]]:
     """
@@ -51,10 +70,25 @@ def read_csv_headerless_UTF8(abs_path: str) -> List[List[str]]:
     Returns:
         list of lists representing the data rows
     """
+    return list(iter_csv_headerless_UTF8(abs_path))
+
+
+# ///////////////////////////////////////////////////////////////////////////// 
+def iter_csv_headerless_UTF8(abs_path: str) -> Iterator[List[str]]:
+    """
+    Lazily read a headerless CSV file encoded in UFT-8, yielding one row at a time
+    so that only the current row is held in memory. The file is closed when the
+    iterator is exhausted or discarded. Archived files are decompressed as they
+    are read, without being extracted to disk.
+    
+    Args:
+        abs_path: Absolute path to the CSV file, or virtual path of an archived file
+    Yields:
+        list of strings for each data row
+    """
     try:
-        with open(abs_path, 'r', encoding='utf-8-sig') as file:
-            csv_reader = csv.reader(file)
-            return [row for row in csv_reader]  
+        with open_text_UTF8(abs_path) as file:
+            yield from csv.reader(file)
 
     except Exception as err:
         raise exceptions.ReadFileError(abs_path, err)
\ No newline at end of file
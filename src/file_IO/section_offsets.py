@@ -0,0 +1,201 @@
+# /////////////////////////////////////////////////////////////////////////////
+# BYTE-OFFSET INDEX OF THE SECTIONS IN A SECTIONED CSV FILE
+#
+# Files such as IBKR activity statements are made up of sections, identified by
+# the first column of every row, with the rows of each section stored together.
+# This module memory-maps such a file and records the byte range of each block
+# of rows belonging to a section, without decoding the file. Only the byte
+# ranges of the sections that are needed are then decoded and parsed as CSV.
+#
+# The index is cached in a JSON file in a directory chosen by the caller (the
+# statement cache keeps it in its own directory), named by a hash of the CSV
+# file's path, and rebuilt when the size or modification time of the CSV file
+# changes. It is written atomically, so a reader in another process never sees a
+# partial index, and no files are added to the statement directory. No index is
+# kept when no directory is given. Section names are assumed to be unquoted, and
+# a quoted field spanning several lines may be mistaken for the start of a new block.
+#
+# The byte range of a section is decoded in bounded chunks ending on line
+# boundaries, so a large section is never held in memory as a single string.
+#
+# Archived files cannot be memory-mapped, so their rows are streamed and only
+# the rows of the requested sections are kept.
+#
+# /////////////////////////////////////////////////////////////////////////////
+
+
+import csv
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.file_IO.archives import is_archive_path, open_text_UTF8
+from src.file_IO.fingerprints import file_stat_fingerprint
+from src.file_IO.write_files import write_file_atomically
+from src.monitor import exceptions
+
+
+# Suffix of the files holding the cached indexes
+INDEX_SUFFIX = '.sections.json'
+
+# UTF-8 Byte Order Mark inserted at the start of files downloaded from Interactive Brokers
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# Maximum number of bytes of a section decoded at a time, unless a single line is longer
+DECODE_CHUNK_BYTES = 1024 * 1024  # 1MB
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def get_section_offsets(abs_path: str, index_dir: Optional[str] = None) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Get the byte ranges of the sections in a file, from the cached index if it is
+    still valid, otherwise by scanning the file and refreshing the cached index.
+
+    Args:
+        abs_path: Absolute path to the CSV file
+        index_dir: Directory of the cached indexes (None scans the file without caching)
+    Returns:
+        Dictionary of (start, end) byte ranges for each section name, in file order
+    """
+    size, mtime_ns = file_stat_fingerprint(abs_path)
+    if index_dir is None:
+        return build_section_offsets(abs_path)
+    index_path = section_index_path(abs_path, index_dir)
+
+    try:
+        with open(index_path, 'r') as file:
+            cached = json.load(file)
+        if cached['size'] == size and cached['mtime_ns'] == mtime_ns:
+            return {name: [tuple(span) for span in spans] for name, spans in cached['sections'].items()}
+
+    except (OSError, ValueError, KeyError):
+        pass
+
+    offsets = build_section_offsets(abs_path)
+
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        data = json.dumps({'size': size, 'mtime_ns': mtime_ns, 'sections': offsets}).encode('utf-8')
+        write_file_atomically(index_path, data)
+
+    except OSError:
+        pass  # The index is only a cache
+
+    return offsets
+
+
+def section_index_path(abs_path: str, index_dir: str) -> str:
+    """Get the path of the cached index of a file, named by a hash of the file's absolute path"""
+    name = hashlib.sha256(os.path.abspath(abs_path).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(os.path.abspath(index_dir), name + INDEX_SUFFIX)
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def build_section_offsets(abs_path: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Scan a memory-mapped file for the byte ranges of its sections. Each block is
+    skipped in one regular expression search for the first line that starts with
+    a different section name, so the rows within a block are never visited.
+
+    Args:
+        abs_path: Absolute path to the CSV file
+    Returns:
+        Dictionary of (start, end) byte ranges for each section name, in file order
+    """
+    offsets = {}
+    if file_stat_fingerprint(abs_path)[0] == 0:
+        return offsets
+    
+    try:
+        with open(abs_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            start = len(UTF8_BOM) if mapped[:len(UTF8_BOM)] == UTF8_BOM else 0
+
+            while start < size:
+                name = section_name(mapped, start, size)
+                block_end = re.compile(rb'\n(?!' + re.escape(name) + rb',)')
+                match = block_end.search(mapped, start)
+                end = match.end() if match else size
+                if name:
+                    offsets.setdefault(name.decode('utf-8'), []).append((start, end))
+                start = end
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+    return offsets
+
+
+def section_name(mapped: mmap.mmap, start: int, size: int) -> bytes:
+    """Get the section name (first column) of the line starting at a byte offset"""
+    line_end = mapped.find(b'\n', start)
+    line_end = size if line_end == -1 else line_end
+    comma = mapped.find(b',', start, line_end)
+    return mapped[start:comma] if comma != -1 else mapped[start:line_end].rstrip()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def iter_section_rows(
+    abs_path: str,
+    sections: Iterable[str],
+    index_dir: Optional[str] = None
+) -> Iterator[List[str]]:
+    """
+    Read the rows of selected sections from a memory-mapped CSV file encoded in
+    UTF-8, decoding only the byte ranges of those sections.
+
+    Args:
+        abs_path: Absolute path to the CSV file, or virtual path of an archived file
+        sections: Names of the sections to read
+        index_dir: Directory of the cached indexes (None scans the file without caching)
+    Yields:
+        list of strings for each row of the selected sections, in file order
+    """
+    if is_archive_path(abs_path):
+        yield from iter_archived_section_rows(abs_path, set(sections))
+        return
+
+    offsets = get_section_offsets(abs_path, index_dir)
+    spans = sorted(span for name in set(sections) for span in offsets.get(name, []))
+    if not spans:
+        return
+
+    try:
+        with open(abs_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start, end in spans:
+                yield from csv.reader(iter_span_lines(mapped, start, end))
+
+    except Exception as err:
+        raise exceptions.ReadFileError(abs_path, err)
+
+
+def iter_span_lines(mapped: mmap.mmap, start: int, end: int) -> Iterator[str]:
+    """
+    Decode a byte range of a memory-mapped file in chunks of about DECODE_CHUNK_BYTES,
+    each ending on a line boundary, yielding its lines with their line endings
+    """
+    while start < end:
+        chunk_end = min(start + DECODE_CHUNK_BYTES, end)
+        if chunk_end < end:
+            line_end = mapped.rfind(b'\n', start, chunk_end)
+            if line_end == -1:
+                line_end = mapped.find(b'\n', chunk_end, end)
+            chunk_end = line_end + 1 if line_end != -1 else end
+
+        yield from io.StringIO(mapped[start:chunk_end].decode('utf-8'), newline='')
+        start = chunk_end
+
+
+def iter_archived_section_rows(path: str, sections: Set[str]) -> Iterator[List[str]]:
+    """Stream the rows of an archived CSV file, keeping only the rows of the selected sections"""
+    try:
+        with open_text_UTF8(path) as file:
+            for row in csv.reader(file):
+                if row and row[0] in sections:
+                    yield row
+
+    except Exception as err:
+        raise exceptions.ReadFileError(path, err)
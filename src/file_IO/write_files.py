@@ -0,0 +1,19 @@
+# /////////////////////////////////////////////////////////////////////////////
+# UTILITY FUNCTIONS FOR WRITING FILES
+#
+# This module provides utility functions for writing files safely, so that a
+# reader in another process or thread never sees a partially written file.
+#
+# /////////////////////////////////////////////////////////////////////////////
+
+
+import os
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def write_file_atomically(abs_path: str, data: bytes) -> None:
+    """Write bytes to a temporary file and move it into place so readers never see a partial file"""
+    tmp_path = f"{abs_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, abs_path)
@@ -1,34 +1,86 @@
-from flask import Flask, render_template_string
+from flask import Flask, render_template_string, request
 from threading import Timer
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
 from src.monitor.log_system import get_loggers
-from src.engine.data_structures import OpenPosition, OpenAccrual
+from src.engine.conversions import parse_iso_date
+from src.engine.data_structures import OpenPosition, OpenAccrual, Statement
+from src.engine.statement_watcher import StatementWatcher
+from src.engine.ticker_index import TickerIndex
 from src.front_end.open_browser import open_browser
 
 # Get logger instances at module level
 log_system, log_error, log_output = get_loggers()
 
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """Immutable set of the data displayed on the portfolio pages"""
+    open_positions: Dict[str, List[OpenPosition]]
+    open_accruals: Dict[str, List[OpenAccrual]]
+    ticker_index: Optional[TickerIndex] = None
+
+
 class PortfolioDisplay:
-    def __init__(self, open_positions: Dict[str, List[OpenPosition]], open_accruals: Dict[str, List[OpenAccrual]]):
+    def __init__(
+        self,
+        open_positions: Dict[str, List[OpenPosition]],
+        open_accruals: Dict[str, List[OpenAccrual]],
+        ticker_index: Optional[TickerIndex] = None
+    ):
         self.app = Flask(__name__)
-        self.open_positions = open_positions
-        self.open_accruals = open_accruals
+        self.snapshot = PortfolioSnapshot(open_positions, open_accruals, ticker_index)
 
         # Register routes
         self.app.add_url_rule('/', 'positions', self.show_open_positions)
         self.app.add_url_rule('/accruals', 'accruals', self.show_open_accruals)
+        self.app.add_url_rule('/tickers', 'tickers', self.show_ticker_postings)
+        
+    def update(
+        self,
+        open_positions: Dict[str, List[OpenPosition]],
+        open_accruals: Dict[str, List[OpenAccrual]],
+        ticker_index: Optional[TickerIndex] = None
+    ):
+        """
+        Swap in new data with a single assignment. Requests already being rendered keep
+        the snapshot they started with, so an update never blocks or tears a page.
+        """
+        self.snapshot = PortfolioSnapshot(open_positions, open_accruals, ticker_index)
+        log_system.info("Portfolio pages updated with new statement data")
         
     def show_open_positions(self):
         return render_template_string(
             positions_template,
-            open_positions=self.open_positions,
+            open_positions=self.snapshot.open_positions,
             abs=abs
         )
         
     def show_open_accruals(self):
         return render_template_string(
             accruals_template,
-            open_accruals=self.open_accruals,
+            open_accruals=self.snapshot.open_accruals,
+            abs=abs
+        )
+        
+    def show_ticker_postings(self):
+        """Show where and when tickers starting with the 'q' argument were held, between optional 'from' and 'to' dates"""
+        query = request.args.get('q', '').strip().upper()
+        date_from = query_date(request.args.get('from'))
+        date_to = query_date(request.args.get('to'))
+        ticker_index = self.snapshot.ticker_index
+        
+        postings = []
+        if query and ticker_index is not None:
+            postings = ticker_index.prefix(query, date_from, date_to)
+        
+        return render_template_string(
+            tickers_template,
+            query=query,
+            date_from=date_from,
+            date_to=date_to,
+            postings=postings,
+            indexed=ticker_index is not None,
             abs=abs
         )
         
@@ -36,11 +88,39 @@ class PortfolioDisplay:
         Timer(1, open_browser).start()
         self.app.run(debug=False)
 
-def display_portfolio_pages(open_positions, open_accruals):
-    """Display both positions and accruals pages with navigation"""
-    display = PortfolioDisplay(open_positions, open_accruals)
+def display_portfolio_pages(
+    open_positions,
+    open_accruals,
+    watcher: Optional[StatementWatcher] = None,
+    ticker_index: Optional[TickerIndex] = None
+):
+    """Display the positions, accruals and ticker pages with navigation, refreshed by the watcher if given"""
+    display = PortfolioDisplay(open_positions, open_accruals, ticker_index)
+    if watcher is not None:
+        watcher.start(lambda statements: display.update(
+            *portfolio_views(statements),
+            TickerIndex.from_statements(statements) if ticker_index is not None else None
+        ))
     display.run()
 
+def portfolio_views(statements: List[Statement]) -> Tuple[Dict[str, List[OpenPosition]], Dict[str, List[OpenAccrual]]]:
+    """Get the open positions and accruals by account from the latest statement of each account"""
+    latest = {}
+    for stmt in statements:
+        if stmt.account not in latest or stmt.date >= latest[stmt.account].date:
+            latest[stmt.account] = stmt
+    return (
+        {account: stmt.open_positions for account, stmt in latest.items()},
+        {account: stmt.open_accruals for account, stmt in latest.items()}
+    )
+
+def query_date(text: Optional[str]):
+    """Convert an ISO date from a query string, or None if it is missing or invalid"""
+    try:
+        return parse_iso_date(text) if text else None
+    except ValueError:
+        return None
+
 
 
 # /////////////////////////////////////////////////////////////////////////////    
@@ -112,6 +192,7 @@ positions_template = """
         </head>
         <body>
             <a href="/accruals" class="nav-button">View Dividend Accruals</a>
+            <a href="/tickers" class="nav-button">Search Ticker History</a>
             <h1>Open Positions</h1>
             <table>
                 <tr>
@@ -286,3 +367,124 @@ accruals_template = """
         </body>
     </html>
     """
+
+
+tickers_template = """
+    <html>
+        <head>
+            <title>Ticker History</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 40px;
+                    background-color: #f5f5f5;
+                }
+                h2 {
+                    color: #2c3e50;
+                    border-bottom: 2px solid #3498db;
+                    padding-bottom: 10px;
+                    margin-top: 30px;
+                }
+                table {
+                    width: 100%;
+                    border-collapse: collapse;
+                    margin-bottom: 20px;
+                }
+                th {
+                    background-color: #3498db;
+                    color: white;
+                    padding: 12px;
+                    text-align: left;
+                }
+                td {
+                    padding: 8px;
+                    border-bottom: 1px solid #ddd;
+                }
+                tr:hover {
+                    background-color: #f0f7fa;
+                }
+                .currency-usd { color: #27ae60; }
+                .currency-gbp { color: #8e44ad; }
+                .value-cell {
+                    text-align: right;
+                    font-family: monospace;
+                    white-space: pre;
+                    padding-right: 10px;
+                }            
+                .negative { color: #e74c3c; }
+                .account-header {
+                    background-color: #f8f9fa;
+                    font-weight: bold;
+                    text-align: left;
+                    padding: 10px;
+                    border-top: 2px solid #dee2e6;
+                }
+                .nav-button {
+                    display: inline-block;
+                    padding: 10px 20px;
+                    background-color: #3498db;
+                    color: white;
+                    text-decoration: none;
+                    border-radius: 5px;
+                    margin-bottom: 20px;
+                }
+                .nav-button:hover {
+                    background-color: #2980b9;
+                }
+                .search-form input {
+                    padding: 8px;
+                    margin-right: 10px;
+                }
+            </style>
+        </head>
+        <body>
+            <a href="/" class="nav-button">View Open Positions</a>
+            <h1>Ticker History</h1>
+            <form class="search-form" action="/tickers" method="get">
+                <input type="text" name="q" value="{{query}}" placeholder="Ticker or prefix">
+                <input type="date" name="from" value="{{date_from.strftime('%Y-%m-%d') if date_from else ''}}">
+                <input type="date" name="to" value="{{date_to.strftime('%Y-%m-%d') if date_to else ''}}">
+                <input type="submit" value="Search">
+            </form>
+            {% if not indexed %}
+                <p>The ticker index has not been built.</p>
+            {% elif query and not postings %}
+                <p>No holdings of {{query}} found.</p>
+            {% endif %}
+            {% if postings %}
+            <table>
+                <tr>
+                    <th>Ticker</th>
+                    <th>Currency</th>
+                    <th>Account</th>
+                    <th>Date</th>
+                    <th style="text-align: right">Quantity</th>
+                    <th style="text-align: right">Value</th>
+                </tr>
+                {% for post in postings %}
+                <tr>
+                    <td>{{post.ticker}}</td>
+                    <td class="currency-{{post.currency.lower()}}">{{post.currency}}</td>
+                    <td>{{post.account}}</td>
+                    <td>{{post.date.strftime('%Y-%m-%d')}}</td>
+                    <td class="value-cell">
+                        {%- if post.quantity < 0 -%}
+                            ({{"{:,.0f}".format(abs(post.quantity))}})
+                        {%- else -%}
+                            {{"{:,.0f}".format(post.quantity)}}&nbsp;
+                        {%- endif -%}
+                    </td>
+                    <td class="value-cell">
+                        {%- if post.value < 0 -%}
+                            ({{"{:,.2f}".format(abs(post.value))}})
+                        {%- else -%}
+                            {{"{:,.2f}".format(post.value)}}&nbsp;
+                        {%- endif -%}
+                    </td>
+                </tr>
+                {% endfor %}
+            </table>
+            {% endif %}
+        </body>
+    </html>
+    """
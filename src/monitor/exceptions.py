@@ -81,3 +81,30 @@ class ReadFileError(FileOperationError):
             message=f"Error reading file {file_path}",
             details=str(error)
         )
+
+
+# /////////////////////////////////////////////////////////////////////////////
+class StatementError(BaseError):
+    """Base class for statement processing errors"""
+    pass
+
+class StatementParseError(StatementError):
+    """Exception raised when a statement file cannot be parsed"""
+    def __init__(self, file_path: str, error: Exception):
+        super().__init__(
+            message=f"Error parsing statement {file_path}",
+            details=str(error)
+        )
+
+
+# /////////////////////////////////////////////////////////////////////////////
+class ValuationError(BaseError):
+    """Base class for errors valuing holdings"""
+    pass
+
+class FXRateNotFoundError(ValuationError):
+    """Exception raised when there is no exchange rate for a currency on or before a date"""
+    def __init__(self, currency: str, base_currency: str, date):
+        super().__init__(
+            message=f"No {currency}/{base_currency} exchange rate on or before {date}"
+        )
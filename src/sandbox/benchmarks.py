@@ -0,0 +1,186 @@
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sys import intern
+import numpy as np
+from src.engine.data_structures import OpenPosition
+from src.engine.IBKR_statements import DividendAccrualsHandler
+from src.monitor.log_system import get_loggers
+from src.sandbox.yields.ytm import calculate_ytm
+from src.sandbox.yields.ytm_batch import calculate_ytm_batch
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# BENCHMARKS FOR THE STATEMENT ENGINE
+#
+# 1. Memory: compares the memory held per OpenPosition record by the original
+#    plain dataclass (per-instance __dict__, a fresh copy of every identifier
+#    string per row) against the slotted record with interned identifiers.
+# 2. Conversion: compares the time to convert an Open Dividend Accruals section
+#    with strptime and Decimal(str(x)) against the shared conversion layer.
+# 3. YTM: compares solving the yields of a portfolio of bonds one at a time
+#    with calculate_ytm against the batch solver, and the largest difference.
+# /////////////////////////////////////////////////////////////////////////////
+
+@dataclass
+class LegacyOpenPosition:
+    """Copy of the original OpenPosition record layout, kept for comparison"""
+    ticker: str
+    quantity: Decimal
+    price: Decimal
+    value: Decimal
+    currency: str
+    unique_ID: str = None
+
+    def __post_init__(self):
+        self.quantity = Decimal(str(self.quantity))
+        self.price = Decimal(str(self.price))
+        self.value = Decimal(str(self.value))
+
+
+def fresh_string(text: str) -> str:
+    """Create a new string object with the same value, as csv.reader does for every row"""
+    return (text + ' ')[:-1]
+
+
+def bytes_per_record(build_record, count: int) -> float:
+    """Measure the memory allocated per record when building count records"""
+    tickers = [f"TICK{i % 500}" for i in range(count)]
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    records = [build_record(ticker) for ticker in tickers]
+    allocated = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del records
+    return allocated / count
+
+
+def benchmark_record_memory(count: int = 100_000) -> None:
+    """Log the bytes per OpenPosition record before and after slotting and interning"""
+    before = bytes_per_record(
+        lambda ticker: LegacyOpenPosition(fresh_string(ticker), '100', '12.34', '1234', fresh_string('USD')),
+        count
+    )
+    after = bytes_per_record(
+        lambda ticker: OpenPosition(intern(fresh_string(ticker)), '100', '12.34', '1234', intern(fresh_string('USD'))),
+        count
+    )
+    log_output.info(f"OpenPosition memory over {count:,} records:")
+    log_output.info(f"  plain dataclass, copied strings:    {before:8.1f} bytes per record")
+    log_output.info(f"  slotted dataclass, interned strings: {after:8.1f} bytes per record")
+    log_output.info(f"  saving: {1 - after / before:.0%}")
+
+
+# /////////////////////////////////////////////////////////////////////////////
+@dataclass
+class LegacyOpenAccrual:
+    """Copy of the original OpenAccrual record layout, kept for comparison"""
+    ticker: str
+    quantity: Decimal
+    gross_amount: Decimal
+    net_amount: Decimal
+    withholding_tax: Decimal
+    amount_per_share: Decimal
+    ex_date: datetime
+    pay_date: datetime
+    currency: str
+    unique_ID: str = None
+
+    def __post_init__(self):
+        self.quantity = Decimal(str(self.quantity))
+        self.gross_amount = Decimal(str(self.gross_amount))
+        self.net_amount = Decimal(str(self.net_amount))
+        self.withholding_tax = Decimal(str(self.withholding_tax))
+        self.amount_per_share = Decimal(str(self.amount_per_share))
+
+
+def legacy_accrual(row):
+    """Convert an accrual row the way the original get_dividend_accruals did"""
+    return LegacyOpenAccrual(
+        ticker=row[4],
+        quantity=row[7],
+        gross_amount=row[11],
+        net_amount=row[12],
+        withholding_tax=row[8],
+        amount_per_share=row[10],
+        ex_date=datetime.strptime(row[5], '%Y-%m-%d'),
+        pay_date=datetime.strptime(row[6], '%Y-%m-%d'),
+        currency=row[3],
+    )
+
+
+ACCRUAL_HEADER = [
+    'Open Dividend Accruals', 'Header', 'Asset Category', 'Currency', 'Symbol', 'Ex Date', 'Pay Date',
+    'Quantity', 'Tax', 'Fee', 'Gross Rate', 'Gross Amount', 'Net Amount', 'Code'
+]
+
+
+def accrual_rows(count: int):
+    """Generate Open Dividend Accruals data rows spread over a year of payment dates"""
+    return [
+        ['Open Dividend Accruals', 'Data', 'Stocks', 'USD', f"TICK{i % 500}",
+         f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", f"2025-{1 + i % 12:02d}-{1 + (i + 3) % 28:02d}",
+         str(10 + i % 90), '-3.9', '0', '0.26', '26', '22.1', '']
+        for i in range(count)
+    ]
+
+
+def benchmark_accrual_conversion(count: int = 50_000, repeats: int = 5) -> None:
+    """Log the time to convert an accrual section before and after the conversion layer"""
+    rows = accrual_rows(count)
+
+    def convert_with_handler():
+        handler = DividendAccrualsHandler()
+        handler.handle(ACCRUAL_HEADER)
+        for row in rows:
+            handler.handle(row)
+
+    before = min(timed(lambda: [legacy_accrual(row) for row in rows]) for _ in range(repeats))
+    after = min(timed(convert_with_handler) for _ in range(repeats))
+    log_output.info(f"Open Dividend Accruals conversion of {count:,} rows:")
+    log_output.info(f"  strptime and Decimal(str(x)): {before * 1000:8.1f} ms")
+    log_output.info(f"  conversion layer:             {after * 1000:8.1f} ms")
+    log_output.info(f"  speedup: {before / after:.1f}x")
+
+
+def timed(function) -> float:
+    """Time a single call of a function in seconds"""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+# /////////////////////////////////////////////////////////////////////////////
+def bond_portfolio(count: int, seed: int = 0):
+    """Generate bonds with quarterly coupons, 1 to 10 years to maturity and prices around par"""
+    random = np.random.default_rng(seed)
+    purchase_date = date(2024, 1, 1)
+    bonds = []
+    for _ in range(count):
+        quarters = int(random.integers(4, 41))
+        coupon = 25 * float(random.uniform(0.02, 0.09)) / 4
+        payment_dates = [purchase_date + timedelta(days=91 * (i + 1)) for i in range(quarters)]
+        price = 25 * float(random.uniform(0.8, 1.1))
+        bonds.append((price, purchase_date, 25.0, [(payment_date, coupon) for payment_date in payment_dates], payment_dates[-1]))
+    return bonds
+
+
+def benchmark_ytm_batch(count: int = 2_000) -> None:
+    """Log the time to solve the yields of a bond portfolio one at a time and in a batch"""
+    bonds = bond_portfolio(count)
+    scalar = []
+    before = timed(lambda: scalar.extend(calculate_ytm(*bond) for bond in bonds))
+    batch = []
+    after = timed(lambda: batch.extend(calculate_ytm_batch(*zip(*bonds))))
+
+    scalar = np.array([np.nan if rate is None else rate for rate in scalar])
+    log_output.info(f"YTM of {count:,} bonds:")
+    log_output.info(f"  calculate_ytm per bond: {before * 1000:8.1f} ms")
+    log_output.info(f"  calculate_ytm_batch:    {after * 1000:8.1f} ms")
+    log_output.info(f"  speedup: {before / after:.1f}x")
+    log_output.info(f"  largest difference: {np.nanmax(np.abs(scalar - np.array(batch))):.2e}")
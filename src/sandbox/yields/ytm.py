@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 import numpy as np
 from src.monitor.log_system import get_loggers
 
@@ -7,6 +7,231 @@ from src.monitor.log_system import get_loggers
 log_system, log_error, log_output = get_loggers()
 
 
+# /////////////////////////////////////////////////////////////////////////////
+# YIELD TO MATURITY OF A BOND FROM A PRECOMPUTED CASH FLOW SCHEDULE
+#
+# A CashFlowSchedule holds the years from purchase (30/360) and the amount of
+# each cash flow of a bond, including the par value at maturity, as arrays
+# built once. Present value and its derivative are then computed together in
+# one vectorised pass, so re-pricing the bond, e.g. on every price tick, only
+# repeats the root finding.
+#
+# The yield is solved with Newton-Raphson, keeping track of the bracket that
+# the rates tried so far give: present value falls as the rate rises, so a rate
+# whose present value is above the price is below the yield. When a Newton step
+# would leave the bracket, or fails to halve the error, the bracket is
+# completed and Brent's method finishes the solve, which always converges once
+# the yield is bracketed.
+# /////////////////////////////////////////////////////////////////////////////
+
+# Lowest rate of the bracket, just above -100%
+LOWEST_RATE = -0.99
+
+# Upper end of the bracket is doubled from this until it brackets the yield
+HIGHEST_RATE = 1.0
+MAX_HIGHEST_RATE = 1e6
+
+# Ordinal of 1970-01-01, day zero of datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class CashFlowSchedule:
+    """Years from purchase and amounts of the cash flows of a bond, built once for repeated pricing"""
+
+    def __init__(self, years: np.ndarray, amounts: np.ndarray):
+        """
+        Args:
+            years: Years from purchase to each cash flow
+            amounts: Amount of each cash flow
+        """
+        self.years = years
+        self.amounts = amounts
+
+    @classmethod
+    def from_cash_flows(
+        cls,
+        purchase_date: date,
+        par_value: float,
+        cash_flows: List[Tuple[date, float]],
+        maturity_date: date
+    ) -> 'CashFlowSchedule':
+        """
+        Build the schedule of a bond, measuring years with the 30/360 convention
+
+        Args:
+            purchase_date: Date of purchase
+            par_value: Par value of bond, paid at maturity
+            cash_flows: List of tuples containing (payment_date, payment_amount)
+            maturity_date: Bond maturity date
+        """
+        payment_dates = to_datetime64([payment_date.toordinal() for payment_date, _ in cash_flows] + [maturity_date.toordinal()])
+        amounts = np.array([amount for _, amount in cash_flows] + [par_value], dtype=np.float64)
+        return cls(years_30_360(to_datetime64([purchase_date.toordinal()]), payment_dates), amounts)
+
+    def present_value(self, rate: float) -> float:
+        """Calculate present value of all cash flows at given rate"""
+        return float(np.dot(self.amounts, (1 + rate) ** -self.years))
+
+    def present_value_and_derivative(self, rate: float) -> Tuple[float, float]:
+        """Calculate present value and its derivative with respect to the rate in one pass"""
+        discounted = self.amounts * (1 + rate) ** -self.years
+        return float(discounted.sum()), float(-np.dot(self.years, discounted) / (1 + rate))
+
+    def solve_ytm(
+        self,
+        price: float,
+        guess: float = 0.05,
+        tolerance: float = 0.0001,
+        max_iterations: int = 100
+    ) -> Optional[float]:
+        """
+        Solve the yield to maturity at a price with safeguarded Newton-Raphson,
+        falling back to Brent's method on a bracket
+
+        Args:
+            price: Bond price
+            guess: Initial YTM guess
+            tolerance: Acceptable error margin in price
+            max_iterations: Newton-Raphson iterations before falling back to Brent's method
+        Returns:
+            Yield to maturity as a decimal, or None if no rate gives the price
+        """
+        low, high = LOWEST_RATE, None  # Bracket of the yield from the rates tried
+        rate = guess
+        previous_error = None
+        with np.errstate(all='ignore'):
+            for _ in range(max_iterations):
+                pv, derivative = self.present_value_and_derivative(rate)
+                difference = pv - price
+                if abs(difference) < tolerance:
+                    return rate
+                if difference > 0:
+                    low = max(low, rate)
+                else:
+                    high = rate if high is None else min(high, rate)
+
+                step = rate - difference / derivative if derivative else np.nan
+                stalled = previous_error is not None and abs(difference) > previous_error / 2
+                if not np.isfinite(step) or step <= low or (high is not None and step >= high) or stalled:
+                    break
+                rate, previous_error = step, abs(difference)
+
+            bracket = self.bracket(price, low, high)
+            if bracket is None:
+                return None
+            return brent_root(lambda rate: self.present_value(rate) - price, *bracket, tolerance)
+
+    def bracket(self, price: float, low: float, high: Optional[float]) -> Optional[Tuple[float, float]]:
+        """
+        Complete a bracket of the yield, doubling the upper end until its present
+        value is below the price. Returns None if the price is out of reach.
+        """
+        if high is None:
+            high = max(HIGHEST_RATE, 2 * low)
+            while self.present_value(high) > price:
+                if high >= MAX_HIGHEST_RATE:
+                    return None
+                low, high = high, 2 * high
+        if self.present_value(low) < price:
+            return None
+        return low, high
+
+
+def brent_root(
+    function: Callable[[float], float],
+    low: float,
+    high: float,
+    tolerance: float,
+    max_iterations: int = 200
+) -> float:
+    """
+    Find a root of a function bracketed by low and high with Brent's method,
+    combining inverse quadratic interpolation, the secant method and bisection
+
+    Args:
+        function: Continuous function changing sign between low and high
+        low: One end of the bracket
+        high: Other end of the bracket
+        tolerance: Stop when the function is within this of zero
+    """
+    a, b = low, high
+    fa, fb = function(a), function(b)
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc = a, fa
+    d = e = b - a
+
+    for _ in range(max_iterations):
+        if abs(fb) < tolerance or fb == 0:
+            break
+        if fa != fc and fb != fc:
+            # Inverse quadratic interpolation
+            s = (a * fb * fc / ((fa - fb) * (fa - fc))
+                 + b * fa * fc / ((fb - fa) * (fb - fc))
+                 + c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            # Secant step
+            s = b - fb * (b - a) / (fb - fa)
+
+        # Bisect when the interpolated point is outside the safe interval or converging slowly
+        midpoint = (a + b) / 2
+        if (not min(midpoint, b) < s < max(midpoint, b)
+                or abs(s - b) >= abs(e) / 2
+                or abs(b - a) < 1e-15):
+            s = midpoint
+            e = d = b - a
+        else:
+            e, d = d, s - b
+
+        fs = function(s)
+        c, fc = b, fb
+        if (fa < 0) != (fs < 0):
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+    return b
+
+
+def years_30_360(purchase_dates: np.ndarray, payment_dates: np.ndarray) -> np.ndarray:
+    """
+    Calculate fractional years between purchase and payment dates using 30/360 convention,
+    for arrays of dates as datetime64[D] that broadcast together
+
+    The 30/360 convention:
+    - Assumes 30 days per month
+    - Assumes 360 days per year
+    - Formula: (Y2-Y1) * 360 + (M2-M1) * 30 + (D2-D1)) / 360
+    where Y=year, M=month, D=day
+    """
+    y1, m1, d1 = date_parts(purchase_dates)
+    y2, m2, d2 = date_parts(payment_dates)
+
+    # Adjust for end of month cases
+    d1 = np.where(d1 == 31, 30, d1)
+    d2 = np.where((d2 == 31) & (d1 >= 30), 30, d2)
+
+    days = (y2 - y1) * 360 + (m2 - m1) * 30 + (d2 - d1)
+    return days / 360.0
+
+
+def date_parts(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split an array of datetime64[D] into year, month and day arrays"""
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    return (
+        years.astype(np.int64) + 1970,
+        (months - years).astype(np.int64) + 1,
+        (dates - months).astype(np.int64) + 1
+    )
+
+
+def to_datetime64(ordinals: List[int]) -> np.ndarray:
+    """Convert proleptic Gregorian ordinals (date.toordinal) to datetime64[D]"""
+    return (np.array(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+
 def calculate_ytm(
     purchase_price: float,
     purchase_date: date,
@@ -17,7 +242,7 @@ def calculate_ytm(
     tolerance: float = 0.0001
 ) -> float:
     """
-    Calculate yield to maturity using Newton-Raphson method
+    Calculate yield to maturity using safeguarded Newton-Raphson with a Brent fallback
     
     Args:
         purchase_price: Bond purchase price
@@ -29,88 +254,19 @@ def calculate_ytm(
         tolerance: Acceptable error margin
         
     Returns:
-        float: Yield to maturity as a decimal (e.g., 0.05 for 5%)
+        float: Yield to maturity as a decimal (e.g., 0.05 for 5%), or None if no
+            rate gives the purchase price
     """
     log_system.debug(f"Calculating YTM for bond purchased at {purchase_price}")
     
+    schedule = CashFlowSchedule.from_cash_flows(purchase_date, par_value, cash_flows, maturity_date)
+    rate = schedule.solve_ytm(purchase_price, guess, tolerance)
+    if rate is None:
+        log_error.warning("YTM calculation failed - no rate gives the purchase price")
+        return None
     
-    
-    # def get_years_to_payment(payment_date: date) -> float:
-    #     """Calculate fractional years between purchase date and payment date"""
-    #     days = (payment_date - purchase_date).days
-    #     return days / 365.0
-    
-    
-    
-    def get_years_to_payment(payment_date: date) -> float:
-        """
-        Calculate fractional years between purchase date and payment date using 30/360 convention
-        
-        The 30/360 convention:
-        - Assumes 30 days per month
-        - Assumes 360 days per year
-        - Formula: (Y2-Y1) * 360 + (M2-M1) * 30 + (D2-D1)) / 360
-        where Y=year, M=month, D=day
-        """
-        y1, m1, d1 = purchase_date.year, purchase_date.month, purchase_date.day
-        y2, m2, d2 = payment_date.year, payment_date.month, payment_date.day
-        
-        # Adjust for end of month cases
-        if d1 == 31:
-            d1 = 30
-        if d2 == 31 and d1 >= 30:
-            d2 = 30
-            
-        days = ((y2 - y1) * 360) + ((m2 - m1) * 30) + (d2 - d1)
-        return days / 360.0
-    
-    
-    
-    
-
-    def present_value(rate: float) -> float:
-        """Calculate present value of all cash flows at given rate"""
-        pv = 0
-        for payment_date, amount in cash_flows:
-            years = get_years_to_payment(payment_date)
-            pv += amount / ((1 + rate) ** years)
-        
-        # Add present value of par amount at maturity
-        years_to_maturity = get_years_to_payment(maturity_date)
-        pv += par_value / ((1 + rate) ** years_to_maturity)
-        return pv
-
-    def pv_derivative(rate: float) -> float:
-        """Calculate derivative of present value function"""
-        derivative = 0
-        for payment_date, amount in cash_flows:
-            years = get_years_to_payment(payment_date)
-            derivative -= years * amount / ((1 + rate) ** (years + 1))
-            
-        years_to_maturity = get_years_to_payment(maturity_date)
-        derivative -= years_to_maturity * par_value / ((1 + rate) ** (years_to_maturity + 1))
-        return derivative
-
-    # Newton-Raphson iteration
-    rate = guess
-    for _ in range(100):  # Maximum iterations
-        try:
-            pv = present_value(rate)
-            difference = pv - purchase_price
-            
-            if abs(difference) < tolerance:
-                log_system.info(f"YTM calculation converged at {rate:.4%}")
-                return rate
-                
-            derivative = pv_derivative(rate)
-            rate = rate - difference / derivative
-            
-        except ZeroDivisionError:
-            log_error.error("YTM calculation failed - division by zero")
-            return None
-            
-    log_error.warning("YTM calculation did not converge")
-    return None
+    log_system.info(f"YTM calculation converged at {rate:.4%}")
+    return rate
 
 # Example usage:
 if __name__ == "__main__":
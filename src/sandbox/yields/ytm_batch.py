@@ -0,0 +1,187 @@
+from datetime import date
+from typing import List, Sequence, Tuple
+import numpy as np
+from src.monitor.log_system import get_loggers
+from src.sandbox.yields.ytm import HIGHEST_RATE, LOWEST_RATE, MAX_HIGHEST_RATE, to_datetime64, years_30_360
+
+# Get logger instances at module level
+log_system, log_error, log_output = get_loggers()
+
+
+# /////////////////////////////////////////////////////////////////////////////
+# BATCH YIELD TO MATURITY FOR MANY BONDS AT ONCE
+#
+# The cash flows of each bond, including the par value at maturity, are laid
+# out as one row of two padded 2D arrays: years from purchase (30/360) and
+# amounts. Padding has an amount of zero, so it adds nothing to present value.
+#
+# Newton-Raphson iterations are run on every bond together. Present value and
+# its derivative are computed for the whole matrix with one power per cell, and
+# a mask tracks the bonds still iterating, so converged bonds drop out. Bonds
+# whose iteration fails (a zero derivative, a rate at or below -100%, or no
+# convergence within the iteration limit) fall back to vectorised bisection
+# on a bracket, which always converges when the price lies within it.
+#
+# The convergence test, |PV - price| < tolerance, and the starting guess are
+# those of calculate_ytm, so the two agree to within the tolerance. The 30/360
+# year fractions are shared with the CashFlowSchedule of a single bond.
+# /////////////////////////////////////////////////////////////////////////////
+
+
+def cash_flow_arrays(
+    purchase_dates: Sequence[date],
+    par_values: Sequence[float],
+    cash_flows: Sequence[List[Tuple[date, float]]],
+    maturity_dates: Sequence[date]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lay out the cash flows of many bonds as padded arrays of years and amounts
+
+    Args:
+        purchase_dates: Date of purchase of each bond
+        par_values: Par value of each bond, paid at maturity
+        cash_flows: List of (payment_date, payment_amount) tuples for each bond
+        maturity_dates: Maturity date of each bond
+    Returns:
+        Tuple of (years, amounts), each with a row per bond and a column per cash flow
+    """
+    counts = np.array([len(flows) + 1 for flows in cash_flows], dtype=np.int64)
+    width = int(counts.max()) if len(counts) else 1
+    flat_dates, flat_amounts = [], []
+    for flows, par_value, maturity_date in zip(cash_flows, par_values, maturity_dates):
+        flat_dates += [payment_date.toordinal() for payment_date, _ in flows]
+        flat_dates.append(maturity_date.toordinal())
+        flat_amounts += [amount for _, amount in flows]
+        flat_amounts.append(par_value)
+
+    # Scatter the flattened cash flows into their rows. Dates are converted through
+    # their ordinals, which is much faster than converting date objects.
+    rows = np.repeat(np.arange(len(counts)), counts)
+    columns = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    purchase_dates = to_datetime64([purchase_date.toordinal() for purchase_date in purchase_dates]).reshape(-1, 1)
+    payment_dates = np.repeat(purchase_dates, width, axis=1)
+    amounts = np.zeros((len(counts), width), dtype=np.float64)
+    payment_dates[rows, columns] = to_datetime64(flat_dates)
+    amounts[rows, columns] = flat_amounts
+
+    return years_30_360(purchase_dates, payment_dates), amounts
+
+
+def present_values(rates: np.ndarray, years: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the present value of each row of cash flows and its derivative with respect to the rate"""
+    growth = 1 + rates[:, None]
+    discounted = amounts * growth ** -years
+    return discounted.sum(axis=1), -(years * discounted).sum(axis=1) / growth[:, 0]
+
+
+def solve_ytm_batch(
+    prices: np.ndarray,
+    years: np.ndarray,
+    amounts: np.ndarray,
+    guess: float = 0.05,
+    tolerance: float = 0.0001,
+    max_iterations: int = 100
+) -> np.ndarray:
+    """
+    Solve the yield to maturity of many bonds together
+
+    Args:
+        prices: Purchase price of each bond
+        years: Years to each cash flow, a row per bond
+        amounts: Amount of each cash flow, a row per bond, zero for padding
+        guess: Initial YTM guess for every bond
+        tolerance: Acceptable error margin in price
+        max_iterations: Newton-Raphson iterations before falling back to bisection
+    Returns:
+        Yield to maturity of each bond as a decimal, NaN where there is no solution
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rates = np.full(len(prices), guess, dtype=np.float64)
+    active = np.ones(len(prices), dtype=bool)
+    converged = np.zeros(len(prices), dtype=bool)
+
+    with np.errstate(all='ignore'):
+        for _ in range(max_iterations):
+            rows = np.flatnonzero(active)
+            if not len(rows):
+                break
+            pv, derivative = present_values(rates[rows], years[rows], amounts[rows])
+            difference = pv - prices[rows]
+
+            done = np.abs(difference) < tolerance
+            converged[rows[done]] = True
+            active[rows[done]] = False
+
+            stepping = ~done
+            step_rows = rows[stepping]
+            new_rates = rates[step_rows] - difference[stepping] / derivative[stepping]
+            failed = ~np.isfinite(new_rates) | (new_rates <= -1)
+            rates[step_rows] = np.where(failed, rates[step_rows], new_rates)
+            active[step_rows[failed]] = False
+
+        fallback = np.flatnonzero(~converged)
+        if len(fallback):
+            log_system.debug(f"YTM Newton-Raphson did not converge for {len(fallback)} bonds, bisecting")
+            rates[fallback] = bisect_ytm(prices[fallback], years[fallback], amounts[fallback], tolerance)
+    return rates
+
+
+def bisect_ytm(
+    prices: np.ndarray,
+    years: np.ndarray,
+    amounts: np.ndarray,
+    tolerance: float = 0.0001,
+    max_iterations: int = 200
+) -> np.ndarray:
+    """
+    Solve the yield to maturity of many bonds by bisection. Present value falls
+    as the rate rises when the cash flows are positive and in the future, so the
+    rate is bracketed between LOWEST_RATE and an upper rate doubled until its
+    present value is below the price.
+
+    Returns:
+        Yield to maturity of each bond, NaN where the price is not bracketed
+    """
+    low = np.full(len(prices), LOWEST_RATE)
+    high = np.full(len(prices), HIGHEST_RATE)
+    while True:
+        above = present_values(high, years, amounts)[0] > prices
+        if not above.any() or high.max() >= MAX_HIGHEST_RATE:
+            break
+        low = np.where(above, high, low)
+        high = np.where(above, high * 2, high)
+
+    bracketed = (present_values(low, years, amounts)[0] >= prices) & (present_values(high, years, amounts)[0] <= prices)
+    rates = (low + high) / 2
+    for _ in range(max_iterations):
+        pv = present_values(rates, years, amounts)[0]
+        difference = pv - prices
+        if np.all((np.abs(difference) < tolerance) | ~bracketed):
+            break
+        low = np.where(difference > 0, rates, low)
+        high = np.where(difference > 0, high, rates)
+        rates = (low + high) / 2
+
+    if not bracketed.all():
+        log_error.warning(f"YTM calculation found no solution for {int((~bracketed).sum())} bonds")
+    return np.where(bracketed, rates, np.nan)
+
+
+def calculate_ytm_batch(
+    purchase_prices: Sequence[float],
+    purchase_dates: Sequence[date],
+    par_values: Sequence[float],
+    cash_flows: Sequence[List[Tuple[date, float]]],
+    maturity_dates: Sequence[date],
+    guess: float = 0.05,
+    tolerance: float = 0.0001
+) -> np.ndarray:
+    """
+    Calculate the yield to maturity of many bonds, taking the same arguments as
+    calculate_ytm with one item per bond in each
+
+    Returns:
+        Yield to maturity of each bond as a decimal, NaN where there is no solution
+    """
+    years, amounts = cash_flow_arrays(purchase_dates, par_values, cash_flows, maturity_dates)
+    return solve_ytm_batch(np.asarray(purchase_prices, dtype=np.float64), years, amounts, guess, tolerance)
@@ -0,0 +1,30 @@
+# /////////////////////////////////////////////////////////////////////////////
+# SAMPLE STATEMENT FILES SHARED BY THE TESTS
+# /////////////////////////////////////////////////////////////////////////////
+
+import os
+
+
+SAMPLE_STATEMENT = """﻿Statement,Header,Field Name,Field Value
+Statement,Data,Period,"{period}"
+Account Information,Header,Field Name,Field Value
+Account Information,Data,Account,{account}
+Account Information,Data,Base Currency,GBP
+Net Asset Value,Header,Asset Class,Prior Total,Current Long,Current Short,Current Total,Change
+Net Asset Value,Data,Cash ,1000,1200,0,1200,200
+Net Asset Value,Data,Stock,5000,5100,0,5100,100
+Net Asset Value,Data,Total,6000,6300,0,6300,300
+Trades,Header,DataDiscriminator,Asset Category,Currency,Symbol,Date/Time,Quantity,T. Price,C. Price,Proceeds,Comm/Fee,Basis,Realized P/L,MTM P/L,Code
+Trades,Data,Order,Stocks,USD,AAPL,"2025-09-10, 10:00:00",10,150,151,-1500,-1,1501,0,10,O
+Open Positions,Header,DataDiscriminator,Asset Category,Currency,Symbol,Quantity,Mult,Cost Price,Cost Basis,Close Price,Value,Unrealized P/L,Code
+Open Positions,Data,Summary,Stocks,USD,AAPL,100,1,150,15000,170,17000,2000,
+Open Positions,Data,Summary,Stocks,GBP,VOD,"1,000",1,0.7,700,0.72,720,20,
+"""
+
+
+def write_statement(directory: str, name: str, account: str = 'U111', period: str = 'September 10, 2025') -> str:
+    """Write a sample IBKR statement file and return its path"""
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        file.write(SAMPLE_STATEMENT.format(account=account, period=period))
+    return path
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+from src.engine.IBKR_statements import load_ibkr_statements_directory, parse_ibkr_statement
+from src.engine.nav_series import NAVHistory
+from src.engine.position_table import PositionTable
+from src.monitor import exceptions
+from tests.statement_samples import write_statement
+
+
+class TestStatementLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.statement_path = write_statement(self.directory.name, 'U111_20250910.csv')
+        self.other_path = os.path.join(self.directory.name, 'other.csv')
+        with open(self.other_path, 'w') as file:
+            file.write("date,amount\n2025-01-01,5\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_non_statement_csv_fails_to_parse(self):
+        with self.assertRaises(exceptions.StatementParseError):
+            parse_ibkr_statement(self.other_path)
+
+    def test_directory_with_non_statement_csv_loads_the_statements(self):
+        statements = load_ibkr_statements_directory(self.directory.name, dedup_precedence='longest')
+        self.assertEqual(list(statements), [self.statement_path])
+
+        table = PositionTable.from_statements(statements.values())
+        self.assertEqual(len(table.latest()), 2)
+        history = NAVHistory.from_statements(statements.values())
+        self.assertEqual(len(history.accounts['U111']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
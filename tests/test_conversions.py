@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from src.engine.conversions import parse_iso_date, parse_long_date, parse_trade_datetime, to_decimal
+
+
+class TestConversionsMatchLegacy(unittest.TestCase):
+    """The conversion layer must give the values of the strptime and Decimal(str(x)) conversions it replaced"""
+
+    def test_iso_dates_match_strptime(self):
+        day = datetime(2023, 1, 1)
+        for _ in range(800):
+            text = day.strftime('%Y-%m-%d')
+            self.assertEqual(parse_iso_date(text), datetime.strptime(text, '%Y-%m-%d'))
+            day += timedelta(days=1)
+
+    def test_long_dates_match_strptime(self):
+        for text in ('September 10, 2025', 'January 1, 2024', 'February 29, 2024', 'December 31, 2025'):
+            self.assertEqual(parse_long_date(text), datetime.strptime(text, '%B %d, %Y'))
+
+    def test_trade_datetimes_match_strptime(self):
+        self.assertEqual(
+            parse_trade_datetime('2025-09-10, 10:05:30'),
+            datetime.strptime('2025-09-10, 10:05:30', '%Y-%m-%d, %H:%M:%S')
+        )
+
+    def test_amounts_match_decimal_of_str(self):
+        for value in ('26', '-3.9', '0.26', '22.10', '0', '-0.0001', '123456789.123456', '1E+3', 10, -7, 0.26, 1.5e-7, 2.675):
+            converted = to_decimal(value)
+            expected = Decimal(str(value))
+            self.assertEqual(converted, expected)
+            self.assertEqual(converted.as_tuple(), expected.as_tuple())
+
+    def test_decimals_are_returned_unchanged(self):
+        value = Decimal('1.230')
+        self.assertIs(to_decimal(value), value)
+
+    def test_statement_formatting_is_removed(self):
+        self.assertEqual(to_decimal('1,234,567.50'), Decimal('1234567.50'))
+        self.assertEqual(to_decimal(' 12.5 '), Decimal('12.5'))
+        for missing in ('', '--', '-'):
+            self.assertEqual(to_decimal(missing), Decimal(0))
+
+
+if __name__ == '__main__':
+    unittest.main()